@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'anemia_project.settings')
 
 application = get_asgi_application()
+
+# Pre-cargar el modelo de anemia antes de atender solicitudes
+# (ANEMIA_PRELOAD_MODE: off, worker, background o master)
+from ml_models.model_loader import preload_for_server  # noqa: E402
+
+preload_for_server()
@@ -193,3 +193,164 @@ else:
 
     MEDIA_URL = "/media/"
     MEDIA_ROOT = BASE_DIR / "media"
+
+# Configuración de inferencia del modelo de anemia
+# Micro-batching: agrupa predicciones concurrentes en una sola pasada del modelo
+ANEMIA_BATCHING_ENABLED = config("ANEMIA_BATCHING_ENABLED", default=True, cast=bool)
+# 0 = valor del perfil de ejecución (autotune_anemia_runtime) o 16
+ANEMIA_BATCH_MAX_SIZE = config("ANEMIA_BATCH_MAX_SIZE", default=0, cast=int)
+ANEMIA_BATCH_MAX_WAIT_MS = config("ANEMIA_BATCH_MAX_WAIT_MS", default=5.0, cast=float)
+
+# Backend de inferencia: "keras" (TensorFlow completo), "tflite" (LiteRT en CPU),
+# "mmap" (NumPy sobre pesos mapeados en memoria y compartidos entre workers,
+# sin TensorFlow) o "numpy" (NumPy sobre los pesos del .h5, sin TensorFlow).
+# "tflite" y "mmap" requieren generar antes el artefacto con:
+#   python manage.py convert_anemia_model [--format mmap]
+ANEMIA_INFERENCE_BACKEND = config("ANEMIA_INFERENCE_BACKEND", default="keras")
+# Modo de inferencia: "float" o "int8" (cuantizado, solo con backend "tflite"):
+#   python manage.py convert_anemia_model --quantize int8
+ANEMIA_INFERENCE_MODE = config("ANEMIA_INFERENCE_MODE", default="float")
+# Compilar con XLA la función de inferencia del backend "keras"
+ANEMIA_KERAS_JIT_COMPILE = config("ANEMIA_KERAS_JIT_COMPILE", default=False, cast=bool)
+# Hilos de TensorFlow por proceso (0 = perfil de ejecución o valor por defecto)
+ANEMIA_KERAS_INTRA_OP_THREADS = config("ANEMIA_KERAS_INTRA_OP_THREADS", default=0, cast=int)
+ANEMIA_KERAS_INTER_OP_THREADS = config("ANEMIA_KERAS_INTER_OP_THREADS", default=0, cast=int)
+# Hilos del intérprete TFLite (0 = perfil de ejecución o valor por defecto del runtime)
+ANEMIA_TFLITE_NUM_THREADS = config("ANEMIA_TFLITE_NUM_THREADS", default=0, cast=int)
+
+# Pool de inferencia multiproceso: un número fijo de procesos con el modelo
+# cargado atiende a todos los procesos web de la máquina. Arrancar con:
+#   python manage.py run_inference_pool
+ANEMIA_INFERENCE_POOL_ENABLED = config(
+    "ANEMIA_INFERENCE_POOL_ENABLED", default=False, cast=bool
+)
+ANEMIA_INFERENCE_POOL_ADDRESS = config(
+    "ANEMIA_INFERENCE_POOL_ADDRESS", default="/tmp/anemia_inference.sock"
+)
+# 0 = réplicas del perfil de ejecución o 2
+ANEMIA_INFERENCE_POOL_WORKERS = config(
+    "ANEMIA_INFERENCE_POOL_WORKERS", default=0, cast=int
+)
+# Clave compartida servidor/clientes (vacía = derivada de SECRET_KEY)
+ANEMIA_INFERENCE_POOL_AUTHKEY = config("ANEMIA_INFERENCE_POOL_AUTHKEY", default="")
+
+# Caché de resultados de inferencia por contenido de la imagen
+ANEMIA_CACHE_ENABLED = config("ANEMIA_CACHE_ENABLED", default=True, cast=bool)
+# Entradas del LRU en memoria de cada proceso
+ANEMIA_CACHE_MAX_ENTRIES = config("ANEMIA_CACHE_MAX_ENTRIES", default=1024, cast=int)
+# Nivel compartido entre procesos: "" (desactivado), "django" o "disk"
+ANEMIA_CACHE_SHARED_BACKEND = config("ANEMIA_CACHE_SHARED_BACKEND", default="")
+ANEMIA_CACHE_DJANGO_ALIAS = config("ANEMIA_CACHE_DJANGO_ALIAS", default="default")
+ANEMIA_CACHE_TIMEOUT = config("ANEMIA_CACHE_TIMEOUT", default=86400, cast=int)
+ANEMIA_CACHE_DISK_DIR = config(
+    "ANEMIA_CACHE_DISK_DIR", default="/tmp/anemia_inference_cache"
+)
+ANEMIA_CACHE_DISK_MAX_ENTRIES = config(
+    "ANEMIA_CACHE_DISK_MAX_ENTRIES", default=10000, cast=int
+)
+
+# Horas de vida de un análisis pendiente (subido pero sin reporte guardado).
+# Los expirados se eliminan con: python manage.py purge_pending_analyses
+ANEMIA_PENDING_ANALYSIS_TTL_HOURS = config(
+    "ANEMIA_PENDING_ANALYSIS_TTL_HOURS", default=24, cast=int
+)
+
+# Modelo servido y registro de versiones para el intercambio en caliente.
+# Una nueva versión se publica con: python manage.py swap_anemia_model --model <ruta>
+# y cada worker la carga y calienta en segundo plano antes de activarla.
+ANEMIA_MODEL_PATH = config("ANEMIA_MODEL_PATH", default="ml_models/best_model.h5")
+# Directorio compartido entre workers ("" = sin coordinación entre procesos)
+ANEMIA_MODEL_REGISTRY_DIR = config(
+    "ANEMIA_MODEL_REGISTRY_DIR", default="/tmp/anemia_model_registry"
+)
+# Segundos entre comprobaciones de una versión nueva publicada
+ANEMIA_MODEL_SYNC_INTERVAL = config("ANEMIA_MODEL_SYNC_INTERVAL", default=5.0, cast=float)
+# Segundos que se conserva la versión anterior para las solicitudes en curso
+ANEMIA_MODEL_RETIRE_GRACE_SECONDS = config(
+    "ANEMIA_MODEL_RETIRE_GRACE_SECONDS", default=30.0, cast=float
+)
+# Imágenes fijas (static/img/analysis) y rondas del calentamiento previo al intercambio
+ANEMIA_MODEL_WARMUP_SAMPLES = config("ANEMIA_MODEL_WARMUP_SAMPLES", default=8, cast=int)
+ANEMIA_MODEL_WARMUP_ROUNDS = config("ANEMIA_MODEL_WARMUP_ROUNDS", default=2, cast=int)
+
+# Pre-carga del modelo en producción (hook en wsgi.py/asgi.py):
+#   "worker": cada worker carga y calienta el modelo antes de atender (por defecto)
+#   "background": igual, en un hilo, sin retrasar el arranque del worker
+#   "master": gunicorn -c gunicorn.conf.py importa el runtime en el maestro
+#             (preload_app) y carga el modelo en cada worker tras el fork
+#   "off": carga diferida en la primera solicitud
+ANEMIA_PRELOAD_MODE = config("ANEMIA_PRELOAD_MODE", default="worker")
+
+# Preprocesamiento: decodificar los JPEG con escalado DCT (1/2, 1/4, 1/8) y
+# reducción por bloques antes del remuestreo a 64x64. False = decodificación
+# completa original. Un margen mayor es más fiel y algo más lento.
+ANEMIA_FAST_DECODE = config("ANEMIA_FAST_DECODE", default=True, cast=bool)
+ANEMIA_DECODE_REDUCING_GAP = config("ANEMIA_DECODE_REDUCING_GAP", default=3.0, cast=float)
+
+# Aumento en tiempo de inferencia (TTA): si la probabilidad queda a menos de
+# ANEMIA_TTA_BAND del umbral, se evalúan en una sola pasada 9 vistas de la
+# imagen (espejo, recortes, brillo) y se usa su media
+ANEMIA_TTA_ENABLED = config("ANEMIA_TTA_ENABLED", default=False, cast=bool)
+ANEMIA_TTA_BAND = config("ANEMIA_TTA_BAND", default=0.1, cast=float)
+
+# Perfil de ejecución en CPU (hilos, tamaño de batch y réplicas) medido en
+# esta máquina con: python manage.py autotune_anemia_runtime
+# Vacío = no usar perfil
+ANEMIA_RUNTIME_PROFILE = config(
+    "ANEMIA_RUNTIME_PROFILE", default=str(BASE_DIR / "runtime_profile.json")
+)
+
+# API asyncio (ml_models.model_loader.apredict) para despliegues ASGI: hilos
+# que ejecutan decodificación e inferencia, trabajos admitidos a la vez en el
+# proceso y segundos de espera de un hueco antes de rechazar por sobrecarga
+ANEMIA_ASYNC_MAX_WORKERS = config("ANEMIA_ASYNC_MAX_WORKERS", default=8, cast=int)
+ANEMIA_ASYNC_MAX_PENDING = config("ANEMIA_ASYNC_MAX_PENDING", default=64, cast=int)
+ANEMIA_ASYNC_QUEUE_TIMEOUT = config("ANEMIA_ASYNC_QUEUE_TIMEOUT", default=1.0, cast=float)
+
+# Evaluación en sombra: una fracción de los análisis se vuelve a evaluar en
+# segundo plano con el modelo candidato y la comparación se guarda en
+# EvaluacionSombra. Vacío = desactivada. El hilo de sombra espera a que no
+# haya inferencias principales en curso (máximo ANEMIA_SHADOW_MAX_DEFER s)
+ANEMIA_SHADOW_MODEL_PATH = config("ANEMIA_SHADOW_MODEL_PATH", default="")
+ANEMIA_SHADOW_SAMPLE_RATE = config("ANEMIA_SHADOW_SAMPLE_RATE", default=0.1, cast=float)
+ANEMIA_SHADOW_MAX_PENDING = config("ANEMIA_SHADOW_MAX_PENDING", default=32, cast=int)
+ANEMIA_SHADOW_MAX_DEFER = config("ANEMIA_SHADOW_MAX_DEFER", default=2.0, cast=float)
+
+# Control de calidad de las capturas antes de guardarlas y evaluarlas: se
+# rechazan (con el motivo) recortes vacíos, pequeños, mal expuestos o
+# desenfocados. La nitidez es la varianza del laplaciano a 256 px
+ANEMIA_QUALITY_GATE_ENABLED = config("ANEMIA_QUALITY_GATE_ENABLED", default=True, cast=bool)
+ANEMIA_QUALITY_MIN_SHARPNESS = config("ANEMIA_QUALITY_MIN_SHARPNESS", default=100.0, cast=float)
+ANEMIA_QUALITY_MIN_MASK_FRACTION = config("ANEMIA_QUALITY_MIN_MASK_FRACTION", default=0.01, cast=float)
+ANEMIA_QUALITY_MIN_CROP_PX = config("ANEMIA_QUALITY_MIN_CROP_PX", default=64, cast=int)
+ANEMIA_QUALITY_MIN_BRIGHTNESS = config("ANEMIA_QUALITY_MIN_BRIGHTNESS", default=50.0, cast=float)
+ANEMIA_QUALITY_MAX_CLIPPED_FRACTION = config(
+    "ANEMIA_QUALITY_MAX_CLIPPED_FRACTION", default=0.25, cast=float
+)
+
+# Primera etapa por índice de palidez (ml_models.pallor): las imágenes cuyo
+# índice cae fuera de la banda dudosa se resuelven sin la CNN. La banda se
+# calibra con los reportes guardados (manage.py calibrate_pallor_prescreen);
+# sin archivo de calibración todas las imágenes pasan por la CNN
+ANEMIA_PALLOR_PRESCREEN_ENABLED = config(
+    "ANEMIA_PALLOR_PRESCREEN_ENABLED", default=False, cast=bool
+)
+ANEMIA_PALLOR_CALIBRATION = config(
+    "ANEMIA_PALLOR_CALIBRATION", default=str(BASE_DIR / "pallor_calibration.json")
+)
+
+# Ensemble: modelos .h5 adicionales (separados por comas) evaluados junto con
+# ANEMIA_MODEL_PATH sobre el mismo tensor; con keras en una sola llamada.
+# Estrategia: mean (media, ponderada con ANEMIA_ENSEMBLE_WEIGHTS, un peso por
+# modelo empezando por ANEMIA_MODEL_PATH) o vote (mayoría). Vacío = un solo modelo
+ANEMIA_ENSEMBLE_WITH = config("ANEMIA_ENSEMBLE_WITH", default="", cast=Csv())
+ANEMIA_ENSEMBLE_STRATEGY = config("ANEMIA_ENSEMBLE_STRATEGY", default="mean")
+ANEMIA_ENSEMBLE_WEIGHTS = config("ANEMIA_ENSEMBLE_WEIGHTS", default="", cast=Csv(float))
+
+# Embeddings de la penúltima capa por reporte (ml_models.embedding_store) para
+# buscar casos similares: matriz float16 mapeada en memoria que se amplía con
+# manage.py index_report_embeddings y al consultar un reporte sin indexar
+ANEMIA_EMBEDDING_STORE_DIR = config(
+    "ANEMIA_EMBEDDING_STORE_DIR", default=str(BASE_DIR / "embeddings")
+)
+ANEMIA_SIMILAR_CASES = config("ANEMIA_SIMILAR_CASES", default=5, cast=int)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from apps.core.models import Paciente, ReporteAnemia
+from apps.core.models import AnalisisPendiente, EvaluacionSombra, Paciente, ReporteAnemia
 
 
 @admin.register(Paciente)
@@ -12,7 +12,23 @@ class PacienteAdmin(admin.ModelAdmin):
 
 @admin.register(ReporteAnemia)
 class ReporteAnemiaAdmin(admin.ModelAdmin):
-    list_display = ['id', 'paciente', 'fecha_analisis', 'grado_palidez', 'creado_por', 'creado_en']
-    list_filter = ['grado_palidez', 'fecha_analisis', 'creado_en']
+    list_display = ['id', 'paciente', 'fecha_analisis', 'grado_palidez', 'version_modelo', 'creado_por', 'creado_en']
+    list_filter = ['grado_palidez', 'fecha_analisis', 'version_modelo', 'creado_en']
     search_fields = ['paciente__nombre', 'paciente__apellido', 'paciente__dni']
+    readonly_fields = ['creado_en', 'reevaluado_en']
+
+
+@admin.register(AnalisisPendiente)
+class AnalisisPendienteAdmin(admin.ModelAdmin):
+    list_display = ['id', 'paciente', 'imagen', 'probabilidad', 'version_modelo', 'creado_en', 'expira_en']
+    list_filter = ['tiene_anemia', 'version_modelo', 'creado_en']
+    search_fields = ['paciente__nombre', 'paciente__apellido', 'imagen']
+    readonly_fields = ['creado_en']
+
+
+@admin.register(EvaluacionSombra)
+class EvaluacionSombraAdmin(admin.ModelAdmin):
+    list_display = ['id', 'imagen', 'version_candidata', 'probabilidad_principal', 'probabilidad_candidata', 'coinciden', 'creado_en']
+    list_filter = ['coinciden', 'version_candidata', 'creado_en']
+    search_fields = ['paciente__nombre', 'paciente__apellido', 'imagen']
     readonly_fields = ['creado_en']
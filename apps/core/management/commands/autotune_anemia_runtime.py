@@ -0,0 +1,170 @@
+"""
+Comando para ajustar hilos, tamaño de batch y réplicas del modelo de anemia
+a la máquina actual.
+
+Uso:
+    python manage.py autotune_anemia_runtime
+    python manage.py autotune_anemia_runtime --max-p99-ms 50 --duration 3
+    python manage.py autotune_anemia_runtime --backend tflite --dry-run
+
+Ejecutar una vez en cada tamaño de nodo. El perfil se guarda en
+ANEMIA_RUNTIME_PROFILE y lo aplican al arrancar ``load_model`` (hilos),
+el micro-batching (tamaño de batch), gunicorn y run_inference_pool (réplicas).
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml_models.autotune import DEFAULT_BATCH_SIZES, autotune
+from ml_models.backends import BACKENDS, get_backend_class
+from ml_models.conversion import find_sample_images
+from ml_models.model_loader import get_warmup_samples
+from ml_models.runtime_profile import get_runtime_profile_path, save_runtime_profile
+
+from .convert_anemia_model import get_sample_directories
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide combinaciones de hilos intra/inter-op, tamaño de batch y réplicas "
+        "en esta máquina y guarda la mejor como perfil de ejecución."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            default=None,
+            help="Modelo .h5 a medir (por defecto ANEMIA_MODEL_PATH).",
+        )
+        parser.add_argument(
+            "--backend",
+            choices=sorted(BACKENDS),
+            default=None,
+            help="Backend de inferencia (por defecto ANEMIA_INFERENCE_BACKEND).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            action="append",
+            dest="batch_sizes",
+            help=f"Tamaño de batch a medir (repetible). Por defecto: {DEFAULT_BATCH_SIZES}.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=2.0,
+            help="Segundos de carga sostenida por configuración y tamaño de batch.",
+        )
+        parser.add_argument(
+            "--max-replicas",
+            type=int,
+            default=None,
+            help="Máximo de procesos con el modelo cargado (por defecto, los núcleos).",
+        )
+        parser.add_argument(
+            "--max-p99-ms",
+            type=float,
+            default=100.0,
+            help="Latencia p99 máxima aceptada por batch.",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=16,
+            help="Número máximo de imágenes de análisis usadas como muestra.",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Ruta del perfil (por defecto ANEMIA_RUNTIME_PROFILE).",
+        )
+        parser.add_argument(
+            "--no-baseline",
+            action="store_true",
+            help="No medir la configuración actual sin perfil.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Mostrar el resultado sin guardar el perfil.",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"] or get_runtime_profile_path()
+        if output is None and not options["dry_run"]:
+            raise CommandError("ANEMIA_RUNTIME_PROFILE está vacío: indique --output")
+
+        model_path = Path(options["model"] or settings.ANEMIA_MODEL_PATH)
+        backend = options["backend"] or settings.ANEMIA_INFERENCE_BACKEND
+        inference_mode = getattr(settings, "ANEMIA_INFERENCE_MODE", "float")
+        artifact = get_backend_class(backend).resolve_artifact_path(model_path, inference_mode)
+        if not artifact.exists():
+            raise CommandError(f"Modelo no encontrado en: {artifact}")
+
+        sample_paths = find_sample_images(get_sample_directories(), limit=options["samples"])
+        samples = (
+            [path.read_bytes() for path in sample_paths]
+            if sample_paths else get_warmup_samples(limit=1)
+        )
+        batch_sizes = sorted(set(options["batch_sizes"] or DEFAULT_BATCH_SIZES))
+
+        self.stdout.write(
+            f"🔧 Ajustando {model_path.name} (backend: {backend}) con "
+            f"{len(samples)} imágenes de muestra..."
+        )
+        backend_options = {"jit_compile": settings.ANEMIA_KERAS_JIT_COMPILE} if backend == "keras" else {}
+        try:
+            profile = autotune(
+                model_path, samples,
+                backend=backend,
+                backend_options=backend_options,
+                inference_mode=inference_mode,
+                batch_sizes=batch_sizes,
+                duration=options["duration"],
+                max_replicas=options["max_replicas"],
+                max_p99_ms=options["max_p99_ms"],
+                include_baseline=not options["no_baseline"],
+                progress=self._print_result,
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Mejor configuración: {profile['replicas']} réplica(s) x "
+                f"{profile['intra_op_threads']} hilo(s) intra-op / "
+                f"{profile['inter_op_threads']} inter-op, batch {profile['batch_max_size']}: "
+                f"{profile['throughput_images_per_s']:.0f} img/s, p99 {profile['p99_ms']:.1f} ms"
+            )
+        )
+        if "speedup_vs_baseline" in profile:
+            self.stdout.write(
+                f"   Frente a la configuración sin perfil: x{profile['speedup_vs_baseline']:.2f}"
+            )
+        if not profile["within_budget"]:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  Ninguna configuración cumple p99 <= {options['max_p99_ms']:.0f} ms; "
+                "se eligió la de menor latencia"
+            ))
+
+        if options["dry_run"]:
+            return
+        save_runtime_profile(profile, output)
+        self.stdout.write(f"💾 Perfil guardado en {output}")
+
+    def _print_result(self, result):
+        label = (
+            f"{result['replicas']} réplica(s) x "
+            f"{result['intra_op_threads'] or 'def.'}/{result['inter_op_threads'] or 'def.'} hilos"
+        )
+        if result.get("baseline"):
+            label += " (sin perfil)"
+        if "error" in result:
+            self.stdout.write(self.style.ERROR(f"   ❌ {label}: {result['error']}"))
+            return
+        summary = " | ".join(
+            f"b{batch_size}: {stats['images_per_s']:.0f} img/s p99 {stats['p99_ms']:.1f} ms"
+            for batch_size, stats in result["batches"].items()
+        )
+        self.stdout.write(f"   {label}: {summary}")
@@ -0,0 +1,160 @@
+"""
+Comando para medir el coste de inferencia del detector de anemia.
+
+Uso:
+    python manage.py benchmark_anemia_model
+    python manage.py benchmark_anemia_model --backend keras --backend tflite
+    python manage.py benchmark_anemia_model --model ml_models/best_model.h5 --batch-size 1 --batch-size 64
+    python manage.py benchmark_anemia_model --output benchmarks/servidor-a.json
+
+Cada combinación de modelo y backend se mide en un proceso nuevo; el
+informe JSON incluye los metadatos del equipo para comparar ejecuciones.
+"""
+import json
+import socket
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml_models.backends import BACKENDS, INFERENCE_MODE_FLOAT, INFERENCE_MODE_SUFFIXES
+from ml_models.benchmark import DEFAULT_BATCH_SIZES, run_benchmark
+from ml_models.conversion import BUNDLED_MODELS, find_sample_images
+from ml_models.model_loader import get_backend_options, get_warmup_samples
+
+from .convert_anemia_model import get_sample_directories
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide carga en frío, latencias p50/p95/p99, throughput por tamaño de "
+        "batch, preprocesamiento frente a inferencia y pico de memoria de cada "
+        "modelo y backend, y guarda el resultado en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="Ruta a un modelo .h5 (repetible). Por defecto: todos los incluidos.",
+        )
+        parser.add_argument(
+            "--backend",
+            action="append",
+            dest="backends",
+            choices=sorted(BACKENDS),
+            help="Backend a medir (repetible). Por defecto: todos.",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=sorted(INFERENCE_MODE_SUFFIXES),
+            default=INFERENCE_MODE_FLOAT,
+            help="Modo de inferencia.",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=16,
+            help="Número máximo de imágenes de análisis usadas como muestra.",
+        )
+        parser.add_argument(
+            "--repeats",
+            type=int,
+            default=100,
+            help="Invocaciones medidas para cada latencia.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            action="append",
+            dest="batch_sizes",
+            help=f"Tamaño de batch del throughput (repetible). Por defecto: {DEFAULT_BATCH_SIZES}.",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Ruta del informe JSON (por defecto benchmark_<host>_<fecha>.json).",
+        )
+        parser.add_argument(
+            "--no-isolate",
+            action="store_true",
+            help="Medir en este proceso (la carga en frío y el pico de RSS dejan de ser fiables).",
+        )
+
+    def handle(self, *args, **options):
+        models = [Path(m) for m in options["models"] or BUNDLED_MODELS]
+        for model_path in models:
+            if not model_path.exists():
+                raise CommandError(f"Modelo no encontrado en: {model_path}")
+        backends = options["backends"] or sorted(BACKENDS)
+        batch_sizes = sorted(set(options["batch_sizes"] or DEFAULT_BATCH_SIZES))
+        if batch_sizes[0] < 1 or options["repeats"] < 1:
+            raise CommandError("Los tamaños de batch y las repeticiones deben ser positivos")
+
+        sample_paths = find_sample_images(get_sample_directories(), limit=options["samples"])
+        if sample_paths:
+            samples = [path.read_bytes() for path in sample_paths]
+        else:
+            self.stdout.write("⚠️  Sin imágenes de análisis: se usa una imagen sintética")
+            samples = get_warmup_samples(limit=1)
+        self.stdout.write(f"🖼️  {len(samples)} imágenes de muestra")
+
+        report = run_benchmark(
+            models, backends, samples,
+            inference_mode=options["mode"],
+            backend_options={backend: get_backend_options(backend) for backend in backends},
+            repeats=options["repeats"],
+            batch_sizes=batch_sizes,
+            isolate=not options["no_isolate"],
+            progress=self._print_result,
+        )
+
+        output = Path(options["output"] or (
+            f"benchmark_{socket.gethostname()}_{datetime.now():%Y%m%d-%H%M%S}.json"
+        ))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+        self.stdout.write(self.style.SUCCESS(f"✅ Informe guardado en {output}"))
+
+        if any(result["status"] == "failed" for result in report["results"]):
+            raise CommandError("Alguna combinación falló; ver el informe")
+
+    def _print_result(self, result):
+        label = f"{Path(result['model']).name} [{result['backend']}/{result['inference_mode']}]"
+        if result["status"] == "skipped":
+            self.stdout.write(f"⏭️  {label}: omitido ({result['reason']})")
+            return
+        if result["status"] == "failed":
+            self.stdout.write(self.style.ERROR(f"❌ {label}: {result['error']}"))
+            return
+
+        cold = result["cold_start"]
+        self.stdout.write(f"📊 {label}")
+        self.stdout.write(
+            f"   Arranque en frío: {cold['total_ms']:.0f} ms (importación "
+            f"{cold['import_ms']:.0f} | carga {cold['load_ms']:.0f} | "
+            f"primera predicción {cold['first_predict_ms']:.0f})"
+        )
+        for key, name in (("preprocess", "Preprocesamiento"), ("forward", "Modelo"),
+                          ("end_to_end", "Completo")):
+            latency = result[key]
+            self.stdout.write(
+                f"   {name:<16} p50 {latency['p50_ms']:.3f} ms | "
+                f"p95 {latency['p95_ms']:.3f} ms | p99 {latency['p99_ms']:.3f} ms"
+            )
+        for batch_size, throughput in result["throughput"].items():
+            self.stdout.write(
+                f"   Batch {batch_size:>4}: {throughput['forward_images_per_s']:.0f} img/s "
+                f"(modelo) | {throughput['end_to_end_images_per_s']:.0f} img/s (completo)"
+            )
+        memory = result["memory"]
+        if memory["peak_rss_kb"] is not None:
+            self.stdout.write(f"   Pico de RSS: {memory['peak_rss_kb'] / 1024:.1f} MB")
+        if memory["uss_end_kb"] is not None:
+            self.stdout.write(
+                f"   Memoria única (USS): {memory['uss_start_kb'] / 1024:.1f} MB antes -> "
+                f"{memory['uss_end_kb'] / 1024:.1f} MB después "
+                f"(+{memory['uss_runtime_kb'] / 1024:.1f} MB runtime y modelo)"
+            )
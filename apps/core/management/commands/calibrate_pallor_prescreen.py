@@ -0,0 +1,210 @@
+"""
+Comando para calibrar la primera etapa por índice de palidez con los
+reportes guardados.
+
+Uso:
+    python manage.py calibrate_pallor_prescreen
+    python manage.py calibrate_pallor_prescreen --min-agreement 0.99 --holdout 0.25
+
+Para cada reporte se calcula el índice de palidez de su imagen y se toma
+como referencia el resultado de la CNN guardado en el reporte, solo si su
+``version_modelo`` es la del modelo actual sin la primera etapa. Los demás
+(evaluados con otro modelo, otra banda de TTA o con la cascada activa, que
+pudo resolverlos sin la CNN) se recalculan con el modelo. Los extremos del índice se calibran con una parte
+de los reportes y la coincidencia con la CNN sola se mide en el resto
+(partición determinista por id), y ambos datos se guardan en
+ANEMIA_PALLOR_CALIBRATION.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.core.models import ReporteAnemia
+from ml_models.anemia_detector import AnemiaDetector
+from ml_models.model_loader import get_detector_kwargs
+from ml_models.pallor import PallorPrescreen, calibrate_band, pallor_index
+from ml_models.prefetch import prefetch_batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Calibra con los reportes guardados la banda del índice de palidez "
+        "fuera de la cual no se ejecuta la CNN."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-agreement",
+            type=float,
+            default=0.98,
+            help="Coincidencia mínima con la CNN en cada extremo del índice.",
+        )
+        parser.add_argument(
+            "--min-support",
+            type=int,
+            default=30,
+            help="Reportes mínimos en cada extremo del índice.",
+        )
+        parser.add_argument(
+            "--holdout",
+            type=float,
+            default=0.2,
+            help="Fracción de reportes reservada para medir la coincidencia.",
+        )
+        parser.add_argument(
+            "--black-level",
+            type=int,
+            default=24,
+            help="Valor máximo de canal (0-255) considerado fondo del recorte.",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Archivo de calibración (por defecto ANEMIA_PALLOR_CALIBRATION).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=128,
+            help="Reportes por bloque.",
+        )
+        parser.add_argument(
+            "--fetch-workers",
+            type=int,
+            default=16,
+            help="Descargas y decodificaciones de imágenes en paralelo.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Número máximo de reportes a usar.",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options["holdout"] < 1:
+            raise CommandError("--holdout debe estar entre 0 y 1")
+        if options["batch_size"] < 1 or options["fetch_workers"] < 1:
+            raise CommandError("--batch-size y --fetch-workers deben ser positivos")
+
+        # Referencia: la CNN sola, sin la primera etapa
+        kwargs = get_detector_kwargs()
+        kwargs["pallor_calibration"] = None
+        detector = AnemiaDetector(**kwargs)
+
+        queryset = ReporteAnemia.objects.order_by("pk").only(
+            "pk", "paciente_id", "imagen_conjuntiva", "version_modelo", "probabilidad",
+        )
+        if options["limit"]:
+            queryset = queryset[:options["limit"]]
+
+        self.stdout.write("🎨 Calculando índices de palidez de los reportes guardados...")
+        pks, indices, probabilities = [], [], []
+        stats = {"missing_images": 0, "failed_images": 0, "recomputed": 0}
+        batch_size = options["batch_size"]
+        for batch in prefetch_batches(
+            queryset.iterator(chunk_size=batch_size), detector, default_storage,
+            batch_size=batch_size, workers=options["fetch_workers"],
+        ):
+            self._process(detector, batch, options, pks, indices, probabilities, stats)
+
+        if not pks:
+            raise CommandError("No hay reportes con imagen para calibrar")
+
+        pks = np.array(pks)
+        indices = np.array(indices)
+        probabilities = np.array(probabilities)
+        holdout = self._holdout_mask(pks, options["holdout"])
+
+        calibration = calibrate_band(
+            indices[~holdout], probabilities[~holdout],
+            threshold=detector.threshold,
+            min_agreement=options["min_agreement"],
+            min_support=options["min_support"],
+            black_level=options["black_level"],
+        )
+        calibration["holdout"] = PallorPrescreen(calibration).evaluate(
+            indices[holdout], probabilities[holdout], detector.threshold
+        )
+        calibration["reference_version"] = detector.model_version
+        calibration["calibrated_at"] = timezone.now().isoformat()
+
+        output = Path(options["output"] or settings.ANEMIA_PALLOR_CALIBRATION)
+        tmp_path = output.with_name(f".{output.name}.tmp")
+        tmp_path.write_text(json.dumps(calibration, indent=2), encoding="utf-8")
+        tmp_path.replace(output)
+
+        self._print_summary(calibration, stats, output, options["min_agreement"])
+
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _holdout_mask(pks, fraction):
+        """Partición determinista por id (hash multiplicativo de Knuth)."""
+        buckets = (pks.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+        return buckets < np.uint64(int(fraction * 2 ** 32))
+
+    def _process(self, detector, batch, options, pks, indices, probabilities, stats):
+        stats["missing_images"] += batch.missing
+        stats["failed_images"] += batch.failed
+        if not batch.valid:
+            return
+        reportes = batch.valid_items
+        images = batch.images
+        chunk_probabilities = np.array([r.probabilidad for r in reportes], dtype=np.float64)
+
+        # Reportes de otra versión (o de la cascada): se recalcula con la CNN
+        version = detector.model_version
+        stale = [j for j, reporte in enumerate(reportes) if reporte.version_modelo != version]
+        if stale:
+            recomputed, _ = detector.apply_tta(
+                images[stale], detector.predict_preprocessed(images[stale])
+            )
+            chunk_probabilities[stale] = recomputed
+            stats["recomputed"] += len(stale)
+
+        pks.extend(reporte.pk for reporte in reportes)
+        indices.extend(pallor_index(images, options["black_level"]))
+        probabilities.extend(chunk_probabilities)
+
+    def _print_summary(self, calibration, stats, output, min_agreement):
+        holdout = calibration["holdout"]
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Calibración guardada en {output} "
+            f"({calibration['cases']} reportes de calibración, "
+            f"{holdout['cases']} de validación)"
+        ))
+        for side, bound, sign in (("low", "max_index", "<="), ("high", "min_index", ">=")):
+            tail = calibration[side]
+            if tail is None:
+                self.stdout.write(f"   Extremo {side}: sin corte con la coincidencia pedida")
+                continue
+            self.stdout.write(
+                f"   Extremo {side}: índice {sign} {tail[bound]:.4f} -> "
+                f"{'anemia' if tail['has_anemia'] else 'sin anemia'} "
+                f"(p={tail['probability']:.3f}, {tail['support']} reportes, "
+                f"coincidencia {tail['agreement']:.1%})"
+            )
+        if holdout["agreement"] is None:
+            self.stdout.write("   Validación: ningún reporte se resuelve sin la CNN")
+        else:
+            self.stdout.write(
+                f"   Validación: {holdout['coverage']:.1%} resueltos sin la CNN, "
+                f"coincidencia con la CNN sola {holdout['agreement']:.1%}"
+            )
+            if holdout["agreement"] < min_agreement:
+                self.stdout.write(self.style.WARNING(
+                    "⚠️  La coincidencia medida está por debajo de --min-agreement: "
+                    "revise la calibración antes de activar la primera etapa"
+                ))
+        if stats["missing_images"] or stats["failed_images"] or stats["recomputed"]:
+            self.stdout.write(
+                f"   Imágenes no encontradas: {stats['missing_images']} | "
+                f"ilegibles: {stats['failed_images']} | "
+                f"referencias recalculadas con la CNN: {stats['recomputed']}"
+            )
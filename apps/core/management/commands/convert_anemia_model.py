@@ -0,0 +1,264 @@
+"""
+Comando para convertir el modelo de anemia (.h5) a TensorFlow Lite o a pesos
+mapeables en memoria.
+
+Uso:
+    python manage.py convert_anemia_model
+    python manage.py convert_anemia_model --model ml_models/best_model.h5 --samples 50
+    python manage.py convert_anemia_model --quantize int8 --model ml_models/best_model.h5
+    python manage.py convert_anemia_model --quantize int8 --calibration-fraction 0.3
+    python manage.py convert_anemia_model --format mmap
+    python manage.py convert_anemia_model --format numpy
+
+Con ``--format numpy`` no se genera ningún artefacto (el backend numpy lee el
+.h5 directamente): solo se verifica la paridad con Keras.
+"""
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml_models.anemia_detector import DEFAULT_THRESHOLD
+from ml_models.backends import (
+    INFERENCE_MODE_FLOAT,
+    INFERENCE_MODE_INT8,
+    MmapBackend,
+    NumpyBackend,
+    TFLiteBackend,
+)
+from ml_models.conversion import (
+    BUNDLED_MODELS,
+    build_quantization_report,
+    convert_to_shared_weights,
+    convert_to_tflite,
+    find_sample_images,
+    load_sample_batch,
+    split_sample_images,
+    verify_parity,
+)
+
+# Backend con el que se compara cada formato frente a Keras
+PARITY_BACKENDS = {
+    "tflite": TFLiteBackend,
+    "mmap": MmapBackend,
+    "numpy": NumpyBackend,
+}
+
+# Tolerancia por defecto de la diferencia de probabilidad según el modo
+DEFAULT_TOLERANCES = {
+    INFERENCE_MODE_FLOAT: 1e-4,
+    INFERENCE_MODE_INT8: 0.02,
+}
+
+
+def get_sample_directories():
+    """
+    Directorios con imágenes de análisis almacenadas localmente.
+
+    Returns:
+        list: Rutas de directorios candidatos
+    """
+    directories = [Path(settings.BASE_DIR) / "static" / "img" / "analysis"]
+    media_root = getattr(settings, "MEDIA_ROOT", None)
+    if media_root:
+        directories.append(Path(media_root) / "analysis")
+    return directories
+
+
+class Command(BaseCommand):
+    help = (
+        "Convierte los modelos .h5 de anemia a TensorFlow Lite (o a pesos "
+        "mapeables en memoria) y verifica la paridad de salidas sobre imágenes "
+        "de análisis almacenadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="Ruta a un modelo .h5 (repetible). Por defecto: todos los incluidos.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["tflite", "mmap", "numpy"],
+            default="tflite",
+            help=(
+                "Artefacto a generar: tflite (LiteRT), mmap (pesos compartidos "
+                "entre procesos para el backend mmap) o numpy (sin artefacto: "
+                "solo verifica la paridad del backend numpy)."
+            ),
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=100,
+            help="Número máximo de imágenes para verificar la paridad.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=None,
+            help=(
+                "Diferencia absoluta máxima permitida entre probabilidades "
+                "(por defecto 1e-4 en float y 0.02 en int8)."
+            ),
+        )
+        parser.add_argument(
+            "--quantize",
+            choices=[INFERENCE_MODE_INT8],
+            default=None,
+            help=(
+                "Genera la variante cuantizada post-entrenamiento, calibrada "
+                "con las imágenes de análisis almacenadas."
+            ),
+        )
+        parser.add_argument(
+            "--calibration-fraction",
+            type=float,
+            default=0.5,
+            help=(
+                "Fracción de las imágenes de muestra usada para calibrar int8; "
+                "el resto se reserva para evaluar la paridad."
+            ),
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help="Umbral de decisión para contar cambios de diagnóstico.",
+        )
+        parser.add_argument(
+            "--report",
+            default=None,
+            help=(
+                "Ruta del informe JSON de cuantización "
+                "(por defecto, junto al artefacto generado)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        models = [Path(m) for m in options["models"] or BUNDLED_MODELS]
+        inference_mode = options["quantize"] or INFERENCE_MODE_FLOAT
+        if options["format"] != "tflite" and inference_mode != INFERENCE_MODE_FLOAT:
+            raise CommandError(f"El formato {options['format']} solo admite el modo float")
+        tolerance = options["tolerance"]
+        if tolerance is None:
+            tolerance = DEFAULT_TOLERANCES[inference_mode]
+
+        sample_images = find_sample_images(
+            get_sample_directories(), limit=options["samples"]
+        )
+        if not sample_images:
+            raise CommandError(
+                "No se encontraron imágenes de análisis para verificar la paridad."
+            )
+        calibration_images = calibration_batch = None
+        if inference_mode == INFERENCE_MODE_INT8:
+            # Calibración y evaluación con imágenes distintas
+            try:
+                calibration_images, sample_images = split_sample_images(
+                    sample_images, options["calibration_fraction"]
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+            calibration_batch = load_sample_batch(calibration_images)
+            self.stdout.write(
+                f"🎯 {len(calibration_images)} imágenes de calibración cargadas"
+            )
+        sample_batch = load_sample_batch(sample_images)
+        self.stdout.write(f"🖼️  {len(sample_images)} imágenes de muestra cargadas")
+
+        failures = []
+        for h5_path in models:
+            if not h5_path.exists():
+                raise CommandError(f"Modelo no encontrado en: {h5_path}")
+
+            self.stdout.write(
+                f"🔄 Convirtiendo {h5_path} (formato: {options['format']}, "
+                f"modo: {inference_mode})..."
+            )
+            if options["format"] == "numpy":
+                artifact_path = h5_path
+            elif options["format"] == "mmap":
+                artifact_path = convert_to_shared_weights(h5_path)
+            else:
+                artifact_path = convert_to_tflite(
+                    h5_path, inference_mode=inference_mode,
+                    calibration_batch=calibration_batch,
+                )
+
+            size_h5 = h5_path.stat().st_size / 1024
+            size_artifact = artifact_path.stat().st_size / 1024
+            self.stdout.write(
+                f"   Artefacto: {artifact_path} ({size_h5:.1f} KB -> {size_artifact:.1f} KB)"
+            )
+
+            if inference_mode == INFERENCE_MODE_INT8:
+                report = self._write_quantization_report(
+                    h5_path, artifact_path, calibration_images, sample_images,
+                    sample_batch, tolerance, options,
+                )
+                parity = report["parity"]
+            else:
+                parity = verify_parity(
+                    h5_path, artifact_path, sample_batch,
+                    tolerance=tolerance, threshold=options["threshold"],
+                    backend_class=PARITY_BACKENDS[options["format"]],
+                )
+
+            self.stdout.write(
+                f"   Diferencia máx: {parity['max_abs_diff']:.2e} | "
+                f"media: {parity['mean_abs_diff']:.2e} | "
+                f"cambios de diagnóstico: {parity['threshold_flips']}"
+            )
+
+            if parity["passed"]:
+                self.stdout.write(self.style.SUCCESS("   ✅ Paridad verificada"))
+            else:
+                self.stdout.write(self.style.ERROR("   ❌ Paridad fuera de tolerancia"))
+                failures.append(str(h5_path))
+
+        if failures:
+            raise CommandError(
+                f"La verificación de paridad falló para: {', '.join(failures)}"
+            )
+
+    def _write_quantization_report(self, h5_path, int8_path, calibration_images,
+                                   sample_images, sample_batch, tolerance, options):
+        """
+        Genera y guarda el informe comparativo del modelo int8 frente al float.
+
+        La paridad se mide solo con ``sample_images``, las imágenes reservadas
+        que no se usaron para calibrar.
+
+        Returns:
+            dict: Informe de cuantización
+        """
+        report = build_quantization_report(
+            h5_path, int8_path, sample_batch,
+            tolerance=tolerance, threshold=options["threshold"],
+        )
+        report["calibration_images"] = len(calibration_images)
+        report["evaluation_images"] = len(sample_images)
+        report["calibration_fraction"] = options["calibration_fraction"]
+        for flipped in report["parity"]["flipped_samples"]:
+            flipped["image"] = str(sample_images[flipped["index"]])
+
+        for key, stats in report["models"].items():
+            latency = stats["latency"]
+            self.stdout.write(
+                f"   {key:<13} p50: {latency['p50_ms']:.3f} ms | "
+                f"p95: {latency['p95_ms']:.3f} ms | "
+                f"carga: {stats['load_ms']:.0f} ms | "
+                f"tamaño: {stats['size_kb']:.1f} KB"
+            )
+
+        report_path = Path(
+            options["report"] or int8_path.with_name(f"{int8_path.stem}_report.json")
+        )
+        report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        self.stdout.write(f"   Informe: {report_path}")
+
+        return report
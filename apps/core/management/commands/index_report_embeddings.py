@@ -0,0 +1,133 @@
+"""
+Comando para calcular los embeddings de la penúltima capa de los reportes
+guardados y añadirlos al almacén de casos similares.
+
+Uso:
+    python manage.py index_report_embeddings
+    python manage.py index_report_embeddings --rebuild
+
+Solo se procesan los reportes que aún no están en el almacén
+(ANEMIA_EMBEDDING_STORE_DIR), por bloques: las imágenes de cada bloque se
+descargan y decodifican en paralelo mientras el anterior pasa por el modelo,
+y sus embeddings se añaden al final de la matriz sin reescribirla. Si el
+almacén se generó con otro modelo hay que reconstruirlo con ``--rebuild``.
+"""
+import time
+
+import numpy as np
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.models import ReporteAnemia
+from ml_models.anemia_detector import AnemiaDetector
+from ml_models.model_loader import get_detector_kwargs, get_embedding_store
+from ml_models.prefetch import prefetch_batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Añade al almacén de casos similares los embeddings de los reportes "
+        "que aún no están indexados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Vaciar el almacén e indexar de nuevo todos los reportes.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=128,
+            help="Reportes por bloque (una pasada del modelo y una adición).",
+        )
+        parser.add_argument(
+            "--fetch-workers",
+            type=int,
+            default=16,
+            help="Descargas y decodificaciones de imágenes en paralelo.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Número máximo de reportes a indexar.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1 or options["fetch_workers"] < 1:
+            raise CommandError("--batch-size y --fetch-workers deben ser positivos")
+
+        kwargs = get_detector_kwargs()
+        kwargs["pallor_calibration"] = None
+        detector = AnemiaDetector(**kwargs)
+        if not detector.backend.supports_embedding:
+            raise CommandError(
+                f"El backend '{detector.backend.name}' no expone embeddings; "
+                f"use ANEMIA_INFERENCE_BACKEND keras, numpy o mmap"
+            )
+        detector.load_model()
+        version = detector.embedding_version
+        store = get_embedding_store()
+        if options["rebuild"]:
+            store.reset()
+        elif len(store) and store.model_version != version:
+            raise CommandError(
+                f"El almacén {store.directory} contiene embeddings de "
+                f"{store.model_version}; el modelo actual es {version}. "
+                f"Use --rebuild para reconstruirlo"
+            )
+
+        # Los ya indexados se descartan en Python: la lista de ids puede ser
+        # demasiado grande para un ``exclude(pk__in=...)``
+        indexed = store.indexed_ids()
+        queryset = ReporteAnemia.objects.order_by("pk").only("pk", "paciente_id", "imagen_conjuntiva")
+
+        self.stdout.write(f"🧬 Indexando embeddings de reportes con {version}...")
+        stats = {"indexed": 0, "missing_images": 0, "failed_images": 0}
+        start = time.perf_counter()
+        batch_size = options["batch_size"]
+        # Mientras un bloque pasa por el modelo, el siguiente se descarga
+        for batch in prefetch_batches(
+            self._pending_reports(queryset, indexed, options["limit"]), detector,
+            default_storage, batch_size=batch_size, workers=options["fetch_workers"],
+        ):
+            self._process(detector, store, batch, version, stats)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['indexed']} reportes indexados en {elapsed:.1f} s "
+            f"({len(store)} filas en {store.directory})"
+        ))
+        if stats["missing_images"] or stats["failed_images"]:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  Imágenes no encontradas: {stats['missing_images']} | "
+                f"ilegibles: {stats['failed_images']} (se reintentan en la próxima ejecución)"
+            ))
+
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _pending_reports(queryset, indexed, limit):
+        """Reportes sin embedding, en orden de id."""
+        yielded = 0
+        for reporte in queryset.iterator(chunk_size=2000):
+            position = np.searchsorted(indexed, reporte.pk)
+            if position < len(indexed) and indexed[position] == reporte.pk:
+                continue
+            yield reporte
+            yielded += 1
+            if limit and yielded >= limit:
+                return
+
+    def _process(self, detector, store, batch, version, stats):
+        stats["missing_images"] += batch.missing
+        stats["failed_images"] += batch.failed
+        if batch.valid:
+            _, embeddings = detector.predict_scores(batch.images, return_embedding=True)
+            store.append([reporte.pk for reporte in batch.valid_items], embeddings, version)
+            stats["indexed"] += len(batch.valid)
+        self.stdout.write(
+            f"   Hasta el reporte {batch.items[-1].pk}: {stats['indexed']} indexados"
+        )
@@ -0,0 +1,25 @@
+"""
+Comando para eliminar los análisis pendientes abandonados.
+
+Uso:
+    python manage.py purge_pending_analyses
+
+Pensado para ejecutarse periódicamente (cron); analyze_image también purga
+los expirados en cada subida.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.core.models import AnalisisPendiente
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina los análisis pendientes cuya fecha de expiración ya pasó "
+        "(imágenes analizadas cuyo reporte nunca se guardó)."
+    )
+
+    def handle(self, *args, **options):
+        eliminados = AnalisisPendiente.purgar_expirados()
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Análisis pendientes expirados eliminados: {eliminados}")
+        )
@@ -0,0 +1,306 @@
+"""
+Comando para recalcular los resultados de los reportes guardados con el
+modelo actual.
+
+Uso:
+    python manage.py rescore_anemia_reports --dry-run --diff-output diferencias.csv
+    python manage.py rescore_anemia_reports
+    python manage.py rescore_anemia_reports --model ml_models/model_anemia.h5 --resume
+
+Los reportes se recorren por id con ``iterator()``; las imágenes de cada
+bloque se descargan de storage y se decodifican en paralelo mientras el
+bloque anterior pasa por el modelo, y los resultados se escriben con
+``bulk_update`` junto con la versión del modelo. Los reportes que ya tienen
+la versión actual se omiten, y ``--resume`` continúa desde el último bloque
+confirmado según el archivo de progreso.
+"""
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.core.models import ReporteAnemia
+from ml_models.anemia_detector import AnemiaDetector
+from ml_models.model_loader import get_detector_kwargs
+from ml_models.prefetch import prefetch_batches
+
+# Campos recalculados en cada reporte
+RESCORED_FIELDS = [
+    "tiene_anemia",
+    "probabilidad",
+    "confianza",
+    "nivel_confianza",
+    "grado_palidez",
+    "sospecha_diagnostica",
+    "version_modelo",
+    "reevaluado_en",
+]
+
+# Textos de sospecha generados automáticamente (los editados se conservan)
+AUTOMATIC_DIAGNOSES = ("Anemia detectada", "No se detectó anemia")
+
+DIFF_COLUMNS = [
+    "id", "paciente_id", "imagen", "version_anterior",
+    "probabilidad_anterior", "probabilidad_nueva",
+    "tiene_anemia_anterior", "tiene_anemia_nueva",
+    "nivel_confianza_anterior", "nivel_confianza_nueva",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula probabilidad, confianza y diagnóstico de los reportes de "
+        "anemia guardados con el modelo actual, por bloques y de forma reanudable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            default=None,
+            help="Modelo .h5 con el que recalcular (por defecto ANEMIA_MODEL_PATH).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=128,
+            help="Reportes por bloque (una pasada del modelo y un bulk_update).",
+        )
+        parser.add_argument(
+            "--fetch-workers",
+            type=int,
+            default=16,
+            help="Descargas y decodificaciones de imágenes en paralelo.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo calcular y reportar las diferencias, sin escribir.",
+        )
+        parser.add_argument(
+            "--diff-output",
+            default=None,
+            help="CSV con los reportes cuyo diagnóstico o probabilidad cambian.",
+        )
+        parser.add_argument(
+            "--min-diff",
+            type=float,
+            default=1e-4,
+            help="Diferencia de probabilidad a partir de la cual un reporte cuenta como cambiado.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Recalcular también los reportes que ya tienen la versión actual.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continuar tras el último bloque confirmado en el archivo de progreso.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=None,
+            help="Archivo de progreso (por defecto rescore_checkpoint.json en BASE_DIR).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Número máximo de reportes a procesar.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1 or options["fetch_workers"] < 1:
+            raise CommandError("--batch-size y --fetch-workers deben ser positivos")
+
+        kwargs = get_detector_kwargs()
+        # Los reportes se recalculan siempre con la CNN (``_process`` no pasa
+        # por la primera etapa por palidez), que además sirve para calibrarla
+        kwargs["pallor_calibration"] = None
+        if options["model"]:
+            kwargs["model_path"] = options["model"]
+        detector = AnemiaDetector(**kwargs)
+        detector.load_model()
+        version = detector.model_version
+        dry_run = options["dry_run"]
+
+        checkpoint_path = Path(
+            options["checkpoint"] or Path(settings.BASE_DIR) / "rescore_checkpoint.json"
+        )
+        stats = self._new_stats()
+        last_id = None
+        if options["resume"]:
+            checkpoint = self._read_checkpoint(checkpoint_path)
+            if checkpoint is None:
+                self.stdout.write("⚠️  Sin archivo de progreso: se empieza desde el principio")
+            elif checkpoint["version"] != version or checkpoint["dry_run"] != dry_run:
+                raise CommandError(
+                    f"El progreso en {checkpoint_path} es de otra ejecución "
+                    f"(versión {checkpoint['version']}, dry_run={checkpoint['dry_run']})"
+                )
+            else:
+                last_id = checkpoint["last_id"]
+                stats = checkpoint["stats"]
+                self.stdout.write(f"⏩ Reanudando tras el reporte {last_id}")
+
+        queryset = ReporteAnemia.objects.order_by("pk").only(
+            "pk", "paciente_id", "imagen_conjuntiva", "version_modelo",
+            "tiene_anemia", "probabilidad", "confianza", "nivel_confianza",
+            "grado_palidez", "sospecha_diagnostica",
+        )
+        if not options["force"]:
+            queryset = queryset.exclude(version_modelo=version)
+        if last_id is not None:
+            queryset = queryset.filter(pk__gt=last_id)
+        if options["limit"]:
+            queryset = queryset[:options["limit"]]
+
+        self.stdout.write(
+            f"🔄 Recalculando reportes con {version}"
+            f"{' (simulación)' if dry_run else ''}..."
+        )
+
+        diff_file = open(options["diff_output"], "a" if last_id else "w", newline="",
+                         encoding="utf-8") if options["diff_output"] else None
+        diff_writer = csv.writer(diff_file) if diff_file else None
+        if diff_writer and not last_id:
+            diff_writer.writerow(DIFF_COLUMNS)
+
+        start = time.perf_counter()
+        batch_size = options["batch_size"]
+        try:
+            # Mientras un bloque pasa por el modelo, el siguiente se descarga
+            for batch in prefetch_batches(
+                queryset.iterator(chunk_size=batch_size), detector, default_storage,
+                batch_size=batch_size, workers=options["fetch_workers"],
+            ):
+                self._process(detector, batch, version, dry_run, options,
+                              stats, diff_writer, checkpoint_path)
+        finally:
+            if diff_file:
+                diff_file.close()
+
+        elapsed = time.perf_counter() - start
+        self._print_summary(stats, elapsed, dry_run, options["diff_output"])
+
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _new_stats():
+        return {
+            "processed": 0,
+            "updated": 0,
+            "changed": 0,
+            "diagnosis_flips": 0,
+            "missing_images": 0,
+            "failed_images": 0,
+            "sum_abs_diff": 0.0,
+            "max_abs_diff": 0.0,
+        }
+
+    def _process(self, detector, batch, version, dry_run, options,
+                 stats, diff_writer, checkpoint_path):
+        stats["missing_images"] += batch.missing
+        stats["failed_images"] += batch.failed
+
+        results = []
+        if batch.valid:
+            images = batch.images
+            probabilities, _ = detector.apply_tta(images, detector.predict_preprocessed(images))
+            results = detector.build_results(probabilities)
+
+        now = timezone.now()
+        to_update = []
+        for reporte, result in zip(batch.valid_items, results):
+            diff = abs(result["probability"] - reporte.probabilidad)
+            flipped = result["has_anemia"] != reporte.tiene_anemia
+            stats["processed"] += 1
+            stats["sum_abs_diff"] += diff
+            stats["max_abs_diff"] = max(stats["max_abs_diff"], diff)
+            if flipped:
+                stats["diagnosis_flips"] += 1
+            if flipped or diff >= options["min_diff"]:
+                stats["changed"] += 1
+                if diff_writer:
+                    diff_writer.writerow([
+                        reporte.pk, reporte.paciente_id, reporte.imagen_conjuntiva,
+                        reporte.version_modelo,
+                        f"{reporte.probabilidad:.6f}", f"{result['probability']:.6f}",
+                        reporte.tiene_anemia, result["has_anemia"],
+                        reporte.nivel_confianza, result["confidence_level"],
+                    ])
+
+            if dry_run:
+                continue
+            reporte.tiene_anemia = result["has_anemia"]
+            reporte.probabilidad = result["probability"]
+            reporte.confianza = result["confidence"]
+            reporte.nivel_confianza = result["confidence_level"]
+            reporte.grado_palidez = ReporteAnemia.calcular_grado_palidez(
+                result["has_anemia"], result["probability"]
+            )
+            if reporte.sospecha_diagnostica in AUTOMATIC_DIAGNOSES:
+                reporte.sospecha_diagnostica = result["diagnosis"]
+            reporte.version_modelo = version
+            reporte.reevaluado_en = now
+            to_update.append(reporte)
+
+        if to_update:
+            ReporteAnemia.objects.bulk_update(to_update, RESCORED_FIELDS)
+            stats["updated"] += len(to_update)
+
+        self._write_checkpoint(checkpoint_path, {
+            "version": version,
+            "dry_run": dry_run,
+            "last_id": batch.items[-1].pk,
+            "stats": stats,
+            "updated_at": timezone.now().isoformat(),
+        })
+        self.stdout.write(
+            f"   Hasta el reporte {batch.items[-1].pk}: {stats['processed']} procesados, "
+            f"{stats['changed']} con cambios ({stats['diagnosis_flips']} de diagnóstico)"
+        )
+
+    @staticmethod
+    def _read_checkpoint(path):
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_checkpoint(path, data):
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def _print_summary(self, stats, elapsed, dry_run, diff_output):
+        processed = stats["processed"]
+        mean_diff = stats["sum_abs_diff"] / processed if processed else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {processed} reportes recalculados en {elapsed:.1f} s "
+                f"({processed / elapsed if elapsed else 0:.0f} reportes/s)"
+            )
+        )
+        self.stdout.write(
+            f"   Con cambios: {stats['changed']} | cambios de diagnóstico: "
+            f"{stats['diagnosis_flips']} | diferencia media: {mean_diff:.4f} | "
+            f"máxima: {stats['max_abs_diff']:.4f}"
+        )
+        if stats["missing_images"] or stats["failed_images"]:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  Imágenes no encontradas: {stats['missing_images']} | "
+                f"ilegibles: {stats['failed_images']} (se reintentan en la próxima ejecución)"
+            ))
+        if dry_run:
+            self.stdout.write("   Simulación: no se modificó ningún reporte")
+        else:
+            self.stdout.write(f"   Reportes actualizados: {stats['updated']}")
+        if diff_output:
+            self.stdout.write(f"   Diferencias: {diff_output}")
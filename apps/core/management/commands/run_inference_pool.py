@@ -0,0 +1,79 @@
+"""
+Comando para arrancar el pool de procesos de inferencia del modelo de anemia.
+
+Uso:
+    python manage.py run_inference_pool
+    python manage.py run_inference_pool --workers 4 --address /run/anemia/inference.sock
+
+Los procesos web lo usan cuando ANEMIA_INFERENCE_POOL_ENABLED=True.
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from ml_models.model_loader import get_detector_kwargs, get_inference_pool_config
+from ml_models.runtime_profile import get_runtime_value
+from ml_models.worker_pool import InferencePoolServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Arranca un número fijo de procesos con el modelo de anemia cargado "
+        "que atienden a los procesos web mediante memoria compartida."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Número de procesos de inferencia (por defecto ANEMIA_INFERENCE_POOL_WORKERS).",
+        )
+        parser.add_argument(
+            "--address",
+            default=None,
+            help="Ruta del socket Unix (por defecto ANEMIA_INFERENCE_POOL_ADDRESS).",
+        )
+        parser.add_argument(
+            "--max-batch-size",
+            type=int,
+            default=None,
+            help=(
+                "Imágenes máximas agrupadas en una pasada de cada proceso "
+                "(por defecto la del perfil de ejecución o 32)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        pool_config = get_inference_pool_config()
+        address = options["address"] or pool_config["address"]
+        workers = options["workers"] or pool_config["workers"]
+        detector_kwargs = get_detector_kwargs()
+
+        server = InferencePoolServer(
+            address,
+            pool_config["authkey"],
+            num_workers=workers,
+            detector_kwargs=detector_kwargs,
+            max_batch_size=get_runtime_value(options["max_batch_size"], "batch_max_size", 32),
+        )
+
+        self.stdout.write(
+            f"🚀 Iniciando pool de inferencia: {workers} procesos "
+            f"(backend: {detector_kwargs['backend']})..."
+        )
+        server.start()
+
+        def shutdown(signum, frame):
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Pool escuchando en {address}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stdout.write("🛑 Deteniendo pool de inferencia...")
+            server.stop()
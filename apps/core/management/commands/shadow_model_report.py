@@ -0,0 +1,104 @@
+"""
+Comando para revisar la evaluación en sombra del modelo candidato.
+
+Uso:
+    python manage.py shadow_model_report
+    python manage.py shadow_model_report --days 7 --disagreements 20
+
+Resume por versión candidata las comparaciones guardadas en
+EvaluacionSombra: tasa de coincidencia del diagnóstico, diferencias de
+probabilidad y latencias de ambos modelos.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Q
+from django.db.models.functions import Abs
+from django.utils import timezone
+
+from apps.core.models import EvaluacionSombra
+from ml_models.profiling import summarize_latencies
+
+
+class Command(BaseCommand):
+    help = (
+        "Resume las comparaciones entre el modelo principal y el candidato "
+        "registradas por la evaluación en sombra."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Solo comparaciones de los últimos N días (por defecto, todas).",
+        )
+        parser.add_argument(
+            "--disagreements",
+            type=int,
+            default=10,
+            help="Número de discrepancias de diagnóstico a listar por versión.",
+        )
+
+    def handle(self, *args, **options):
+        evaluaciones = EvaluacionSombra.objects.all()
+        if options["days"]:
+            evaluaciones = evaluaciones.filter(
+                creado_en__gte=timezone.now() - timedelta(days=options["days"])
+            )
+
+        resumen = (
+            evaluaciones.values("version_candidata", "version_principal")
+            .annotate(
+                total=Count("id"),
+                coincidencias=Count("id", filter=Q(coinciden=True)),
+                diferencia_media=Avg("diferencia"),
+                diferencia_abs_media=Avg(Abs("diferencia")),
+            )
+            .order_by("version_candidata", "version_principal")
+        )
+        if not resumen:
+            self.stdout.write("No hay evaluaciones en sombra registradas.")
+            return
+
+        for fila in resumen:
+            grupo = evaluaciones.filter(
+                version_candidata=fila["version_candidata"],
+                version_principal=fila["version_principal"],
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"🔍 {fila['version_candidata']} frente a {fila['version_principal']}"
+                )
+            )
+            self.stdout.write(
+                f"   Comparaciones: {fila['total']} | coincidencia: "
+                f"{fila['coincidencias'] / fila['total'] * 100:.1f}% | diferencia media: "
+                f"{fila['diferencia_media']:+.4f} | |diferencia| media: "
+                f"{fila['diferencia_abs_media']:.4f}"
+            )
+            principal = summarize_latencies(
+                [v for v in grupo.values_list("latencia_principal_ms", flat=True) if v is not None]
+            )
+            candidata = summarize_latencies(
+                list(grupo.values_list("latencia_candidata_ms", flat=True))
+            )
+            self.stdout.write(
+                f"   Latencia principal: {self._format_latency(principal)} | "
+                f"candidata: {self._format_latency(candidata)}"
+            )
+
+            discrepancias = grupo.filter(coinciden=False).order_by("-creado_en")
+            for evaluacion in discrepancias[:options["disagreements"]]:
+                self.stdout.write(
+                    f"   ⚠️  {evaluacion.creado_en:%Y-%m-%d %H:%M} "
+                    f"paciente {evaluacion.paciente_id} {evaluacion.imagen}: "
+                    f"{evaluacion.probabilidad_principal:.4f} -> "
+                    f"{evaluacion.probabilidad_candidata:.4f}"
+                )
+
+    @staticmethod
+    def _format_latency(stats):
+        if stats["p50_ms"] is None:
+            return "sin datos"
+        return f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms"
@@ -0,0 +1,130 @@
+"""
+Comando para cambiar en caliente el modelo de anemia que sirven los workers.
+
+Uso:
+    python manage.py swap_anemia_model --model ml_models/model_anemia.h5
+    python manage.py swap_anemia_model --model ml_models/best_model.h5 --wait 60
+    python manage.py swap_anemia_model --status
+
+El candidato se carga y calienta primero en este proceso; si es válido se
+publica en ANEMIA_MODEL_REGISTRY_DIR y cada worker lo carga en segundo plano
+y lo activa sin interrumpir las solicitudes en curso.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml_models.model_loader import get_model_registry, validate_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Publica una nueva versión del modelo de anemia para que todos los "
+        "workers la carguen, calienten y activen sin tiempo de inactividad."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            default=None,
+            help="Ruta del modelo a servir (por defecto ANEMIA_MODEL_PATH).",
+        )
+        parser.add_argument(
+            "--no-validate",
+            action="store_true",
+            help="Publicar sin cargar ni calentar antes el modelo en este proceso.",
+        )
+        parser.add_argument(
+            "--wait",
+            type=float,
+            default=0,
+            help="Segundos de espera a que todos los workers activos apliquen el cambio.",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Solo mostrar la versión que sirve cada worker.",
+        )
+
+    def handle(self, *args, **options):
+        registry = get_model_registry()
+        if registry.status_dir is None:
+            raise CommandError(
+                "ANEMIA_MODEL_REGISTRY_DIR está vacío: no hay forma de avisar a los workers"
+            )
+
+        if options["status"]:
+            self._print_workers(registry.read_workers(), registry.read_target())
+            return
+
+        if getattr(settings, "ANEMIA_INFERENCE_POOL_ENABLED", False):
+            raise CommandError(
+                "Con ANEMIA_INFERENCE_POOL_ENABLED el modelo lo cargan los procesos "
+                "del pool: reinicie run_inference_pool con el nuevo modelo"
+            )
+
+        model_path = options["model"] or settings.ANEMIA_MODEL_PATH
+
+        if not options["no_validate"]:
+            self.stdout.write(f"🔍 Validando {model_path}...")
+            try:
+                validation = validate_model(model_path)
+            except Exception as e:
+                raise CommandError(f"El modelo candidato no es válido: {e}")
+            warmup = validation["warmup"]
+            self.stdout.write(
+                f"   Versión {validation['version']}: calentamiento de "
+                f"{warmup['samples']} imágenes x {warmup['rounds']} en "
+                f"{warmup['warmup_ms']:.0f} ms"
+            )
+
+        target = registry.publish(model_path)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Versión publicada (generación {target['generation']}): {model_path}"
+            )
+        )
+
+        if options["wait"] > 0:
+            self._wait_for_workers(registry, target, options["wait"])
+
+    def _wait_for_workers(self, registry, target, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            workers = registry.read_workers()
+            pending = [
+                worker for worker in workers
+                if worker.get("applied_generation") != target["generation"]
+                or (worker.get("last_swap") or {}).get("state") == "loading"
+            ]
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(1)
+
+        self._print_workers(workers, target)
+        if pending:
+            raise CommandError(
+                f"{len(pending)} worker(s) no aplicaron el cambio en {timeout:.0f} s "
+                "(los workers inactivos lo aplican en su siguiente solicitud)"
+            )
+
+    def _print_workers(self, workers, target):
+        if target:
+            self.stdout.write(
+                f"Versión deseada: {target['model_path']} (generación {target['generation']})"
+            )
+        if not workers:
+            self.stdout.write("No hay workers registrados.")
+            return
+
+        for worker in workers:
+            active = worker.get("active") or {}
+            last_swap = worker.get("last_swap") or {}
+            line = f"   {worker['worker']}: {active.get('version', 'sin cargar')}"
+            if last_swap:
+                line += f" (último intercambio: {last_swap.get('state')}"
+                if last_swap.get("error"):
+                    line += f", error: {last_swap['error']}"
+                line += ")"
+            self.stdout.write(line)
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_reporteanemia_confianza_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalisisPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('imagen', models.CharField(max_length=255, verbose_name='Imagen')),
+                ('ruta_storage', models.CharField(max_length=500, verbose_name='Ruta en Storage')),
+                ('version_modelo', models.CharField(max_length=100, verbose_name='Versión del Modelo')),
+                ('tiene_anemia', models.BooleanField(verbose_name='Tiene Anemia')),
+                ('probabilidad', models.FloatField(verbose_name='Probabilidad')),
+                ('confianza', models.FloatField(verbose_name='Confianza')),
+                ('nivel_confianza', models.CharField(max_length=50, verbose_name='Nivel de Confianza')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('expira_en', models.DateTimeField(db_index=True, verbose_name='Expira En')),
+                ('creado_por', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Creado Por')),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analisis_pendientes', to='core.paciente', verbose_name='Paciente')),
+            ],
+            options={
+                'verbose_name': 'Análisis Pendiente',
+                'verbose_name_plural': 'Análisis Pendientes',
+                'ordering': ['-creado_en'],
+                'constraints': [models.UniqueConstraint(fields=('paciente', 'imagen'), name='analisis_pendiente_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_analisispendiente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporteanemia',
+            name='reevaluado_en',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Reevaluado En'),
+        ),
+        migrations.AddField(
+            model_name='reporteanemia',
+            name='version_modelo',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100, verbose_name='Versión del Modelo'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_reporteanemia_version_modelo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvaluacionSombra',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('imagen', models.CharField(max_length=255, verbose_name='Imagen')),
+                ('version_principal', models.CharField(max_length=100, verbose_name='Versión Principal')),
+                ('version_candidata', models.CharField(db_index=True, max_length=100, verbose_name='Versión Candidata')),
+                ('probabilidad_principal', models.FloatField(verbose_name='Probabilidad Principal')),
+                ('probabilidad_candidata', models.FloatField(verbose_name='Probabilidad Candidata')),
+                ('diferencia', models.FloatField(verbose_name='Diferencia (candidata - principal)')),
+                ('coinciden', models.BooleanField(verbose_name='Diagnósticos Coinciden')),
+                ('latencia_principal_ms', models.FloatField(blank=True, null=True, verbose_name='Latencia Principal (ms)')),
+                ('latencia_candidata_ms', models.FloatField(verbose_name='Latencia Candidata (ms)')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('paciente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='evaluaciones_sombra', to='core.paciente', verbose_name='Paciente')),
+            ],
+            options={
+                'verbose_name': 'Evaluación en Sombra',
+                'verbose_name_plural': 'Evaluaciones en Sombra',
+                'ordering': ['-creado_en'],
+            },
+        ),
+    ]
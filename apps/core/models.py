@@ -1,4 +1,8 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from apps.security.models import CustomUser
 
 
@@ -91,6 +95,14 @@ class ReporteAnemia(models.Model):
     probabilidad = models.FloatField(verbose_name="Probabilidad")
     confianza = models.FloatField(verbose_name="Confianza")
     nivel_confianza = models.CharField(max_length=50, verbose_name="Nivel de Confianza")
+    # Versión del modelo que calculó los resultados ("" = anterior a este campo)
+    version_modelo = models.CharField(
+        max_length=100, blank=True, default="", db_index=True,
+        verbose_name="Versión del Modelo",
+    )
+    reevaluado_en = models.DateTimeField(
+        null=True, blank=True, verbose_name="Reevaluado En"
+    )
 
     creado_por = models.ForeignKey(
         CustomUser, on_delete=models.SET_NULL, null=True, verbose_name="Creado Por"
@@ -104,6 +116,21 @@ class ReporteAnemia(models.Model):
         verbose_name_plural = "Reportes de Anemia"
         ordering = ["-fecha_analisis"]
 
+    @staticmethod
+    def calcular_grado_palidez(tiene_anemia, probabilidad):
+        """Grado de palidez derivado del resultado del modelo."""
+        if not tiene_anemia:
+            return ReporteAnemia.GradoPalidezChoices.NINGUNA
+        if probabilidad >= 0.8:
+            return ReporteAnemia.GradoPalidezChoices.SEVERA
+        if probabilidad >= 0.6:
+            return ReporteAnemia.GradoPalidezChoices.MODERADA
+        return ReporteAnemia.GradoPalidezChoices.LEVE
+
+    def get_storage_path(self):
+        """Ruta de la imagen conjuntiva dentro de storage."""
+        return f"analysis/{self.paciente_id}/{self.imagen_conjuntiva}"
+
     def get_imagen_url(self):
         """Retorna la URL completa de la imagen conjuntiva"""
         if self.imagen_conjuntiva:
@@ -118,3 +145,145 @@ class ReporteAnemia(models.Model):
 
     def __str__(self):
         return f"Reporte de {self.paciente.nombre_completo} - {self.fecha_analisis}"
+
+
+class AnalisisPendiente(models.Model):
+    """
+    Resultado de inferencia calculado al subir una imagen, pendiente de que
+    el médico guarde el reporte. Evita repetir la descarga de la imagen y la
+    inferencia en la página de resultados y que el reporte dependa de las
+    probabilidades enviadas por el navegador.
+    """
+
+    paciente = models.ForeignKey(
+        Paciente,
+        on_delete=models.CASCADE,
+        related_name="analisis_pendientes",
+        verbose_name="Paciente",
+    )
+    imagen = models.CharField(max_length=255, verbose_name="Imagen")
+    ruta_storage = models.CharField(max_length=500, verbose_name="Ruta en Storage")
+    version_modelo = models.CharField(max_length=100, verbose_name="Versión del Modelo")
+
+    tiene_anemia = models.BooleanField(verbose_name="Tiene Anemia")
+    probabilidad = models.FloatField(verbose_name="Probabilidad")
+    confianza = models.FloatField(verbose_name="Confianza")
+    nivel_confianza = models.CharField(max_length=50, verbose_name="Nivel de Confianza")
+
+    creado_por = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, verbose_name="Creado Por"
+    )
+    creado_en = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    expira_en = models.DateTimeField(db_index=True, verbose_name="Expira En")
+
+    class Meta:
+        verbose_name = "Análisis Pendiente"
+        verbose_name_plural = "Análisis Pendientes"
+        ordering = ["-creado_en"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["paciente", "imagen"], name="analisis_pendiente_unico"
+            )
+        ]
+
+    @staticmethod
+    def calcular_expiracion():
+        """Fecha de expiración para un análisis creado ahora."""
+        horas = getattr(settings, "ANEMIA_PENDING_ANALYSIS_TTL_HOURS", 24)
+        return timezone.now() + timedelta(hours=horas)
+
+    @classmethod
+    def vigentes(cls):
+        """Análisis pendientes que aún no han expirado."""
+        return cls.objects.filter(expira_en__gt=timezone.now())
+
+    @classmethod
+    def purgar_expirados(cls):
+        """
+        Elimina los análisis abandonados cuya fecha de expiración ya pasó.
+
+        Returns:
+            int: Número de registros eliminados
+        """
+        eliminados, _ = cls.objects.filter(expira_en__lte=timezone.now()).delete()
+        return eliminados
+
+    def como_resultado(self):
+        """Resultado con el mismo formato que ``AnemiaDetector.predict``."""
+        return {
+            "has_anemia": self.tiene_anemia,
+            "probability": self.probabilidad,
+            "confidence": self.confianza,
+            "diagnosis": (
+                "Anemia detectada" if self.tiene_anemia else "No se detectó anemia"
+            ),
+            "confidence_level": self.nivel_confianza,
+        }
+
+    def __str__(self):
+        return f"Análisis pendiente de {self.paciente.nombre_completo} - {self.imagen}"
+
+
+class EvaluacionSombra(models.Model):
+    """
+    Comparación entre el modelo principal y el modelo candidato sobre una
+    imagen analizada, registrada por la evaluación en sombra
+    (ANEMIA_SHADOW_MODEL_PATH) para revisar el candidato antes de servirlo.
+    """
+
+    paciente = models.ForeignKey(
+        Paciente,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="evaluaciones_sombra",
+        verbose_name="Paciente",
+    )
+    imagen = models.CharField(max_length=255, verbose_name="Imagen")
+    version_principal = models.CharField(max_length=100, verbose_name="Versión Principal")
+    version_candidata = models.CharField(
+        max_length=100, db_index=True, verbose_name="Versión Candidata"
+    )
+
+    probabilidad_principal = models.FloatField(verbose_name="Probabilidad Principal")
+    probabilidad_candidata = models.FloatField(verbose_name="Probabilidad Candidata")
+    diferencia = models.FloatField(verbose_name="Diferencia (candidata - principal)")
+    coinciden = models.BooleanField(verbose_name="Diagnósticos Coinciden")
+
+    latencia_principal_ms = models.FloatField(
+        null=True, blank=True, verbose_name="Latencia Principal (ms)"
+    )
+    latencia_candidata_ms = models.FloatField(verbose_name="Latencia Candidata (ms)")
+    creado_en = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+
+    class Meta:
+        verbose_name = "Evaluación en Sombra"
+        verbose_name_plural = "Evaluaciones en Sombra"
+        ordering = ["-creado_en"]
+
+    @classmethod
+    def registrar(cls, comparacion):
+        """
+        Guarda una comparación de ``ShadowEvaluator``.
+
+        Args:
+            comparacion (dict): Comparación con paciente_id e imagen en el contexto
+
+        Returns:
+            EvaluacionSombra: Registro creado
+        """
+        return cls.objects.create(
+            paciente_id=comparacion.get("paciente_id"),
+            imagen=comparacion.get("imagen", ""),
+            version_principal=comparacion["primary_version"] or "desconocida",
+            version_candidata=comparacion["candidate_version"],
+            probabilidad_principal=comparacion["primary_probability"],
+            probabilidad_candidata=comparacion["candidate_probability"],
+            diferencia=comparacion["delta"],
+            coinciden=comparacion["agree"],
+            latencia_principal_ms=comparacion["primary_latency_ms"],
+            latencia_candidata_ms=comparacion["candidate_latency_ms"],
+        )
+
+    def __str__(self):
+        return f"{self.version_candidata} vs {self.version_principal} - {self.imagen}"
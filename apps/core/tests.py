@@ -1,6 +1,53 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.core.exceptions import ValidationError
+from apps.core.management.commands.calibrate_pallor_prescreen import Command as CalibratePallorCommand
+from apps.core.models import AnalisisPendiente, EvaluacionSombra, Paciente, ReporteAnemia
 from apps.core.validators import validate_ecuadorian_cedula
+from ml_models.anemia_detector import AnemiaDetector
+from ml_models.async_inference import AsyncInferenceExecutor, InferenceOverloadedError
+from ml_models.augmentation import TestTimeAugmenter
+from ml_models.autotune import candidate_configurations, select_best
+from ml_models.backends import MmapBackend, NumpyBackend, TFLiteBackend, create_backend
+from ml_models.batching import MicroBatchScheduler
+from ml_models.benchmark import _throughput, run_benchmark
+from ml_models.buffer_pool import TensorBufferPool
+from ml_models.cache import CachingDetector, InferenceCache
+from ml_models.conversion import convert_to_tflite, find_sample_images, load_sample_batch, split_sample_images, verify_parity
+from ml_models.embedding_store import EmbeddingStore
+from ml_models.numpy_engine import NumpyModel, pool2d, read_h5_model
+from ml_models.pallor import PallorPrescreen, calibrate_band, pallor_index
+from ml_models.prefetch import prefetch_batches
+from ml_models.preprocessing import ImagePreprocessor
+from ml_models.quality import QUALITY_MESSAGES, ImageQualityGate
+from ml_models import model_loader
+from ml_models.registry import ModelRegistry
+from ml_models.runtime_profile import get_runtime_value, load_runtime_profile, save_runtime_profile
+from ml_models.shadow import ShadowEvaluator
+from ml_models.shared_weights import export_shared_weights
+from ml_models.worker_pool import IMAGE_NBYTES, IMAGE_SHAPE, _run_tasks
 
 
 class CedulaValidatorTests(TestCase):
@@ -21,3 +68,1077 @@ class CedulaValidatorTests(TestCase):
 		# Mismo prefijo pero último dígito alterado
 		with self.assertRaises(ValidationError):
 			validate_ecuadorian_cedula('1710034064')
+
+
+class _FakeDetector:
+	"""Detector mínimo: la probabilidad es el valor medio de la imagen."""
+	threshold = 0.5
+
+	def __init__(self):
+		self.batch_sizes = []
+		self.buffer_pool = TensorBufferPool()
+
+	def acquire_input(self, count):
+		return self.buffer_pool.acquire(count)
+
+	def release_input(self, img_batch):
+		self.buffer_pool.release(img_batch)
+
+	def preprocess_into(self, value, out):
+		out.fill(value)
+		return out
+
+	def prescreen(self, img_batch):
+		return {}
+
+	def finish_prediction(self, img_array, probability, members=None):
+		return self.build_result(probability)
+
+	def predict_scores(self, img_batch):
+		self.batch_sizes.append(len(img_batch))
+		return img_batch.reshape(len(img_batch), -1).mean(axis=1)
+
+	def combine_scores(self, scores):
+		return scores, None
+
+	predict_preprocessed = predict_scores
+
+	def build_result(self, probability):
+		return {'probability': probability, 'has_anemia': probability >= self.threshold}
+
+
+class _BlockingDetector:
+	"""Detector cuyas predicciones esperan a que se libere ``gate``."""
+
+	def __init__(self):
+		self.gate = threading.Event()
+		self.started = threading.Event()
+		self.calls = []
+
+	def predict(self, image, return_probability=False):
+		self.started.set()
+		self.gate.wait(5)
+		self.calls.append(image)
+		return {'probability': image / 10}
+
+
+class _CountingDetector:
+	"""Detector que cuenta las predicciones reales."""
+	threshold = 0.5
+	model_version = 'test-v1'
+
+	def __init__(self):
+		self.calls = 0
+
+	def predict(self, image):
+		self.calls += 1
+		return {'probability': len(image) / 100, 'has_anemia': False}
+
+
+class MicroBatchSchedulerTests(TestCase):
+	def test_concurrent_requests_share_forward_pass(self):
+		detector = _FakeDetector()
+		scheduler = MicroBatchScheduler(detector, max_batch_size=8, max_wait_ms=200)
+		values = [i / 10 for i in range(8)]
+		results = {}
+
+		def worker(value):
+			results[value] = scheduler.predict(value)['probability']
+
+		threads = [threading.Thread(target=worker, args=(v,)) for v in values]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		scheduler.stop()
+
+		for value in values:
+			self.assertAlmostEqual(results[value], value, places=5)
+		self.assertLess(len(detector.batch_sizes), len(values))
+		self.assertEqual(sum(detector.batch_sizes), len(values))
+		self.assertEqual(detector.buffer_pool.get_stats()['in_use'], 0)
+
+	def test_delegates_detector_attributes(self):
+		scheduler = MicroBatchScheduler(_FakeDetector())
+		self.assertEqual(scheduler.threshold, 0.5)
+
+
+class AnemiaDetectorResultTests(TestCase):
+	def test_vectorized_results_match_scalar_results(self):
+		detector = AnemiaDetector()
+		probabilities = np.array([0.0, 0.05, 0.3, 0.45, 0.5, 0.62, 0.8, 0.95, 1.0], dtype=np.float32)
+		vectorized = detector.build_results(probabilities)
+		scalar = [detector.build_result(float(p)) for p in probabilities]
+		self.assertEqual(len(vectorized), len(scalar))
+		for v, s in zip(vectorized, scalar):
+			self.assertEqual(v['has_anemia'], s['has_anemia'])
+			self.assertEqual(v['confidence_level'], s['confidence_level'])
+			self.assertAlmostEqual(v['confidence'], s['confidence'], places=6)
+
+
+class ImagePreprocessorTests(TestCase):
+	def _jpeg(self, width=1280, height=960):
+		x = np.linspace(0, 255, width, dtype=np.float32)
+		y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+		pixels = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+			np.full((height, width), 128.0)], axis=-1).astype(np.uint8)
+		buffer = BytesIO()
+		Image.fromarray(pixels).save(buffer, 'JPEG', quality=90)
+		return buffer.getvalue()
+
+	def test_fast_decode_matches_full_decode(self):
+		data = self._jpeg()
+		fast = ImagePreprocessor().preprocess(data)
+		full = ImagePreprocessor(fast_decode=False).preprocess(data)
+		self.assertEqual(fast.shape, (64, 64, 3))
+		self.assertEqual(fast.dtype, np.float32)
+		self.assertLess(float(np.abs(fast - full).mean()), 0.01)
+
+	def test_preprocess_writes_into_given_buffer(self):
+		out = np.zeros((64, 64, 3), dtype=np.float32)
+		result = ImagePreprocessor().preprocess(self._jpeg(320, 240), out)
+		self.assertIs(result, out)
+		self.assertTrue(0.0 <= out.min() and out.max() <= 1.0)
+
+
+class TestTimeAugmentationTests(TestCase):
+	def test_views_are_built_in_one_tensor(self):
+		augmenter = TestTimeAugmenter()
+		image = np.random.default_rng(0).random((64, 64, 3), dtype=np.float32)
+		views = np.empty((augmenter.num_views, 64, 64, 3), dtype=np.float32)
+		augmenter.augment_into(image, views)
+		np.testing.assert_array_equal(views[0], image)
+		np.testing.assert_array_equal(views[1], image[:, ::-1])
+		self.assertLessEqual(float(views.max()), 1.0)
+
+	def test_only_uncertain_images_are_augmented(self):
+		detector = AnemiaDetector(tta_band=0.1)
+		batch = np.zeros((3, 64, 64, 3), dtype=np.float32)
+		calls = []
+
+		def predict_fn(views):
+			calls.append(len(views))
+			return np.linspace(0.4, 0.6, len(views))
+
+		probabilities, tta = detector.apply_tta(batch, np.array([0.05, 0.48, 0.97]), predict_fn)
+		self.assertEqual(calls, [detector.augmenter.num_views])
+		self.assertEqual(list(tta), [1])
+		self.assertAlmostEqual(probabilities[1], 0.5)
+		self.assertEqual(probabilities[0], 0.05)
+		self.assertGreater(tta[1]['spread'], 0.0)
+
+
+class InferenceBackendTests(TestCase):
+	def test_tflite_backend_uses_tflite_artifact(self):
+		backend = create_backend('tflite', 'ml_models/best_model.h5')
+		self.assertIsInstance(backend, TFLiteBackend)
+		self.assertEqual(backend.model_path.suffix, '.tflite')
+
+	def test_int8_mode_uses_quantized_artifact(self):
+		backend = create_backend('tflite', 'ml_models/best_model.h5', inference_mode='int8')
+		self.assertEqual(backend.model_path.name, 'best_model_int8.tflite')
+
+	def test_keras_backend_rejects_int8_mode(self):
+		with self.assertRaises(ValueError):
+			create_backend('keras', 'ml_models/best_model.h5', inference_mode='int8')
+
+	def test_unknown_backend_raises(self):
+		with self.assertRaises(ValueError):
+			create_backend('desconocido', 'ml_models/best_model.h5')
+
+	def test_keras_serving_fn_matches_predict_and_routes_large_batches(self):
+		backend = create_backend('keras', 'ml_models/best_model.h5', offline_batch_size=4)
+		backend.load()
+		batch = np.random.default_rng(2).random((3, 64, 64, 3), dtype=np.float32)
+		reference = backend.model.predict(batch, verbose=0).reshape(-1)
+		with mock.patch.object(backend, 'predict_offline', wraps=backend.predict_offline) as offline:
+			np.testing.assert_allclose(backend.predict(batch), reference, atol=1e-6)
+			offline.assert_not_called()
+			backend.predict(np.concatenate([batch, batch[:1]]))
+		self.assertEqual(offline.call_args[0][0].shape[0], 4)
+
+	def test_mmap_backend_runs_on_shared_read_only_weights(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			artifact = export_shared_weights('ml_models/best_model.h5', f'{tmp}/best_model.weights')
+			backend = create_backend('mmap', artifact)
+			self.assertIsInstance(backend, MmapBackend)
+			backend.load()
+
+			weights = backend.model.weights
+			self.assertTrue(all(not w.flags.writeable for w in weights.values()))
+			self.assertEqual(backend.get_info()['total_params'], 54569)
+			batch = np.random.default_rng(0).random((3, 64, 64, 3), dtype=np.float32)
+			reference = NumpyModel(*read_h5_model('ml_models/best_model.h5')).predict(batch)
+			np.testing.assert_allclose(backend.predict(batch), reference.reshape(-1), atol=1e-6)
+
+	def test_numpy_backend_matches_keras_without_artifact(self):
+		images = find_sample_images([Path('static/img/analysis')], limit=8)
+		random_batch = np.random.default_rng(1).random((24, 64, 64, 3), dtype=np.float32)
+		# 32 imágenes: se procesan en varios bloques del motor NumPy
+		batch = np.concatenate([load_sample_batch(images), random_batch])
+		parity = verify_parity(
+			'ml_models/best_model.h5', 'ml_models/best_model.h5', batch,
+			tolerance=1e-5, backend_class=NumpyBackend,
+		)
+		self.assertTrue(parity['passed'], parity)
+		self.assertEqual(parity['threshold_flips'], 0)
+
+		x = random_batch[:2]
+		np.testing.assert_allclose(
+			pool2d(x, (2, 2), reducer=np.mean),
+			x.reshape(2, 32, 2, 32, 2, 3).mean(axis=(2, 4)), rtol=1e-6,
+		)
+
+	def test_int8_calibration_and_evaluation_images_are_disjoint(self):
+		images = [Path(f'img_{i:02d}.jpg') for i in range(10)]
+		calibration, evaluation = split_sample_images(images, 0.3)
+		self.assertEqual((len(calibration), len(evaluation)), (3, 7))
+		self.assertFalse(set(calibration) & set(evaluation))
+		self.assertEqual(sorted(calibration + evaluation), images)
+		self.assertEqual(split_sample_images(images, 0.3), (calibration, evaluation))
+		calibration, evaluation = split_sample_images(images[:2], 0.9)
+		self.assertEqual((len(calibration), len(evaluation)), (1, 1))
+		with self.assertRaises(ValueError):
+			split_sample_images(images[:1], 0.5)
+
+
+class RuntimeAutotuneTests(TestCase):
+	def test_candidates_never_oversubscribe_cores(self):
+		candidates = candidate_configurations(8, backend='keras')
+		self.assertTrue(all(c['replicas'] * c['intra_op_threads'] <= 8 for c in candidates))
+		self.assertIn({'replicas': 8, 'intra_op_threads': 1, 'inter_op_threads': 1}, candidates)
+		self.assertEqual({c['inter_op_threads'] for c in candidate_configurations(4, 'tflite')}, {1})
+
+	def test_select_best_respects_latency_budget(self):
+		results = [
+			{'replicas': 1, 'batches': {'8': {'images_per_s': 500, 'p99_ms': 20}}},
+			{'replicas': 4, 'batches': {'32': {'images_per_s': 900, 'p99_ms': 150}}},
+			{'replicas': 2, 'error': 'fallo'},
+		]
+		best, batch_size = select_best(results, max_p99_ms=50)
+		self.assertEqual((best['replicas'], batch_size), (1, 8))
+		best, batch_size = select_best(results, max_p99_ms=200)
+		self.assertEqual((best['replicas'], batch_size), (4, 32))
+
+	def test_explicit_setting_overrides_profile(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			path = f"{tmp}/perfil.json"
+			save_runtime_profile({'backend': 'keras', 'intra_op_threads': 2, 'batch_max_size': 8}, path)
+			profile = load_runtime_profile(path)
+		self.assertEqual(get_runtime_value(0, 'batch_max_size', 16, profile=profile), 8)
+		self.assertEqual(get_runtime_value(32, 'batch_max_size', 16, profile=profile), 32)
+		self.assertEqual(get_runtime_value(0, 'replicas', 3, profile=profile), 3)
+		self.assertIsNone(
+			get_runtime_value(0, 'intra_op_threads', profile=profile, backend='tflite')
+		)
+
+
+class AsyncInferenceExecutorTests(TestCase):
+	def test_rejects_when_queue_is_full(self):
+		detector = _BlockingDetector()
+		executor = AsyncInferenceExecutor(detector, max_workers=1, max_pending=1, queue_timeout=0.05)
+
+		async def scenario():
+			first = asyncio.ensure_future(executor.apredict(1))
+			await asyncio.sleep(0.01)
+			with self.assertRaises(InferenceOverloadedError):
+				await executor.apredict(2)
+			detector.gate.set()
+			return await first
+
+		self.assertEqual(asyncio.run(scenario()), {'probability': 0.1})
+		stats = executor.get_stats()
+		self.assertEqual((stats['rejected'], stats['completed'], stats['in_flight']), (1, 1, 0))
+		executor.shutdown()
+
+	def test_max_pending_is_shared_across_event_loops(self):
+		# Bajo WSGI cada solicitud ejecuta apredict en su propio bucle
+		detector = _BlockingDetector()
+		executor = AsyncInferenceExecutor(detector, max_workers=2, max_pending=1, queue_timeout=0.05)
+		first = threading.Thread(target=asyncio.run, args=(executor.apredict(1),))
+		first.start()
+		self.assertTrue(detector.started.wait(5))
+		with self.assertRaises(InferenceOverloadedError):
+			asyncio.run(executor.apredict(2))
+
+		# Un hueco liberado desde otro bucle admite al que espera
+		executor.queue_timeout = 5
+		threading.Timer(0.05, detector.gate.set).start()
+		self.assertEqual(asyncio.run(executor.apredict(3)), {'probability': 0.3})
+		first.join(5)
+		executor.shutdown()
+		stats = executor.get_stats()
+		self.assertEqual((stats['rejected'], stats['completed'], stats['in_flight']), (1, 2, 0))
+		self.assertEqual(detector.calls, [1, 3])
+
+	def test_cancelled_job_that_has_not_started_never_runs(self):
+		detector = _BlockingDetector()
+		executor = AsyncInferenceExecutor(detector, max_workers=1, max_pending=4)
+
+		async def scenario():
+			first = asyncio.ensure_future(executor.apredict(1))
+			second = asyncio.ensure_future(executor.apredict(2))
+			await asyncio.get_running_loop().run_in_executor(None, detector.started.wait, 5)
+			second.cancel()
+			await asyncio.sleep(0.01)
+			detector.gate.set()
+			await first
+			with self.assertRaises(asyncio.CancelledError):
+				await second
+
+		asyncio.run(scenario())
+		executor.shutdown()
+		self.assertEqual(detector.calls, [1])
+		stats = executor.get_stats()
+		self.assertEqual((stats['cancelled_queued'], stats['in_flight']), (1, 0))
+
+	def test_apredict_batch_keeps_order_across_chunks(self):
+		detector = _BlockingDetector()
+		detector.gate.set()
+		executor = AsyncInferenceExecutor(detector, max_workers=3)
+		results = asyncio.run(executor.apredict_batch(range(7), batch_size=3))
+		executor.shutdown()
+		self.assertEqual([r['probability'] for r in results], [i / 10 for i in range(7)])
+
+
+class InferenceBenchmarkTests(TestCase):
+	def test_missing_artifact_and_unsupported_mode_are_skipped(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			report = run_benchmark(
+				[f"{tmp}/modelo.h5"], ['tflite', 'keras'], [b''], inference_mode='int8',
+			)
+		statuses = [result['status'] for result in report['results']]
+		self.assertEqual(statuses, ['skipped', 'skipped'])
+		self.assertIn('modelo_int8.tflite', report['results'][0]['reason'])
+		self.assertEqual(report['parameters']['inference_mode'], 'int8')
+		self.assertIn('cpu_count', report['environment'])
+
+	def test_throughput_counts_images_per_round(self):
+		calls = []
+		stats = _throughput(lambda: calls.append(1), images=4, min_seconds=0.0, min_rounds=3)
+		self.assertEqual(stats['rounds'], 3)
+		self.assertEqual(len(calls), 4)
+		self.assertGreater(stats['images_per_s'], 0)
+
+
+class InferencePoolWorkerTests(TestCase):
+	def test_worker_reads_tensors_from_shared_memory(self):
+		segments = []
+		tasks = []
+		for request_id, values in enumerate([[0.2], [0.4, 0.9]]):
+			shm = SharedMemory(create=True, size=len(values) * IMAGE_NBYTES)
+			segments.append(shm)
+			view = np.ndarray((len(values), *IMAGE_SHAPE), dtype=np.float32, buffer=shm.buf)
+			for i, value in enumerate(values):
+				view[i] = value
+			del view
+			tasks.append((request_id, shm.name, len(values)))
+
+		detector = _FakeDetector()
+		results = queue.Queue()
+		try:
+			_run_tasks(detector, tasks, results)
+		finally:
+			for shm in segments:
+				# El worker anula el registro del segmento; volver a registrarlo
+				# para que unlink() no deje un aviso en el resource_tracker
+				resource_tracker.register(shm._name, 'shared_memory')
+				shm.close()
+				shm.unlink()
+
+		responses = {}
+		while not results.empty():
+			kind, request_id, payload = results.get()
+			self.assertEqual(kind, 'result')
+			responses[request_id] = payload
+		np.testing.assert_allclose(responses[0], [0.2], rtol=1e-6)
+		np.testing.assert_allclose(responses[1], [0.4, 0.9], rtol=1e-6)
+		self.assertEqual(detector.batch_sizes, [3])
+
+
+class InferenceCacheTests(TestCase):
+	def test_repeated_image_skips_inference(self):
+		inner = _CountingDetector()
+		detector = CachingDetector(inner, InferenceCache(max_entries=4))
+		first = detector.predict(b'imagen-a')
+		second = detector.predict(b'imagen-a')
+		self.assertEqual(first, second)
+		self.assertEqual(inner.calls, 1)
+		stats = detector.get_stats()['cache']
+		self.assertEqual(stats['memory_hits'], 1)
+		self.assertEqual(stats['misses'], 1)
+
+	def test_key_depends_on_model_version_and_threshold(self):
+		key = InferenceCache.make_key(b'imagen', 'v1', 0.5)
+		self.assertNotEqual(key, InferenceCache.make_key(b'imagen', 'v2', 0.5))
+		self.assertNotEqual(key, InferenceCache.make_key(b'imagen', 'v1', 0.6))
+
+	def test_lru_evicts_oldest_entry(self):
+		cache = InferenceCache(max_entries=2)
+		for name in ('a', 'b', 'c'):
+			cache.set(name, {'probability': 0.1})
+		self.assertIsNone(cache.get('a'))
+		self.assertIsNotNone(cache.get('c'))
+		self.assertEqual(cache.get_stats()['memory_evictions'], 1)
+
+
+class AnalisisPendienteTests(TestCase):
+	def setUp(self):
+		self.paciente = Paciente.objects.create(
+			id='Pac-1', nombre='Ana', apellido='Pérez', dni='0102030405',
+			correo='ana@example.com', sexo='F'
+		)
+
+	def _crear(self, imagen, expira_en):
+		return AnalisisPendiente.objects.create(
+			paciente=self.paciente, imagen=imagen, ruta_storage=f'analysis/Pac-1/{imagen}',
+			version_modelo='test-v1', tiene_anemia=True, probabilidad=0.82,
+			confianza=0.82, nivel_confianza='Alta', expira_en=expira_en
+		)
+
+	def test_como_resultado_matches_detector_format(self):
+		pendiente = self._crear('a.jpg', AnalisisPendiente.calcular_expiracion())
+		result = pendiente.como_resultado()
+		self.assertEqual(result['probability'], 0.82)
+		self.assertEqual(result['diagnosis'], 'Anemia detectada')
+		self.assertEqual(result['confidence_level'], 'Alta')
+
+	def test_purgar_expirados_keeps_current_analyses(self):
+		self._crear('vigente.jpg', AnalisisPendiente.calcular_expiracion())
+		self._crear('expirado.jpg', timezone.now() - timedelta(minutes=1))
+		self.assertEqual(AnalisisPendiente.purgar_expirados(), 1)
+		self.assertEqual(
+			list(AnalisisPendiente.vigentes().values_list('imagen', flat=True)), ['vigente.jpg']
+		)
+
+	def test_save_without_pending_rescores_instead_of_trusting_the_form(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		user = get_user_model().objects.create_user(email='medico@example.com', password='clave-segura-1')
+		self.client.force_login(user)
+		buffer = BytesIO()
+		Image.new('RGB', (128, 128), (0, 0, 0)).save(buffer, format='JPEG')
+		detector = _mean_detector()
+		# Valores inventados por el navegador: anemia al 99 %
+		form = {
+			'paciente_id': 'Pac-1', 'observaciones': '-', 'interpretacion': '-',
+			'recomendaciones': '-', 'tiene_anemia': 'true', 'probabilidad': '99',
+			'confianza': '99', 'nivel_confianza': 'Alta',
+		}
+
+		with override_settings(MEDIA_ROOT=tmp.name), \
+				mock.patch.object(model_loader, 'get_anemia_detector', return_value=detector):
+			default_storage.save('analysis/Pac-1/negra.jpg', ContentFile(buffer.getvalue()))
+			for image_filename in ('perdida.jpg', '../Pac-2/negra.jpg'):
+				response = self.client.post('/analysis/save/', {**form, 'image_filename': image_filename})
+				self.assertEqual(response.status_code, 422)
+			self.assertFalse(ReporteAnemia.objects.exists())
+
+			response = self.client.post('/analysis/save/', {**form, 'image_filename': 'negra.jpg'})
+		self.assertTrue(response.json()['success'])
+		reporte = ReporteAnemia.objects.get()
+		self.assertFalse(reporte.tiene_anemia)
+		self.assertLess(reporte.probabilidad, 0.1)
+		self.assertNotEqual(reporte.nivel_confianza, 'Alta')
+		self.assertEqual(reporte.version_modelo, detector.model_version)
+
+
+class _MeanBackend:
+	"""Backend sin TensorFlow: la probabilidad es el valor medio de la imagen."""
+	name = 'media'
+	model = object()
+	model_path = Path('ml_models/best_model.h5')
+
+	def load(self):
+		pass
+
+	def predict(self, img_batch):
+		return img_batch.reshape(len(img_batch), -1).mean(axis=1)
+
+	def get_info(self):
+		return {'input_shape': (None, 64, 64, 3), 'output_shape': (None, 1)}
+
+
+def _mean_detector(**kwargs):
+	detector = AnemiaDetector()
+	detector.backend = _MeanBackend()
+	return detector
+
+
+class RescoreReportsCommandTests(TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmp.cleanup)
+		media = override_settings(MEDIA_ROOT=self.tmp.name)
+		media.enable()
+		self.addCleanup(media.disable)
+		patcher = mock.patch(
+			'apps.core.management.commands.rescore_anemia_reports.AnemiaDetector', _mean_detector
+		)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+		paciente = Paciente.objects.create(
+			id='Pac-1', nombre='Ana', apellido='Pérez', dni='0102030405',
+			correo='ana@example.com', sexo='F'
+		)
+		self.reportes = {}
+		for imagen, color in (('blanca.jpg', 255), ('negra.jpg', 0), ('perdida.jpg', None)):
+			if color is not None:
+				buffer = BytesIO()
+				Image.new('RGB', (128, 128), (color,) * 3).save(buffer, format='JPEG')
+				default_storage.save(f'analysis/Pac-1/{imagen}', ContentFile(buffer.getvalue()))
+			self.reportes[imagen] = ReporteAnemia.objects.create(
+				paciente=paciente, fecha_analisis=date.today(), imagen_conjuntiva=imagen,
+				observaciones_clinicas='-', interpretacion_preliminar='-', grado_palidez='Ninguna',
+				sospecha_diagnostica='No se detectó anemia', recomendaciones='-',
+				tiene_anemia=False, probabilidad=0.3, confianza=0.7, nivel_confianza='Baja'
+			)
+
+	def _run(self, *args):
+		call_command(
+			'rescore_anemia_reports', '--checkpoint', f'{self.tmp.name}/progreso.json',
+			*args, stdout=StringIO()
+		)
+
+	def test_rescore_updates_results_and_model_version(self):
+		self._run('--batch-size', '2')
+		blanca = ReporteAnemia.objects.get(imagen_conjuntiva='blanca.jpg')
+		self.assertTrue(blanca.tiene_anemia)
+		self.assertEqual(blanca.grado_palidez, 'Severa')
+		self.assertEqual(blanca.sospecha_diagnostica, 'Anemia detectada')
+		self.assertTrue(blanca.version_modelo.startswith('best_model-'))
+		self.assertIsNotNone(blanca.reevaluado_en)
+		perdida = ReporteAnemia.objects.get(imagen_conjuntiva='perdida.jpg')
+		self.assertEqual((perdida.version_modelo, perdida.probabilidad), ('', 0.3))
+
+	def test_prefetch_reports_missing_and_unreadable_images(self):
+		default_storage.save('analysis/Pac-1/rota.jpg', ContentFile(b'no es una imagen'))
+		rota = ReporteAnemia(paciente_id='Pac-1', imagen_conjuntiva='rota.jpg')
+		detector = _mean_detector()
+		reportes = [self.reportes['blanca.jpg'], self.reportes['perdida.jpg'], rota]
+		batches = list(prefetch_batches(reportes * 2, detector, default_storage, batch_size=3))
+		self.assertEqual([b.errors for b in batches], [[None, 'missing', 'failed']] * 2)
+		self.assertEqual(batches[0].valid_items, [self.reportes['blanca.jpg']])
+		self.assertEqual(detector.buffer_pool.get_stats()['in_use'], 0)
+		# Cerrar el recorrido antes de tiempo también devuelve los tensores
+		for _ in prefetch_batches(reportes * 3, detector, default_storage, batch_size=3):
+			break
+		self.assertEqual(detector.buffer_pool.get_stats()['in_use'], 0)
+
+	def test_dry_run_only_reports_diffs(self):
+		diff_path = f'{self.tmp.name}/diferencias.csv'
+		self._run('--dry-run', '--diff-output', diff_path)
+		self.assertFalse(ReporteAnemia.objects.exclude(version_modelo='').exists())
+		with open(diff_path, encoding='utf-8') as diff_file:
+			rows = diff_file.read().splitlines()
+		self.assertEqual(len(rows), 3)
+		self.assertIn('blanca.jpg', rows[1])
+
+
+class ShadowEvaluatorTests(TestCase):
+	def test_sampled_requests_are_compared_with_candidate(self):
+		comparisons = []
+		shadow = ShadowEvaluator(_mean_detector, sample_rate=1.0)
+		self.addCleanup(shadow.shutdown)
+		white = np.full((64, 64, 3), 255, dtype=np.uint8)
+		primary = {'has_anemia': False, 'probability': 0.25}
+		self.assertTrue(shadow.submit(
+			white, primary, primary_version='principal', primary_latency_ms=12.0,
+			callback=comparisons.append, context={'imagen': 'a.jpg'}
+		))
+		self.assertTrue(shadow.flush(timeout=10))
+
+		comparison = comparisons[0]
+		self.assertFalse(comparison['agree'])
+		self.assertAlmostEqual(comparison['delta'], 0.75, places=4)
+		self.assertTrue(comparison['candidate_version'].startswith('best_model-'))
+		stats = shadow.get_stats()
+		self.assertEqual((stats['evaluated'], stats['agreement_rate']), (1, 0.0))
+
+		evaluacion = EvaluacionSombra.registrar(comparison)
+		self.assertEqual((evaluacion.imagen, evaluacion.version_principal), ('a.jpg', 'principal'))
+		self.assertFalse(evaluacion.coinciden)
+
+	def test_jobs_are_dropped_instead_of_competing_with_primary(self):
+		factory = mock.Mock()
+		shadow = ShadowEvaluator(factory, sample_rate=1.0, max_pending=1,
+								 is_busy=lambda: True, max_defer=0.05)
+		self.addCleanup(shadow.shutdown)
+		primary = {'has_anemia': False, 'probability': 0.25}
+		self.assertTrue(shadow.submit(b'a', primary))
+		self.assertFalse(shadow.submit(b'b', primary))
+		self.assertTrue(shadow.flush(timeout=10))
+
+		stats = shadow.get_stats()
+		self.assertEqual((stats['dropped_queue_full'], stats['dropped_busy']), (1, 1))
+		factory.assert_not_called()
+		self.assertFalse(ShadowEvaluator(factory, sample_rate=0.0).submit(b'c', primary))
+
+
+class _VersionedDetector:
+	def __init__(self, model_path):
+		self.model_version = model_path or 'configurado'
+		self.retired = False
+
+
+class ModelRegistryTests(TestCase):
+	def _registry(self, builder=_VersionedDetector, warmup=None, status_dir=None):
+		return ModelRegistry(
+			builder, warmup=warmup, retire=lambda detector: setattr(detector, 'retired', True),
+			status_dir=status_dir, retire_grace=0
+		)
+
+	def test_swap_serves_previous_version_until_candidate_is_ready(self):
+		release = threading.Event()
+
+		def builder(model_path):
+			if model_path == 'nuevo.h5':
+				release.wait(5)
+			return _VersionedDetector(model_path)
+
+		registry = self._registry(builder)
+		previous = registry.get_detector()
+		self.assertTrue(registry.swap('nuevo.h5'))
+		self.assertFalse(registry.swap('otro.h5'))
+		self.assertIs(registry.get_detector(), previous)
+
+		release.set()
+		while registry.is_swapping():
+			threading.Event().wait(0.01)
+		self.assertEqual(registry.get_detector().model_version, 'nuevo.h5')
+		threading.Event().wait(0.05)
+		self.assertTrue(previous.retired)
+
+	def test_failed_warmup_keeps_active_version(self):
+		def warmup(detector):
+			if detector.model_version == 'roto.h5':
+				raise ValueError('probabilidad inválida')
+			return {'samples': 1}
+
+		registry = self._registry(warmup=warmup)
+		active = registry.get_detector()
+		registry.swap('roto.h5', wait=True)
+		self.assertIs(registry.get_detector(), active)
+		self.assertEqual(registry.get_status()['last_swap']['state'], 'failed')
+
+	def test_published_target_reaches_other_workers(self):
+		with tempfile.TemporaryDirectory() as status_dir:
+			publisher = self._registry(status_dir=status_dir)
+			worker = self._registry(status_dir=status_dir)
+			worker.get_detector()
+
+			target = publisher.publish('nuevo.h5')
+			worker.sync(force=True)
+			while worker.is_swapping():
+				threading.Event().wait(0.01)
+
+			self.assertEqual(worker.get_detector().model_version, 'nuevo.h5')
+			statuses = publisher.read_workers()
+			self.assertEqual(len(statuses), 1)
+			self.assertEqual(statuses[0]['applied_generation'], target['generation'])
+			self.assertEqual(statuses[0]['active']['version'], 'nuevo.h5')
+
+
+class PreloadModeTests(TestCase):
+	def test_unknown_mode_is_rejected(self):
+		with self.assertRaises(ValueError):
+			model_loader.preload_for_server('eager')
+
+	def test_off_mode_defers_loading(self):
+		model_loader.preload_for_server('off')
+		status = model_loader.get_preload_status()
+		self.assertEqual(status['mode'], 'off')
+		self.assertFalse(status['ready'])
+
+
+class HealthEndpointsTests(TestCase):
+	def test_metadata_is_read_without_tensorflow(self):
+		script = (
+			"import sys; from ml_models.metadata import read_model_metadata; "
+			"info = read_model_metadata('ml_models/best_model.h5'); "
+			"print(info['input_shape'], info['output_shape'], info['total_params'], "
+			"'tensorflow' in sys.modules)"
+		)
+		output = subprocess.run(
+			[sys.executable, '-c', script], capture_output=True, text=True, check=True
+		).stdout
+		self.assertEqual(output.split('\n')[0], '(None, 64, 64, 3) (None, 1) 54569 False')
+
+		detector = AnemiaDetector(model_path='ml_models/best_model.h5')
+		info = detector.get_model_info()
+		self.assertIsNone(detector.model)
+		self.assertFalse(info['loaded'])
+		self.assertIn(info['version_hash'], detector.model_version)
+
+	def test_readiness_follows_preload_state(self):
+		self.assertEqual(self.client.get('/health/live/').status_code, 200)
+		with mock.patch.dict(model_loader._preload_status, mode='worker', state='loading'), \
+				mock.patch.object(model_loader, 'is_model_loaded', return_value=False):
+			response = self.client.get('/health/ready/')
+			self.assertEqual(response.status_code, 503)
+			self.assertEqual(response.json()['state'], 'loading')
+		with mock.patch.dict(model_loader._preload_status, mode='off', state='pending'):
+			self.assertEqual(self.client.get('/health/ready/').status_code, 200)
+		# Los metadatos completos son solo para staff
+		self.assertEqual(self.client.get('/health/model/').status_code, 302)
+		staff = get_user_model().objects.create_user(
+			email='admin@example.com', password='clave-segura-1', is_staff=True
+		)
+		self.client.force_login(staff)
+		model = self.client.get('/health/model/').json()
+		self.assertTrue(model['model']['exists'])
+		self.assertEqual(len(model['model']['sha256']), 64)
+
+
+class ImageQualityGateTests(TestCase):
+	def setUp(self):
+		self.capture = Image.open(
+			'static/img/analysis/Pac-40011/analisis_20251026_233821.jpg'
+		).convert('RGB')
+
+	def test_stored_captures_pass_and_bad_captures_get_a_reason(self):
+		gate = ImageQualityGate()
+		for path in find_sample_images([Path('static/img/analysis')]):
+			with Image.open(path) as image:
+				self.assertTrue(gate.check(image.convert('RGB'))['passed'], path)
+
+		bad_captures = {
+			'empty': Image.new('RGB', (400, 300)),
+			'too_small': self.capture.resize((40, 30)),
+			'overexposed': ImageEnhance.Brightness(self.capture).enhance(3),
+			'underexposed': ImageEnhance.Brightness(self.capture).enhance(0.2),
+			'blurry': self.capture.filter(ImageFilter.GaussianBlur(4)),
+		}
+		for reason, image in bad_captures.items():
+			report = gate.check(image)
+			self.assertEqual(report['reason'], reason, report['metrics'])
+			self.assertEqual(report['message'], QUALITY_MESSAGES[reason])
+
+	def test_rejected_capture_skips_storage_and_inference(self):
+		user = get_user_model().objects.create_user(
+			email='medico@example.com', password='clave-segura-1', first_name='Ana', last_name='Ruiz'
+		)
+		Paciente.objects.create(
+			id='Pac-1', nombre='Ana', apellido='Pérez', dni='0102030405',
+			correo='ana@example.com', sexo='F'
+		)
+		self.client.force_login(user)
+		buffer = BytesIO()
+		self.capture.filter(ImageFilter.GaussianBlur(4)).save(buffer, format='JPEG')
+		image_data = 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+		with mock.patch('apps.core.views.analysis.analysis_views._store_analysis_image') as store, \
+				mock.patch('ml_models.model_loader.apredict') as apredict:
+			response = self.client.post(
+				'/analysis/analyze/', {'paciente_id': 'Pac-1', 'image_data': image_data}
+			)
+		self.assertEqual(response.status_code, 422)
+		self.assertEqual(response.json()['motivo'], 'blurry')
+		store.assert_not_called()
+		apredict.assert_not_called()
+
+
+class PallorPrescreenTests(TestCase):
+	# (R, G, B): extremos claros del índice log(R/G) y dos casos dudosos con
+	# el mismo índice y distinto diagnóstico (la "CNN" es la media de la imagen)
+	COLORS = [
+		(20, 150, 150), (30, 150, 150), (40, 150, 150),
+		(150, 150, 0), (150, 150, 255),
+		(230, 150, 150), (240, 150, 150), (250, 150, 150),
+	]
+
+	def _images(self):
+		return [Image.new('RGB', (128, 128), color) for color in self.COLORS]
+
+	def test_calibrated_tails_skip_the_cnn(self):
+		detector = _mean_detector()
+		reference = detector.predict_batch(self._images())
+		tensor = np.stack([detector.preprocess_image(image)[0] for image in self._images()])
+		indices = pallor_index(tensor)
+		self.assertTrue(np.all(np.diff(indices[:3]) > 0))
+		self.assertTrue(np.isnan(pallor_index(np.zeros((1, 64, 64, 3), dtype=np.float32))[0]))
+
+		calibration = calibrate_band(
+			indices, [r['probability'] for r in reference], min_agreement=1.0, min_support=2
+		)
+		self.assertEqual((calibration['low']['support'], calibration['high']['support']), (3, 3))
+		self.assertFalse(calibration['low']['has_anemia'])
+		self.assertTrue(calibration['high']['has_anemia'])
+
+		detector.pallor_prescreen = PallorPrescreen(calibration)
+		with mock.patch.object(detector.backend, 'predict', wraps=detector.backend.predict) as predict:
+			results = detector.predict_batch(self._images())
+		self.assertEqual(predict.call_args[0][0].shape[0], 2)
+		self.assertEqual([r['stage'] for r in results], ['pallor'] * 3 + ['cnn'] * 2 + ['pallor'] * 3)
+		self.assertEqual(
+			[r['has_anemia'] for r in results], [r['has_anemia'] for r in reference]
+		)
+		self.assertEqual(detector.predict(self._images()[0])['stage'], 'pallor')
+		stats = detector.get_stats()['pallor_prescreen']
+		self.assertEqual((stats['pallor'], stats['cnn']), (7, 2))
+		self.assertIn(stats['signature'], detector.model_version)
+
+	def test_command_calibrates_against_stored_reports(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		with override_settings(MEDIA_ROOT=tmp.name):
+			paciente = Paciente.objects.create(
+				id='Pac-1', nombre='Ana', apellido='Pérez', dni='0102030405',
+				correo='ana@example.com', sexo='F'
+			)
+			detector = _mean_detector()
+			for i, (image, result) in enumerate(zip(self._images(), detector.predict_batch(self._images()))):
+				buffer = BytesIO()
+				image.save(buffer, format='PNG')
+				default_storage.save(f'analysis/Pac-1/{i}.png', ContentFile(buffer.getvalue()))
+				ReporteAnemia.objects.create(
+					paciente=paciente, fecha_analisis=date.today(), imagen_conjuntiva=f'{i}.png',
+					observaciones_clinicas='-', interpretacion_preliminar='-', grado_palidez='Ninguna',
+					sospecha_diagnostica='-', recomendaciones='-', tiene_anemia=result['has_anemia'],
+					probabilidad=result['probability'], confianza=0.7, nivel_confianza='Baja',
+					# Resuelto por la cascada o con otro modelo: se recalcula con la CNN
+					version_modelo={0: 'best_model-x-pallorabc', 1: 'model_anemia-y'}.get(
+						i, detector.model_version
+					),
+				)
+			output = Path(tmp.name) / 'calibracion.json'
+			stdout = StringIO()
+			with mock.patch(
+				'apps.core.management.commands.calibrate_pallor_prescreen.AnemiaDetector',
+				_mean_detector,
+			):
+				call_command(
+					'calibrate_pallor_prescreen', '--min-support', '1', '--holdout', '0.3',
+					'--output', str(output), stdout=stdout,
+				)
+
+		calibration = json.loads(output.read_text(encoding='utf-8'))
+		holdout = calibration['holdout']
+		self.assertEqual(calibration['cases'] + holdout['cases'], len(self.COLORS))
+		self.assertIn('referencias recalculadas con la CNN: 2', stdout.getvalue())
+		self.assertTrue(calibration['reference_version'].startswith('best_model-'))
+		# La coincidencia se mide solo en los reportes reservados
+		reportes = list(ReporteAnemia.objects.order_by('pk'))
+		reserved = CalibratePallorCommand._holdout_mask(np.array([r.pk for r in reportes]), 0.3)
+		tensor = np.stack([detector.preprocess_image(image)[0] for image in self._images()])
+		expected = PallorPrescreen(calibration).evaluate(
+			pallor_index(tensor)[reserved], np.array([r.probabilidad for r in reportes])[reserved]
+		)
+		self.assertEqual(holdout, expected)
+
+
+class ModelEnsembleTests(TestCase):
+	def test_ensemble_keeps_member_probabilities(self):
+		images = find_sample_images([Path('static/img/analysis')], limit=4)
+		members = [
+			AnemiaDetector(path, backend='numpy')
+			for path in ('ml_models/best_model.h5', 'ml_models/model_anemia.h5')
+		]
+		ensemble = AnemiaDetector(
+			backend='numpy', ensemble_with=['ml_models/model_anemia.h5'], ensemble_weights=[3, 1]
+		)
+		expected = np.array([[r['probability'] for r in m.predict_batch(images)] for m in members]).T
+		results = ensemble.predict_batch(images)
+		np.testing.assert_allclose(
+			[r['probability'] for r in results], expected @ [0.75, 0.25], rtol=1e-6
+		)
+		np.testing.assert_allclose(
+			[list(r['members'].values()) for r in results], expected, rtol=1e-6
+		)
+		self.assertEqual(list(results[0]['members']), ['best_model', 'model_anemia'])
+		self.assertTrue(ensemble.model_version.startswith('ensemble2-'))
+		# Los pesos cambian la versión sin alargarla
+		unweighted = AnemiaDetector(backend='numpy', ensemble_with=['ml_models/model_anemia.h5'])
+		self.assertNotEqual(unweighted.model_version, ensemble.model_version)
+		self.assertEqual(len(unweighted.model_version), len(ensemble.model_version))
+		self.assertEqual(ensemble.backend.get_info()['output_shape'], (None, 2))
+
+		# El micro-batching conserva las probabilidades de cada modelo
+		scheduler = MicroBatchScheduler(ensemble)
+		try:
+			members = scheduler.predict(images[0])['members']
+			np.testing.assert_allclose(list(members.values()), expected[0], rtol=1e-6)
+		finally:
+			scheduler.stop()
+
+	def test_tflite_ensemble_loads_without_parameter_count(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			paths = []
+			for name in ('best_model', 'model_anemia'):
+				h5_path = Path(tmp) / f'{name}.h5'
+				h5_path.write_bytes(Path(f'ml_models/{name}.h5').read_bytes())
+				convert_to_tflite(h5_path)
+				paths.append(str(h5_path))
+			ensemble = AnemiaDetector(paths[0], backend='tflite', ensemble_with=paths[1:])
+			ensemble.load_model()
+			info = ensemble.backend.get_info()
+			self.assertIsNone(info['total_params'])
+			self.assertEqual(info['output_shape'], (None, 2))
+			batch = np.random.default_rng(3).random((2, 64, 64, 3), dtype=np.float32)
+			self.assertEqual(ensemble.predict_scores(batch).shape, (2, 2))
+
+	def test_vote_uses_majority_and_its_mean(self):
+		detector = AnemiaDetector(
+			ensemble_with=['ml_models/model_anemia.h5', 'ml_models/model_anemia.h5'],
+			ensemble_strategy='vote',
+		)
+		probabilities, members = detector.combine_scores(
+			np.array([[0.9, 0.7, 0.2], [0.4, 0.1, 0.8], [0.6, 0.6, 0.6]])
+		)
+		np.testing.assert_allclose(probabilities, [0.8, 0.25, 0.6])
+		self.assertEqual(members.shape, (3, 3))
+		with self.assertRaises(ValueError):
+			AnemiaDetector(ensemble_with=['ml_models/model_anemia.h5'], ensemble_strategy='max')
+
+
+class ReportEmbeddingTests(TestCase):
+	def test_store_appends_and_searches_by_cosine(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		store = EmbeddingStore(tmp.name)
+		rng = np.random.default_rng(0)
+		vectors = rng.random((50, 8))
+		store.append(np.arange(1, 51), vectors, 'v1')
+		# Un id añadido de nuevo vale por su última fila
+		store.append([7], [vectors[30]], 'v1')
+
+		reopened = EmbeddingStore(tmp.name, float32_cache=False)
+		for current in (store, reopened):
+			self.assertEqual(len(current), 51)
+			np.testing.assert_array_equal(current.indexed_ids(), np.arange(1, 51))
+			np.testing.assert_allclose(
+				current.get(7), vectors[30] / np.linalg.norm(vectors[30]), atol=1e-3
+			)
+			matches = current.search(vectors[30], k=3)
+			self.assertEqual({matches[0][0], matches[1][0]}, {7, 31})
+			self.assertAlmostEqual(matches[0][1], 1.0, places=3)
+			self.assertTrue(matches[1][1] >= matches[2][1])
+			self.assertEqual(
+				[m[0] for m in current.search(vectors[30], k=2, candidate_ids=[2, 7, 9], exclude_ids=[7])],
+				[m[0] for m in current.search(vectors[30], k=3, candidate_ids=[2, 9])][:2],
+			)
+		self.assertIsNone(store.get(99))
+		with self.assertRaises(ValueError):
+			store.append([60], vectors[:1], 'v2')
+		store.reset()
+		self.assertEqual((len(store), store.search(vectors[0])), (0, []))
+
+	def test_embedder_reuses_the_active_local_detector(self):
+		detector = AnemiaDetector(backend='numpy')
+		active = CachingDetector(MicroBatchScheduler(detector), InferenceCache())
+		with mock.patch.object(model_loader, 'get_anemia_detector', return_value=active):
+			self.assertIs(model_loader.get_embedder(), detector)
+
+		# Con el pool de inferencia se carga un detector propio por versión activa
+		pool_client = mock.Mock(model_version='v1')
+		with mock.patch.object(model_loader, 'get_anemia_detector', return_value=pool_client), \
+				mock.patch.object(model_loader, '_embedder', None), \
+				mock.patch.object(model_loader, 'get_detector_kwargs', return_value={'backend': 'numpy'}):
+			embedder = model_loader.get_embedder()
+			self.assertIsNotNone(embedder.model)
+			self.assertIs(model_loader.get_embedder(), embedder)
+			pool_client.model_version = 'v2'
+			self.assertIsNot(model_loader.get_embedder(), embedder)
+
+		with mock.patch.object(
+			model_loader, 'get_anemia_detector', return_value=AnemiaDetector(backend='tflite')
+		), self.assertRaises(NotImplementedError):
+			model_loader.get_embedder()
+
+	def test_similar_reports_are_indexed_and_scoped_to_the_user(self):
+		detector = AnemiaDetector(backend='numpy')
+		images = find_sample_images([Path('static/img/analysis')], limit=4)
+		result = detector.predict(images[0], return_embedding=True)
+		self.assertEqual(result['embedding'].shape, (100,))
+		_, embeddings = detector.predict_scores(
+			np.stack([detector.preprocess_image(str(path))[0] for path in images]), return_embedding=True
+		)
+		np.testing.assert_allclose(embeddings[0], result['embedding'], rtol=1e-5, atol=1e-6)
+
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		users = [
+			get_user_model().objects.create_user(email=f'medico{i}@example.com', password='clave-segura-1')
+			for i in range(2)
+		]
+		paciente = Paciente.objects.create(
+			id='Pac-1', nombre='Ana', apellido='Pérez', dni='0102030405',
+			correo='ana@example.com', sexo='F'
+		)
+		with override_settings(MEDIA_ROOT=tmp.name, ANEMIA_EMBEDDING_STORE_DIR=str(Path(tmp.name) / 'emb')), \
+				mock.patch.object(model_loader, '_embedding_store', None), \
+				mock.patch.object(model_loader, 'get_anemia_detector', return_value=detector), \
+				mock.patch(
+					'apps.core.management.commands.index_report_embeddings.AnemiaDetector',
+					lambda **kwargs: detector,
+				):
+			reportes = []
+			# El último reporte (de otro usuario) es la misma imagen que el primero
+			for i, path in enumerate(images + images[:1]):
+				default_storage.save(f'analysis/Pac-1/{i}.jpg', ContentFile(Path(path).read_bytes()))
+				reportes.append(ReporteAnemia.objects.create(
+					paciente=paciente, fecha_analisis=date.today(), imagen_conjuntiva=f'{i}.jpg',
+					observaciones_clinicas='-', interpretacion_preliminar='-', grado_palidez='Ninguna',
+					sospecha_diagnostica='-', recomendaciones='-', tiene_anemia=False,
+					probabilidad=0.2, confianza=0.6, nivel_confianza='Baja',
+					creado_por=users[1] if i == len(images) else users[0],
+				))
+			call_command('index_report_embeddings', '--limit', '3', stdout=StringIO())
+			store = model_loader.get_embedding_store()
+			self.assertEqual(len(store), 3)
+			self.assertEqual(store.model_version, detector.embedding_version)
+
+			# El reporte consultado sin embedding se indexa al pedir sus similares
+			self.client.force_login(users[0])
+			response = self.client.get(f'/reportes/{reportes[3].id}/similares/')
+			self.assertEqual(response.status_code, 200)
+			casos = response.json()['casos']
+			self.assertEqual(sorted(c['id'] for c in casos), [r.id for r in reportes[:3]])
+			self.assertEqual([c['similitud'] for c in casos], sorted((c['similitud'] for c in casos), reverse=True))
+			self.assertEqual(len(store), 4)
+
+			call_command('index_report_embeddings', stdout=StringIO())
+			self.assertEqual(len(store), 5)
+			casos = self.client.get(f'/reportes/{reportes[0].id}/similares/').json()['casos']
+			self.assertNotIn(reportes[4].id, [c['id'] for c in casos])
+			self.client.force_login(users[1])
+			casos = self.client.get(f'/reportes/{reportes[4].id}/similares/').json()['casos']
+			self.assertEqual(casos, [])
+			self.assertEqual(self.client.get(f'/reportes/{reportes[0].id}/similares/').status_code, 404)
+
+			# Imagen ilegible o backend sin embeddings: error JSON, no 500
+			default_storage.save('analysis/Pac-1/rota.jpg', ContentFile(b'no es una imagen'))
+			rota = ReporteAnemia.objects.create(
+				paciente=paciente, fecha_analisis=date.today(), imagen_conjuntiva='rota.jpg',
+				observaciones_clinicas='-', interpretacion_preliminar='-', grado_palidez='Ninguna',
+				sospecha_diagnostica='-', recomendaciones='-', tiene_anemia=False,
+				probabilidad=0.2, confianza=0.6, nivel_confianza='Baja', creado_por=users[1],
+			)
+			response = self.client.get(f'/reportes/{rota.id}/similares/')
+			self.assertEqual(response.status_code, 422)
+			self.assertIn('error', response.json())
+			with mock.patch.object(
+				model_loader, 'get_anemia_detector', return_value=AnemiaDetector(backend='tflite')
+			):
+				self.assertEqual(self.client.get(f'/reportes/{rota.id}/similares/').status_code, 503)
+
+
+class TensorBufferPoolTests(TestCase):
+	def test_released_buffers_are_reused(self):
+		pool = TensorBufferPool(max_free_per_class=2)
+		first = pool.acquire(3)
+		self.assertEqual(first.shape, (3, 64, 64, 3))
+		pool.release(first)
+		second = pool.acquire(4)
+		self.assertIs(second.base, first.base)
+		pool.release(second)
+		stats = pool.get_stats()
+		self.assertEqual((stats['hits'], stats['misses'], stats['in_use']), (1, 1, 0))
+		self.assertEqual(stats['peak_in_use'], 1)
+
+	def test_oversized_batches_are_not_retained(self):
+		pool = TensorBufferPool(max_batch_size=8)
+		pool.release(pool.acquire(9))
+		stats = pool.get_stats()
+		self.assertEqual((stats['unpooled'], stats['discarded'], stats['free_buffers']), (1, 1, 0))
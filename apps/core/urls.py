@@ -16,9 +16,16 @@ from apps.core.views.analysis import (
     delete_analysis_image,
     delete_analysis_report,
 )
+from apps.core.views.model_registry import model_registry_view
+from apps.core.views.health import (
+    liveness_view,
+    readiness_view,
+    model_metadata_view,
+)
 from apps.core.views.reports import (
     reports_list_view,
     report_detail_view,
+    similar_reports_view,
     delete_report,
     send_report_email,
     generate_report_pdf,
@@ -60,9 +67,20 @@ urlpatterns = [
     path(
         "analysis/delete-report/", delete_analysis_report, name="delete_analysis_report"
     ),
+    # Administración del modelo de ML (solo staff)
+    path("modelo/registro/", model_registry_view, name="model_registry"),
+    # Sondas de salud (públicas, sin inferencia)
+    path("health/live/", liveness_view, name="health_live"),
+    path("health/ready/", readiness_view, name="health_ready"),
+    path("health/model/", model_metadata_view, name="health_model"),
     # URLs de Reportes
     path("reportes/", reports_list_view, name="reports_list"),
     path("reportes/<int:report_id>/", report_detail_view, name="report_detail"),
+    path(
+        "reportes/<int:report_id>/similares/",
+        similar_reports_view,
+        name="similar_reports",
+    ),
     path("reportes/<int:report_id>/eliminar/", delete_report, name="delete_report"),
     path(
         "reportes/<int:report_id>/enviar-email/",
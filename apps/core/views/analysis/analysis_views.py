@@ -12,10 +12,12 @@ from django.views.decorators.http import require_POST
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.conf import settings
-from apps.core.models import Paciente
+from asgiref.sync import sync_to_async
+from apps.core.models import AnalisisPendiente, EvaluacionSombra, Paciente
 import base64
 from PIL import Image
 from io import BytesIO
+import time
 import traceback
 import google.generativeai as genai
 from decouple import config
@@ -38,12 +40,68 @@ def analysis_view(request):
     return render(request, "core/analysis/analysis_form.html", context)
 
 
+def _decode_uploaded_image(image_data, quality_gate=None):
+    """
+    Decodifica la imagen base64 del formulario y la codifica como JPEG.
+
+    Si se indica ``quality_gate``, la captura se evalúa antes de codificarla
+    y, si se rechaza, no se genera el JPEG.
+
+    Args:
+        image_data (str): Imagen en base64 (con o sin prefijo data:image/...)
+        quality_gate (ImageQualityGate): Control de calidad (None = sin control)
+
+    Returns:
+        tuple: (bytes de la imagen RGB en JPEG con calidad 95 o None si se
+        rechazó, informe de calidad o None)
+    """
+    # Remover el prefijo data:image/...;base64,
+    if "," in image_data:
+        image_data = image_data.split(",")[1]
+
+    image_bytes = base64.b64decode(image_data)
+    image = Image.open(BytesIO(image_bytes))
+
+    # Convertir a RGB si es necesario
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    quality = quality_gate.check(image) if quality_gate is not None else None
+    if quality is not None and not quality["passed"]:
+        return None, quality
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue(), quality
+
+
+def _store_analysis_image(storage_path, jpeg_bytes):
+    """
+    Guarda la imagen en storage (S3 o filesystem según configuración).
+
+    Returns:
+        str: URL pública de la imagen
+    """
+    default_storage.save(storage_path, ContentFile(jpeg_bytes))
+
+    # Obtener URL pública (funciona para S3 y para MEDIA en local)
+    try:
+        return default_storage.url(storage_path)
+    except Exception:
+        # Fallback: ruta relativa bajo /media/
+        return f"/media/{storage_path}"
+
+
 @login_required
 @require_POST
-def analyze_image(request):
+async def analyze_image(request):
     """
     Procesa y analiza una imagen de conjuntiva.
     Recibe la imagen recortada y el ID del paciente.
+
+    Vista asíncrona: la decodificación, el guardado en storage y la
+    inferencia se ejecutan en hilos, sin bloquear el bucle de eventos en
+    despliegues ASGI (en WSGI Django la ejecuta de forma síncrona).
     """
     try:
         # Obtener datos del request
@@ -64,31 +122,41 @@ def analyze_image(request):
 
         # Validar paciente
         try:
-            paciente = Paciente.objects.get(id=paciente_id)
+            paciente = await Paciente.objects.aget(id=paciente_id)
         except Paciente.DoesNotExist:
             return JsonResponse(
                 {"success": False, "error": "Paciente no encontrado"}, status=404
             )
 
-        # Decodificar imagen base64
+        # Decodificar imagen base64 y descartar capturas inservibles antes de
+        # guardarlas en storage, evaluarlas y consultar a Gemini
         try:
-            # Remover el prefijo data:image/...;base64,
-            if "," in image_data:
-                image_data = image_data.split(",")[1]
-
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(BytesIO(image_bytes))
-
-            # Convertir a RGB si es necesario
-            if image.mode != "RGB":
-                image = image.convert("RGB")
+            from ml_models.model_loader import get_quality_gate
 
+            jpeg_bytes, quality = await sync_to_async(
+                _decode_uploaded_image, thread_sensitive=False
+            )(image_data, get_quality_gate())
         except Exception as e:
             return JsonResponse(
                 {"success": False, "error": f"Error al procesar la imagen: {str(e)}"},
                 status=400,
             )
 
+        if jpeg_bytes is None:
+            print(
+                f"⚠️  Captura rechazada por calidad ({quality['reason']}): "
+                f"{quality['metrics']}"
+            )
+            return JsonResponse(
+                {
+                    "success": False,
+                    "error": quality["message"],
+                    "motivo": quality["reason"],
+                    "calidad": quality["metrics"],
+                },
+                status=422,
+            )
+
         # Guardar imagen usando default_storage (funciona local y S3)
         import datetime
 
@@ -98,40 +166,25 @@ def analyze_image(request):
         # Ruta relativa dentro de MEDIA: analysis/<paciente_id>/filename
         storage_path = f"analysis/{paciente_id}/{filename}"
 
-        # Guardar imagen en un buffer y usar default_storage
-        buffer = BytesIO()
-        image.save(buffer, format="JPEG", quality=95)
-        buffer.seek(0)
-
-        # Guardar en storage (S3 o filesystem según configuración)
-        default_storage.save(storage_path, ContentFile(buffer.read()))
-
-        # Obtener URL pública (funciona para S3 y para MEDIA en local)
-        try:
-            image_url = default_storage.url(storage_path)
-        except Exception:
-            # Fallback: ruta relativa bajo /media/
-            image_url = f"/media/{storage_path}"
-
-        # Para backward-compatibilidad, establecer image_path local si storage es filesystem
-        # intentaremos obtener un path en disco si existe
-        try:
-            if hasattr(default_storage, 'path'):
-                image_path = default_storage.path(storage_path)
-            else:
-                image_path = storage_path
-        except Exception:
-            image_path = storage_path
+        image_url = await sync_to_async(
+            _store_analysis_image, thread_sensitive=False
+        )(storage_path, jpeg_bytes)
 
         # Usar el detector singleton (modelo ya pre-cargado)
         try:
-            from ml_models.model_loader import get_anemia_detector
-
-            # Obtener detector (ya cargado, muy rápido)
-            detector = get_anemia_detector()
+            from ml_models.async_inference import InferenceOverloadedError
+            from ml_models.model_loader import (
+                apredict,
+                get_anemia_detector,
+                get_shadow_evaluator,
+            )
 
-            # Realizar predicción
-            result = detector.predict(image_path)
+            # Realizar predicción sobre los mismos bytes JPEG guardados en storage,
+            # así la página de resultados reutiliza el resultado desde la caché
+            inference_start = time.perf_counter()
+            result = await apredict(jpeg_bytes)
+            inference_ms = (time.perf_counter() - inference_start) * 1000
+            detector = await sync_to_async(get_anemia_detector, thread_sensitive=False)()
         except ImportError as e:
             return JsonResponse(
                 {
@@ -140,6 +193,14 @@ def analyze_image(request):
                 },
                 status=500,
             )
+        except InferenceOverloadedError as e:
+            return JsonResponse(
+                {
+                    "success": False,
+                    "error": f"El servidor está ocupado, intente de nuevo en unos segundos ({str(e)})",
+                },
+                status=503,
+            )
         except Exception as e:
             return JsonResponse(
                 {
@@ -149,11 +210,42 @@ def analyze_image(request):
                 status=500,
             )
 
+        # Persistir el resultado para la página de resultados y el guardado
+        # del reporte (sin repetir descarga ni inferencia)
+        user = await request.auser()
+        await sync_to_async(AnalisisPendiente.purgar_expirados)()
+        await AnalisisPendiente.objects.aupdate_or_create(
+            paciente=paciente,
+            imagen=filename,
+            defaults={
+                "ruta_storage": storage_path,
+                "version_modelo": getattr(detector, "model_version", "desconocida"),
+                "tiene_anemia": result["has_anemia"],
+                "probabilidad": result["probability"],
+                "confianza": result["confidence"],
+                "nivel_confianza": result["confidence_level"],
+                "creado_por": user,
+                "expira_en": AnalisisPendiente.calcular_expiracion(),
+            },
+        )
+
+        # Evaluación en sombra del modelo candidato: solo encola, no bloquea
+        shadow = get_shadow_evaluator()
+        if shadow is not None:
+            shadow.submit(
+                jpeg_bytes,
+                result,
+                primary_version=getattr(detector, "model_version", None),
+                primary_latency_ms=inference_ms,
+                callback=EvaluacionSombra.registrar,
+                context={"paciente_id": paciente.id, "imagen": filename},
+            )
+
         # Imprimir resultados en terminal
         print("RESULTADO DEL ANÁLISIS DE ANEMIA")
         print(f"Paciente: {paciente.nombre} {paciente.apellido}")
         print(f"DNI: {paciente.dni}")
-        print(f"Usuario: {request.user.email}")
+        print(f"Usuario: {user.email}")
         print(f"Imagen guardada en storage: {storage_path} (url: {image_url})")
         print(f"Diagnóstico: {result['diagnosis']}")
         print(
@@ -163,6 +255,10 @@ def analyze_image(request):
             f"Nivel de confianza: {result['confidence_level']} ({result['confidence']*100:.2f}%)"
         )
         print(f"Tiene anemia: {'SÍ' if result['has_anemia'] else 'NO'}")
+        if "members" in result:
+            print("Probabilidad por modelo: " + ", ".join(
+                f"{name}={probability:.4f}" for name, probability in result["members"].items()
+            ))
 
         # Preparar respuesta
         response_data = {
@@ -186,6 +282,11 @@ def analyze_image(request):
             "imagen_ruta": image_url,
             "mensaje": "Análisis completado exitosamente. Redirigiendo a resultados...",
         }
+        if "members" in result:
+            # Ensemble: probabilidad de cada modelo, para auditoría
+            response_data["resultado"]["probabilidades_modelos"] = {
+                name: round(probability, 4) for name, probability in result["members"].items()
+            }
 
         return JsonResponse(response_data)
 
@@ -380,6 +481,48 @@ def generate_fallback_diagnosis(detection_result, confidence_percentage):
     }
 
 
+def _predict_stored_image(storage_path, detector=None):
+    """
+    Evalúa una imagen de análisis ya almacenada.
+
+    Args:
+        storage_path (str): Ruta de la imagen en storage
+        detector: Detector a usar (por defecto, el activo)
+
+    Returns:
+        dict | None: Resultado del detector, o None si la imagen no existe
+    """
+    # Verificar existencia usando default_storage
+    try:
+        exists = default_storage.exists(storage_path)
+    except Exception:
+        # Fallback a comprobación en disco
+        exists = os.path.exists(os.path.join(settings.MEDIA_ROOT, storage_path))
+
+    if not exists:
+        return None
+
+    if detector is None:
+        # Usar el detector singleton (modelo ya pre-cargado)
+        from ml_models.model_loader import get_anemia_detector
+
+        detector = get_anemia_detector()
+
+    # Leer los bytes desde storage y pasarlos al detector: si la imagen ya
+    # se evaluó con el mismo modelo, el resultado sale de la caché sin
+    # decodificar la imagen ni ejecutar el modelo
+    try:
+        with default_storage.open(storage_path, "rb") as f:
+            image_bytes = f.read()
+    except Exception:
+        # Último intento: leer directamente desde MEDIA_ROOT
+        local_try = os.path.join(settings.MEDIA_ROOT, storage_path)
+        with open(local_try, "rb") as f:
+            image_bytes = f.read()
+
+    return detector.predict(image_bytes)
+
+
 @login_required
 def analysis_results_view(request, paciente_id):
     """
@@ -405,41 +548,21 @@ def analysis_results_view(request, paciente_id):
         except Exception:
             image_url = f"/media/{storage_path}"
 
-        # Verificar existencia usando default_storage
-        try:
-            exists = default_storage.exists(storage_path)
-        except Exception:
-            # Fallback a comprobación en disco
-            exists = os.path.exists(os.path.join(settings.MEDIA_ROOT, storage_path))
-
-        if not exists:
-            return redirect("core:analysis")
-
-        # Usar el detector singleton (modelo ya pre-cargado)
-        from ml_models.model_loader import get_anemia_detector
-
-        detector = get_anemia_detector()
+        # Resultado calculado por analyze_image: sin descarga ni inferencia
+        pendiente = (
+            AnalisisPendiente.vigentes()
+            .filter(paciente=paciente, imagen=image_filename)
+            .first()
+        )
 
-        # Si tenemos un path en disco, pasarlo; en caso contrario, abrir la imagen desde storage
-        try:
-            # Si image_path apunta a ruta local válida (FileSystemStorage.path), usarla
-            if os.path.exists(image_path):
-                result = detector.predict(image_path)
-            else:
-                # Abrir desde storage como archivo y pasar objeto PIL al detector
-                with default_storage.open(storage_path, 'rb') as f:
-                    img = Image.open(f)
-                    result = detector.predict(img)
-        except Exception:
-            # Último intento: pasar la URL (no ideal) o volver a intentar abrir desde MEDIA_ROOT
-            try:
-                local_try = os.path.join(settings.MEDIA_ROOT, storage_path)
-                if os.path.exists(local_try):
-                    result = detector.predict(local_try)
-                else:
-                    raise
-            except Exception as e:
-                raise
+        if pendiente is not None:
+            result = pendiente.como_resultado()
+        else:
+            # Sin análisis pendiente (expirado o enlace antiguo): evaluar la
+            # imagen almacenada
+            result = _predict_stored_image(storage_path)
+            if result is None:
+                return redirect("core:analysis")
 
         # Generar diagnóstico con Gemini
         confidence_percentage = round(result["confidence"] * 100, 2)
@@ -489,24 +612,59 @@ def save_analysis_report(request):
         observaciones = request.POST.get("observaciones")
         interpretacion = request.POST.get("interpretacion")
         recomendaciones = request.POST.get("recomendaciones")
-        tiene_anemia = request.POST.get("tiene_anemia") == "true"
-        probabilidad = float(request.POST.get("probabilidad", 0))
-        confianza = float(request.POST.get("confianza", 0))
-        nivel_confianza = request.POST.get("nivel_confianza", "")
 
         # Validar paciente
         paciente = Paciente.objects.get(id=paciente_id)
 
-        # Determinar grado de palidez basado en el resultado
-        if tiene_anemia:
-            if probabilidad >= 0.8:
-                grado_palidez = "Severa"
-            elif probabilidad >= 0.6:
-                grado_palidez = "Moderada"
-            else:
-                grado_palidez = "Leve"
+        # El resultado se toma del servidor: el guardado al subir la imagen
+        # o, si ya no existe, una nueva evaluación de la imagen almacenada.
+        # Los valores enviados por el navegador nunca se guardan
+        pendiente = (
+            AnalisisPendiente.vigentes()
+            .filter(paciente=paciente, imagen=image_filename)
+            .first()
+        )
+        if pendiente is not None:
+            tiene_anemia = pendiente.tiene_anemia
+            probabilidad = pendiente.probabilidad
+            confianza = pendiente.confianza
+            nivel_confianza = pendiente.nivel_confianza
+            version_modelo = pendiente.version_modelo
         else:
-            grado_palidez = "Ninguna"
+            print(
+                f"⚠️ Sin análisis pendiente para {image_filename}; "
+                "evaluando de nuevo la imagen almacenada"
+            )
+            result = None
+            # Solo nombres de archivo dentro de la carpeta del paciente
+            if image_filename and os.path.basename(image_filename) == image_filename:
+                from ml_models.model_loader import get_anemia_detector
+
+                try:
+                    detector = get_anemia_detector()
+                    version_modelo = getattr(detector, "model_version", "desconocida")
+                    result = _predict_stored_image(
+                        f"analysis/{paciente.id}/{image_filename}", detector
+                    )
+                except Exception as e:
+                    print(f"❌ No se pudo evaluar {image_filename}: {str(e)}")
+                    result = None
+            if result is None:
+                return JsonResponse(
+                    {
+                        "success": False,
+                        "error": "No se pudo verificar el resultado del análisis. "
+                        "Repita el análisis de la imagen.",
+                    },
+                    status=422,
+                )
+            tiene_anemia = result["has_anemia"]
+            probabilidad = result["probability"]
+            confianza = result["confidence"]
+            nivel_confianza = result["confidence_level"]
+
+        # Determinar grado de palidez basado en el resultado
+        grado_palidez = ReporteAnemia.calcular_grado_palidez(tiene_anemia, probabilidad)
 
         # Verificar si ya existe un reporte para esta imagen
         # Buscar reportes existentes para este paciente e imagen
@@ -544,12 +702,16 @@ def save_analysis_report(request):
         )
         reporte.recomendaciones = recomendaciones
         reporte.tiene_anemia = tiene_anemia
-        reporte.probabilidad = probabilidad / 100  # Convertir de porcentaje a decimal
-        reporte.confianza = confianza / 100
+        reporte.probabilidad = probabilidad
+        reporte.confianza = confianza
         reporte.nivel_confianza = nivel_confianza
+        reporte.version_modelo = version_modelo
         reporte.creado_por = request.user
         reporte.save()
 
+        if pendiente is not None:
+            pendiente.delete()
+
         action = "CREADO" if created else "ACTUALIZADO"
         print(f"\n✅ REPORTE {action}:")
         print(f"   ID: {reporte.id}")
@@ -592,6 +754,11 @@ def delete_analysis_image(request):
                 {"success": False, "error": "Datos incompletos"}, status=400
             )
 
+        # El análisis cancelado ya no se guardará como reporte
+        AnalisisPendiente.objects.filter(
+            paciente_id=paciente_id, imagen=image_filename
+        ).delete()
+
         # Construir ruta de la imagen
         image_path = os.path.join(
             settings.BASE_DIR,
@@ -0,0 +1,10 @@
+"""
+Módulo de vistas de salud del servicio (sondas de balanceadores y orquestadores).
+"""
+from .health_views import liveness_view, readiness_view, model_metadata_view
+
+__all__ = [
+    'liveness_view',
+    'readiness_view',
+    'model_metadata_view',
+]
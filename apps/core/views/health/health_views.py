@@ -0,0 +1,59 @@
+"""
+Sondas de salud del servicio.
+
+Pensadas para consultarse cada segundo: no cargan el modelo ni ejecutan
+inferencias. El estado del modelo sale de la bandera de pre-carga y de
+metadatos cacheados del archivo .h5 (ver ``ml_models.metadata``). Liveness
+y readiness son públicas y no acceden a la base de datos; los metadatos
+completos (rutas, hash, versiones, errores) son solo para staff.
+"""
+import os
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from ml_models.model_loader import get_health_status
+
+
+@never_cache
+@require_GET
+def liveness_view(request):
+    """
+    Liveness: el proceso responde. No depende del estado del modelo.
+    """
+    return JsonResponse({"status": "alive", "pid": os.getpid()})
+
+
+@never_cache
+@require_GET
+def readiness_view(request):
+    """
+    Readiness: el proceso puede atender análisis (modelo cargado y
+    calentado, o pre-carga desactivada). Responde 503 mientras no lo está
+    para que el balanceador no le envíe tráfico.
+    """
+    health = get_health_status()
+    active = health["active"]
+    return JsonResponse(
+        {
+            "status": "ready" if health["ready"] else "not_ready",
+            "state": health["preload"]["state"],
+            "preload_mode": health["preload"]["mode"],
+            "error": health["preload"]["error"],
+            "model_version": active["version"] if active else None,
+            "warmed_up": bool(active and active["warmup"]),
+        },
+        status=200 if health["ready"] else 503,
+    )
+
+
+@never_cache
+@staff_member_required
+@require_GET
+def model_metadata_view(request):
+    """
+    Metadatos del modelo: versión activa, calentamiento, hash y atributos
+    del archivo .h5 y tiempo de pre-carga.
+    """
+    return JsonResponse(get_health_status())
@@ -0,0 +1,8 @@
+"""
+Módulo de vistas para la administración del modelo de ML.
+"""
+from .model_registry_views import model_registry_view
+
+__all__ = [
+    'model_registry_view',
+]
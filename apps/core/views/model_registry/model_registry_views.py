@@ -0,0 +1,63 @@
+"""
+Vistas de administración del modelo de detección de anemia (solo staff).
+"""
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from ml_models import ML_MODELS_DIR
+from ml_models.model_loader import get_model_registry, swap_model
+import traceback
+
+
+@staff_member_required
+@require_http_methods(["GET", "POST"])
+def model_registry_view(request):
+    """
+    GET: versión que sirve cada worker y versión deseada.
+    POST: publica un nuevo modelo (campo ``model``: nombre de un archivo de
+    ml_models/) que cada worker carga y activa en segundo plano.
+    """
+    registry = get_model_registry()
+
+    if request.method == "POST":
+        model_name = request.POST.get("model", "")
+        model_path = ML_MODELS_DIR / model_name
+        # Solo modelos incluidos en ml_models/, nunca rutas arbitrarias
+        if (
+            not model_name
+            or model_path.parent != ML_MODELS_DIR
+            or model_path.suffix != ".h5"
+            or not model_path.exists()
+        ):
+            return JsonResponse(
+                {"success": False, "error": "Modelo no encontrado en ml_models/"},
+                status=400,
+            )
+
+        try:
+            target = swap_model(str(model_path))
+        except Exception as e:
+            print(f"Error al publicar el modelo: {str(e)}")
+            traceback.print_exc()
+            return JsonResponse({"success": False, "error": str(e)}, status=500)
+
+        print(f"🔄 Intercambio de modelo solicitado por {request.user}: {model_path.name}")
+        return JsonResponse(
+            {
+                "success": True,
+                "message": "Intercambio iniciado: cada worker cargará y calentará el modelo antes de activarlo",
+                "target": target,
+                "worker": registry.get_status(),
+            },
+            status=202,
+        )
+
+    return JsonResponse(
+        {
+            "success": True,
+            "target": registry.read_target(),
+            "worker": registry.get_status(),
+            "workers": registry.read_workers(),
+        }
+    )
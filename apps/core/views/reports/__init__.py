@@ -1,6 +1,7 @@
 from .reports_views import (
     reports_list_view,
     report_detail_view,
+    similar_reports_view,
     delete_report,
     send_report_email,
     generate_report_pdf,
@@ -9,6 +10,7 @@ from .reports_views import (
 __all__ = [
     "reports_list_view",
     "report_detail_view",
+    "similar_reports_view",
     "delete_report",
     "send_report_email",
     "generate_report_pdf",
@@ -5,7 +5,8 @@ from django.contrib import messages
 from django.db.models import Q
 from django.core.mail import EmailMessage
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.core.files.storage import default_storage
 from apps.core.models import ReporteAnemia
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
@@ -81,6 +82,94 @@ def report_detail_view(request, report_id):
     return render(request, "core/reports/report_detail.html", context)
 
 
+@login_required
+def similar_reports_view(request, report_id):
+    """
+    Reportes del usuario más parecidos al indicado según el embedding de la
+    penúltima capa del modelo (similitud coseno).
+
+    Si el reporte aún no está en el almacén se calcula su embedding y se
+    añade; los demás reportes solo aparecen una vez indexados
+    (``manage.py index_report_embeddings``).
+    """
+    from ml_models.model_loader import get_embedder, get_embedding_store
+    from ml_models.prefetch import load_image_into
+
+    reporte = get_object_or_404(ReporteAnemia, id=report_id, creado_por=request.user)
+
+    try:
+        detector = get_embedder()
+    except NotImplementedError as e:
+        print(f"⚠️  Casos similares no disponibles: {e}")
+        return JsonResponse(
+            {"error": "El backend de inferencia no permite buscar casos similares"}, status=503
+        )
+    except Exception as e:
+        print(f"❌ No se pudo cargar el modelo para casos similares: {e}")
+        return JsonResponse({"error": "Modelo no disponible"}, status=503)
+    version = detector.embedding_version
+    store = get_embedding_store()
+    if len(store) and store.model_version != version:
+        return JsonResponse(
+            {"error": "Los casos similares están indexados con otro modelo"}, status=409
+        )
+
+    query = store.get(reporte.id)
+    if query is None:
+        tensor = detector.acquire_input(1)
+        try:
+            try:
+                error = load_image_into(
+                    detector, default_storage, reporte.get_storage_path(), tensor[0]
+                )
+            except Exception as e:
+                print(f"❌ Error al leer la imagen del reporte {reporte.id}: {e}")
+                error = "unavailable"
+            if error == "missing":
+                return JsonResponse({"error": "Imagen del reporte no disponible"}, status=404)
+            if error == "failed":
+                return JsonResponse({"error": "La imagen del reporte no se puede leer"}, status=422)
+            if error:
+                return JsonResponse({"error": "Storage no disponible"}, status=503)
+            _, embeddings = detector.predict_scores(tensor, return_embedding=True)
+        finally:
+            detector.release_input(tensor)
+        query = embeddings[0]
+        store.append([reporte.id], embeddings, version)
+
+    candidate_ids = ReporteAnemia.objects.filter(creado_por=request.user).values_list(
+        "id", flat=True
+    )
+    matches = store.search(
+        query,
+        k=getattr(settings, "ANEMIA_SIMILAR_CASES", 5),
+        candidate_ids=list(candidate_ids),
+        exclude_ids=[reporte.id],
+    )
+    similares = ReporteAnemia.objects.select_related("paciente").in_bulk(
+        [match_id for match_id, _ in matches]
+    )
+
+    casos = []
+    for match_id, similarity in matches:
+        caso = similares.get(match_id)
+        if caso is None:
+            # Reporte eliminado después de indexarlo
+            continue
+        casos.append({
+            "id": caso.id,
+            "paciente": caso.paciente.nombre_completo,
+            "fecha": caso.fecha_analisis.isoformat(),
+            "tiene_anemia": caso.tiene_anemia,
+            "probabilidad": caso.probabilidad,
+            "nivel_confianza": caso.nivel_confianza,
+            "similitud": round(similarity, 4),
+            "imagen_url": caso.get_imagen_url(),
+        })
+
+    return JsonResponse({"reporte_id": reporte.id, "casos": casos})
+
+
 @login_required
 def delete_report(request, report_id):
     """Vista para eliminar un reporte"""
@@ -0,0 +1,48 @@
+"""
+Configuración de gunicorn para AnemIA.
+
+Uso:
+    gunicorn anemia_project.wsgi:application -c gunicorn.conf.py
+
+Con ANEMIA_PRELOAD_MODE=master la aplicación se importa en el proceso
+maestro (preload_app): TensorFlow se importa una sola vez y los workers lo
+heredan por fork. El modelo se instancia y calienta en cada worker en
+``post_worker_init`` (junto con las vistas), antes de que atienda su primera solicitud.
+"""
+# gunicorn trata cada nombre del módulo como un ajuste ("config" es uno de ellos)
+import json
+import os
+
+import decouple
+
+
+def _profile_replicas(default):
+    """Réplicas del perfil de ejecución (autotune_anemia_runtime), si existe."""
+    if decouple.config("ANEMIA_INFERENCE_POOL_ENABLED", default=False, cast=bool):
+        # Con el pool, los workers web no cargan el modelo
+        return default
+    path = decouple.config(
+        "ANEMIA_RUNTIME_PROFILE",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "runtime_profile.json"),
+    )
+    try:
+        with open(path, encoding="utf-8") as profile:
+            return int(json.load(profile).get("replicas") or default)
+    except (OSError, ValueError, TypeError):
+        return default
+
+
+bind = decouple.config("GUNICORN_BIND", default="0.0.0.0:8000")
+# 0 = réplicas del perfil de ejecución o 3
+workers = decouple.config("GUNICORN_WORKERS", default=0, cast=int) or _profile_replicas(3)
+# Margen para cargar y calentar el modelo al arrancar cada worker
+timeout = decouple.config("GUNICORN_TIMEOUT", default=120, cast=int)
+
+preload_app = decouple.config("ANEMIA_PRELOAD_MODE", default="worker") == "master"
+
+
+def post_worker_init(worker):
+    if preload_app:
+        from ml_models.model_loader import preload_worker
+
+        preload_worker()
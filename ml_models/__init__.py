@@ -7,6 +7,7 @@ predicciones de anemia basadas en imágenes de la conjuntiva ocular.
 Componentes:
     - model_anemia.h5: Modelo CNN entrenado (54K parámetros)
     - AnemiaDetector: Clase para cargar y usar el modelo
+    - backends: Runtimes de inferencia intercambiables (Keras, TFLite, NumPy)
     
 Uso básico:
     >>> from ml_models.anemia_detector import AnemiaDetector
@@ -43,22 +44,26 @@ def get_anemia_model_path():
     return ANEMIA_MODEL_PATH
 
 
-def get_model_info():
+def get_model_info(model_path=None):
     """
     Retorna información básica sobre el modelo sin cargarlo.
     
+    Las formas, parámetros y versión de Keras se leen de los atributos del
+    archivo .h5 (sin importar TensorFlow) y se cachean junto con su hash.
+    
+    Args:
+        model_path (str | Path): Modelo a describir (None = ANEMIA_MODEL_PATH)
+    
     Returns:
         dict: Información del modelo
     """
-    return {
-        'path': str(ANEMIA_MODEL_PATH),
-        'exists': ANEMIA_MODEL_PATH.exists(),
-        'size_kb': ANEMIA_MODEL_PATH.stat().st_size / 1024 if ANEMIA_MODEL_PATH.exists() else 0,
-        'input_shape': '(None, 64, 64, 3)',
-        'output_shape': '(None, 1)',
-        'type': 'CNN - Clasificación Binaria',
-        'purpose': 'Detección de anemia mediante análisis de conjuntiva ocular'
-    }
+    from ml_models.metadata import read_model_metadata
+
+    info = read_model_metadata(model_path or ANEMIA_MODEL_PATH)
+    info.setdefault('size_kb', 0)
+    info['type'] = 'CNN - Clasificación Binaria'
+    info['purpose'] = 'Detección de anemia mediante análisis de conjuntiva ocular'
+    return info
 
 
 # Exportar componentes principales
@@ -1,10 +1,34 @@
 """
 Utilidad para cargar y utilizar el modelo de detección de anemia.
 """
-import tensorflow as tf
+import hashlib
+import json
 import numpy as np
-from PIL import Image
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from ml_models.backends import INFERENCE_MODE_FLOAT, EnsembleBackend, create_backend
+from ml_models.buffer_pool import TensorBufferPool
+from ml_models.metadata import read_model_metadata
+from ml_models.augmentation import TestTimeAugmenter
+from ml_models.pallor import PallorPrescreen
+from ml_models.preprocessing import ImagePreprocessor
+from ml_models.profiling import measure_latency
+
+
+# Umbral de decisión por defecto
+DEFAULT_THRESHOLD = 0.5
+
+# Umbrales de confianza (de mayor a menor) y su descripción en palabras
+CONFIDENCE_LEVELS = (
+    (0.9, 'Muy alta'),
+    (0.75, 'Alta'),
+    (0.6, 'Moderada'),
+)
+LOWEST_CONFIDENCE_LEVEL = 'Baja'
+
+# Formas de combinar las probabilidades de los modelos de un ensemble
+ENSEMBLE_STRATEGIES = ('mean', 'vote')
 
 
 class AnemiaDetector:
@@ -12,69 +36,185 @@ class AnemiaDetector:
     Clase para la detección de anemia mediante análisis de imágenes de conjuntiva.
     """
     
-    def __init__(self, model_path='ml_models/best_model.h5'):
+    def __init__(self, model_path='ml_models/best_model.h5', backend='keras',
+                 backend_options=None, inference_mode=INFERENCE_MODE_FLOAT,
+                 fast_decode=True, reducing_gap=3.0, tta_band=None,
+                 pallor_calibration=None, ensemble_with=None, ensemble_strategy='mean',
+                 ensemble_weights=None):
         """
         Inicializa el detector de anemia.
         
         Args:
             model_path (str): Ruta al archivo del modelo H5
+            backend (str): Backend de inferencia ('keras' o 'tflite')
+            backend_options (dict): Opciones adicionales del backend
+            inference_mode (str): 'float' o 'int8' (cuantizado, solo tflite)
+            fast_decode (bool): Decodificar JPEG con escalado DCT y reducción
+                previa (ver ``ml_models.preprocessing``)
+            reducing_gap (float): Margen de la reducción previa al remuestreo
+            tta_band (float): Semiancho de la banda de incertidumbre alrededor
+                del umbral en la que se aplica TTA (None = desactivado)
+            pallor_calibration (dict): Calibración de la primera etapa por
+                índice de palidez (ver ``ml_models.pallor``; None = solo CNN)
+            ensemble_with (list): Modelos .h5 adicionales evaluados junto con
+                ``model_path`` sobre el mismo tensor (None = un solo modelo)
+            ensemble_strategy (str): 'mean' (media, ponderada con
+                ``ensemble_weights``) o 'vote' (mayoría de modelos)
+            ensemble_weights (list): Peso de cada modelo en la media, en el
+                orden ``model_path`` + ``ensemble_with`` (None = iguales)
         """
         self.model_path = Path(model_path)
-        self.model = None
+        self.inference_mode = inference_mode
+        self.ensemble_paths = (
+            [self.model_path, *(Path(path) for path in ensemble_with)]
+            if ensemble_with else None
+        )
+        if ensemble_strategy not in ENSEMBLE_STRATEGIES:
+            raise ValueError(
+                f"Estrategia de ensemble desconocida: '{ensemble_strategy}'. "
+                f"Opciones válidas: {', '.join(ENSEMBLE_STRATEGIES)}"
+            )
+        if ensemble_weights and len(ensemble_weights) != len(self.ensemble_paths or [None]):
+            raise ValueError("ensemble_weights debe tener un peso por modelo del ensemble")
+        self.ensemble_strategy = ensemble_strategy
+        self.ensemble_weights = (
+            np.asarray(ensemble_weights, dtype=np.float64) / np.sum(ensemble_weights)
+            if ensemble_weights and self.ensemble_paths else None
+        )
+        backends = [
+            create_backend(
+                backend, path, inference_mode=inference_mode, **(backend_options or {})
+            )
+            for path in self.ensemble_paths or [self.model_path]
+        ]
+        self.backend = EnsembleBackend(backends) if self.ensemble_paths else backends[0]
         self.input_size = (64, 64)
-        self.threshold = 0.5  # Umbral de decisión por defecto
+        self.preprocessor = ImagePreprocessor(
+            self.input_size, fast_decode=fast_decode, reducing_gap=reducing_gap
+        )
+        self.threshold = DEFAULT_THRESHOLD
+        self._model_version = None
+        self.buffer_pool = TensorBufferPool((*self.input_size, 3))
+        self.tta_band = tta_band or None
+        self.augmenter = TestTimeAugmenter(self.input_size) if self.tta_band else None
+        self.pallor_prescreen = (
+            PallorPrescreen(pallor_calibration) if pallor_calibration else None
+        )
+    
+    @property
+    def model_version(self):
+        """
+        Identificador de la versión del modelo servida.
         
-    def load_model(self):
-        """Carga el modelo de TensorFlow."""
-        if not self.model_path.exists():
+        Combina el nombre y el hash SHA-256 del archivo .h5 de origen (de
+        todos los modelos, si es un ensemble) con el backend, el modo de
+        inferencia, el pipeline de preprocesamiento, la banda de TTA y la
+        primera etapa por palidez, ya que todos pueden alterar las
+        probabilidades.
+        """
+        if self._model_version is None:
+            paths = self.ensemble_paths or [self.model_path]
+            hashes = []
+            for path in paths:
+                metadata = read_model_metadata(path)
+                if not metadata['exists']:
+                    raise FileNotFoundError(f"Modelo no encontrado en: {path}")
+                hashes.append(metadata['version_hash'])
+            if self.ensemble_paths:
+                # Longitud fija (version_modelo es un CharField de 100): los
+                # nombres, hashes y pesos de los modelos van dentro del hash
+                weights = (
+                    [] if self.ensemble_weights is None
+                    else [f"{weight:.6g}" for weight in self.ensemble_weights]
+                )
+                fingerprint = json.dumps([[path.stem for path in paths], hashes, weights])
+                name = f"ensemble{len(paths)}"
+                version_hash = hashlib.sha256(fingerprint.encode()).hexdigest()[:12]
+            else:
+                name, version_hash = self.model_path.stem, hashes[0]
+            self._model_version = (
+                f"{name}-{version_hash}"
+                f"-{self.backend.name}-{self.inference_mode}"
+                f"-{self.preprocessor.signature}"
+            )
+            if self.ensemble_paths:
+                self._model_version += f"-{self.ensemble_strategy}"
+            if self.tta_band:
+                self._model_version += f"-tta{self.tta_band:g}"
+            if self.pallor_prescreen is not None:
+                self._model_version += f"-{self.pallor_prescreen.signature}"
+        return self._model_version
+    
+    @property
+    def embedding_version(self):
+        """
+        Identificador de los embeddings de la penúltima capa.
+
+        Solo depende del modelo principal y del preprocesamiento: la TTA, la
+        primera etapa por palidez y los demás modelos de un ensemble no
+        cambian el embedding.
+        """
+        metadata = read_model_metadata(self.model_path)
+        if not metadata['exists']:
             raise FileNotFoundError(f"Modelo no encontrado en: {self.model_path}")
+        return (
+            f"{self.model_path.stem}-{metadata['version_hash']}"
+            f"-{self.preprocessor.signature}"
+        )
+    
+    @property
+    def model(self):
+        """Modelo cargado en el backend (None si aún no se ha cargado)."""
+        return self.backend.model
         
-        self.model = tf.keras.models.load_model(str(self.model_path))
-        print(f"Modelo cargado exitosamente desde {self.model_path}")
-        print(f"   Input shape: {self.model.input_shape}")
-        print(f"   Output shape: {self.model.output_shape}")
+    def load_model(self):
+        """Carga el modelo con el backend de inferencia configurado."""
+        self.backend.load()
+        info = self.backend.get_info()
+        print(f"Modelo cargado exitosamente desde {self.backend.model_path} "
+              f"(backend: {self.backend.name})")
+        print(f"   Input shape: {info['input_shape']}")
+        print(f"   Output shape: {info['output_shape']}")
         
     def preprocess_image(self, image_path_or_array):
         """
         Preprocesa una imagen para el modelo.
         
         Args:
-            image_path_or_array: Ruta a la imagen o array numpy
+            image_path_or_array: Ruta a la imagen, bytes del archivo,
+                imagen PIL o array numpy
             
         Returns:
             np.ndarray: Imagen preprocesada lista para predicción
         """
-        # Cargar imagen si es una ruta
-        if isinstance(image_path_or_array, (str, Path)):
-            img = Image.open(image_path_or_array)
-        elif isinstance(image_path_or_array, Image.Image):
-            img = image_path_or_array
-        else:
-            # Asumir que es un array numpy
-            img = Image.fromarray(image_path_or_array)
-        
-        # Convertir a RGB si es necesario
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Redimensionar a 64x64
-        img = img.resize(self.input_size)
-        
-        # Convertir a array y normalizar
-        img_array = np.array(img, dtype=np.float32) / 255.0
-        
-        # Añadir dimensión de batch
-        img_array = np.expand_dims(img_array, axis=0)
-        
+        # Un único array (1, 64, 64, 3) normalizado directamente en su sitio
+        img_array = np.empty((1, *self.input_size, 3), dtype=np.float32)
+        self.preprocessor.preprocess(image_path_or_array, img_array[0])
         return img_array
     
-    def predict(self, image_path_or_array, return_probability=False):
+    def preprocess_into(self, image_path_or_array, out):
+        """
+        Preprocesa una imagen escribiendo el resultado en un buffer existente.
+        
+        Args:
+            image_path_or_array: Ruta a la imagen, imagen PIL o array numpy
+            out (np.ndarray): Vista float32 de forma (64, 64, 3) a rellenar
+            
+        Returns:
+            np.ndarray: El mismo buffer ``out`` normalizado a [0, 1]
+        """
+        return self.preprocessor.preprocess(image_path_or_array, out)
+    
+    def predict(self, image_path_or_array, return_probability=False, return_embedding=False):
         """
         Realiza una predicción sobre una imagen.
         
         Args:
             image_path_or_array: Ruta a la imagen o array numpy
             return_probability (bool): Si True, retorna la probabilidad cruda
+            return_embedding (bool): Incluir en el resultado (``embedding``)
+                el vector float32 de la penúltima capa; la imagen pasa
+                siempre por la CNN
             
         Returns:
             dict: Resultado de la predicción con información detallada
@@ -82,13 +222,246 @@ class AnemiaDetector:
         if self.model is None:
             self.load_model()
         
-        # Preprocesar imagen
-        img_array = self.preprocess_image(image_path_or_array)
+        # Preprocesar en un tensor del pool, devuelto tras la inferencia
+        img_array = self.acquire_input(1)
+        try:
+            self.preprocessor.preprocess(image_path_or_array, img_array[0])
+            if return_embedding:
+                scores, embeddings = self.predict_scores(img_array, return_embedding=True)
+            else:
+                early = self.prescreen(img_array)
+                if early:
+                    return early[0]
+                scores = self.predict_scores(img_array)
+            probabilities, members = self.combine_scores(scores)
+            result = self.finish_prediction(
+                img_array, float(probabilities[0]),
+                members=None if members is None else members[0],
+            )
+            if return_embedding:
+                result['embedding'] = embeddings[0].copy()
+            return result
+        finally:
+            self.release_input(img_array)
+    
+    def finish_prediction(self, img_array, probability, predict_fn=None, members=None):
+        """
+        Construye el resultado de una imagen, aplicando TTA si la
+        probabilidad cae en la banda de incertidumbre.
         
-        # Realizar predicción
-        prediction = self.model.predict(img_array, verbose=0)
-        probability = float(prediction[0][0])
+        Args:
+            img_array (np.ndarray): Tensor (1, 64, 64, 3) de la imagen
+            probability (float): Probabilidad de la pasada base
+            predict_fn (callable): Función de inferencia para las vistas
+                (por defecto ``predict_preprocessed``)
+            members (np.ndarray): Probabilidad de cada modelo del ensemble
+                en la pasada base (None = un solo modelo)
+            
+        Returns:
+            dict: Resultado de la predicción (con clave ``tta`` si se aplicó)
+        """
+        probabilities, tta = self.apply_tta(
+            img_array, np.array([probability]), predict_fn
+        )
+        result = self.build_result(float(probabilities[0]), members)
+        if tta:
+            result['tta'] = tta[0]
+        return result
+    
+    def prescreen(self, img_batch):
+        """
+        Resuelve con el índice de palidez las imágenes claras del batch.
+        
+        Args:
+            img_batch (np.ndarray): Tensor (N, 64, 64, 3) preprocesado
+            
+        Returns:
+            dict: Índice en el batch -> resultado (``stage`` 'pallor'); vacío
+            si la primera etapa está desactivada o todas son dudosas
+        """
+        if self.pallor_prescreen is None:
+            return {}
+        probabilities, indices = self.pallor_prescreen.decide(img_batch)
+        early = {}
+        for i in np.flatnonzero(~np.isnan(probabilities)):
+            result = self.build_result(float(probabilities[i]))
+            result['stage'] = 'pallor'
+            result['pallor_index'] = float(indices[i])
+            early[int(i)] = result
+        return early
+    
+    def apply_tta(self, img_batch, probabilities, predict_fn=None):
+        """
+        Re-evalúa con TTA las imágenes cuya probabilidad está a menos de
+        ``tta_band`` del umbral.
+        
+        Las vistas de todas las imágenes dudosas se evalúan en una sola
+        pasada del modelo y su media sustituye a la probabilidad base.
+        
+        Args:
+            img_batch (np.ndarray): Tensor (N, 64, 64, 3) de las imágenes
+            probabilities (np.ndarray): Vector de N probabilidades base
+            predict_fn (callable): Función de inferencia para las vistas
+                
+        Returns:
+            tuple: (probabilidades ajustadas, dict índice -> métricas de TTA)
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if self.augmenter is None:
+            return probabilities, {}
+        
+        uncertain = np.flatnonzero(
+            np.abs(probabilities - self.threshold) < self.tta_band
+        )
+        if not uncertain.size:
+            return probabilities, {}
         
+        num_views = self.augmenter.num_views
+        views = self.acquire_input(len(uncertain) * num_views)
+        try:
+            for j, i in enumerate(uncertain):
+                self.augmenter.augment_into(
+                    img_batch[i], views[j * num_views:(j + 1) * num_views]
+                )
+            view_probabilities = np.asarray(
+                (predict_fn or self.predict_preprocessed)(views), dtype=np.float64
+            ).reshape(len(uncertain), num_views)
+        finally:
+            self.release_input(views)
+        
+        probabilities = probabilities.copy()
+        means = view_probabilities.mean(axis=1)
+        spreads = view_probabilities.std(axis=1)
+        tta = {}
+        for j, i in enumerate(uncertain):
+            tta[int(i)] = {
+                'views': num_views,
+                'base_probability': float(probabilities[i]),
+                'spread': float(spreads[j]),
+                'min_probability': float(view_probabilities[j].min()),
+                'max_probability': float(view_probabilities[j].max()),
+            }
+        probabilities[uncertain] = means
+        return probabilities, tta
+    
+    def acquire_input(self, count):
+        """
+        Obtiene del pool un tensor de entrada para ``count`` imágenes.
+        
+        Args:
+            count (int): Número de imágenes
+            
+        Returns:
+            np.ndarray: Tensor float32 (count, 64, 64, 3) sin inicializar;
+            debe devolverse con ``release_input`` tras la inferencia
+        """
+        return self.buffer_pool.acquire(count)
+    
+    def release_input(self, img_batch):
+        """Devuelve al pool un tensor obtenido con ``acquire_input``."""
+        self.buffer_pool.release(img_batch)
+    
+    def get_stats(self):
+        """
+        Retorna estadísticas del detector.
+        
+        Returns:
+            dict: Contadores del pool de tensores de entrada y, si está
+            activa, de la primera etapa por palidez
+        """
+        stats = {'buffer_pool': self.buffer_pool.get_stats()}
+        if self.pallor_prescreen is not None:
+            stats['pallor_prescreen'] = self.pallor_prescreen.get_stats()
+        return stats
+    
+    def predict_preprocessed(self, img_batch):
+        """
+        Ejecuta el modelo sobre un batch ya preprocesado.
+        
+        Args:
+            img_batch (np.ndarray): Tensor float32 de forma (N, 64, 64, 3)
+            
+        Returns:
+            np.ndarray: Vector de N probabilidades de anemia (combinadas si
+            es un ensemble)
+        """
+        return self.combine_scores(self.predict_scores(img_batch))[0]
+    
+    def predict_scores(self, img_batch, return_embedding=False):
+        """
+        Salida cruda del backend para un batch preprocesado.
+        
+        Args:
+            img_batch (np.ndarray): Tensor float32 de forma (N, 64, 64, 3)
+            return_embedding (bool): Retornar también, de la misma pasada,
+                el embedding de la penúltima capa (del modelo principal en
+                un ensemble)
+            
+        Returns:
+            np.ndarray | tuple: Vector de N probabilidades o, en un
+            ensemble, matriz (N, modelos), que se interpreta con
+            ``combine_scores``; con ``return_embedding``, tupla (salida,
+            matriz float32 (N, dimensión))
+        """
+        if self.model is None:
+            self.load_model()
+        
+        if return_embedding:
+            return self.backend.predict_with_embedding(img_batch)
+        return self.backend.predict(img_batch)
+    
+    def combine_scores(self, scores):
+        """
+        Combina la salida de ``predict_scores`` en una probabilidad por imagen.
+        
+        Con 'mean' se promedian (con pesos, si se configuraron) las
+        probabilidades de los modelos. Con 'vote' decide la mayoría de
+        modelos y la probabilidad es la media de los que votan con ella; en
+        caso de empate decide la media de todos.
+        
+        Args:
+            scores (np.ndarray): Vector (N,) o matriz (N, modelos)
+            
+        Returns:
+            tuple: (vector de N probabilidades, matriz (N, modelos) de
+            probabilidades por modelo o None si no es un ensemble)
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        if scores.ndim == 1:
+            return scores, None
+        
+        if self.ensemble_strategy == 'mean':
+            return np.average(scores, axis=1, weights=self.ensemble_weights), scores
+        
+        votes = scores >= self.threshold
+        positive = votes.sum(axis=1)
+        negative = scores.shape[1] - positive
+        mean = scores.mean(axis=1)
+        majority = np.where(positive == negative, mean >= self.threshold, positive > negative)
+        agreeing = votes == majority[:, None]
+        with np.errstate(invalid='ignore'):
+            majority_mean = (scores * agreeing).sum(axis=1) / agreeing.sum(axis=1)
+        return np.where(positive == negative, mean, majority_mean), scores
+    
+    @property
+    def member_names(self):
+        """Nombre de cada modelo del ensemble (None si es un solo modelo)."""
+        if not self.ensemble_paths:
+            return None
+        return [path.stem for path in self.ensemble_paths]
+    
+    def build_result(self, probability, members=None):
+        """
+        Construye el diccionario de resultado a partir de una probabilidad.
+        
+        Args:
+            probability (float): Probabilidad de anemia (0-1)
+            members (np.ndarray): Probabilidad de cada modelo del ensemble
+                (se incluye en el resultado como ``members``)
+            
+        Returns:
+            dict: Resultado de la predicción con información detallada
+        """
         # Clasificar según umbral
         has_anemia = probability >= self.threshold
         
@@ -102,24 +475,123 @@ class AnemiaDetector:
             'diagnosis': 'Anemia detectada' if has_anemia else 'No se detectó anemia',
             'confidence_level': self._get_confidence_level(confidence)
         }
+        if self.pallor_prescreen is not None:
+            result['stage'] = 'cnn'
+        if members is not None:
+            result['members'] = dict(zip(self.member_names, map(float, members)))
         
         return result
     
-    def predict_batch(self, image_paths):
+    def build_results(self, probabilities, members=None):
+        """
+        Versión vectorizada de ``build_result`` para un vector de probabilidades.
+        
+        Args:
+            probabilities (np.ndarray): Vector de N probabilidades
+            members (np.ndarray): Matriz (N, modelos) de probabilidades por
+                modelo del ensemble (None = un solo modelo)
+            
+        Returns:
+            list: Lista de N diccionarios de resultado
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64).reshape(-1)
+        has_anemia = probabilities >= self.threshold
+        stage = {'stage': 'cnn'} if self.pallor_prescreen is not None else {}
+        confidence = np.where(has_anemia, probabilities, 1 - probabilities)
+        levels = np.select(
+            [confidence >= limit for limit, _ in CONFIDENCE_LEVELS],
+            [label for _, label in CONFIDENCE_LEVELS],
+            default=LOWEST_CONFIDENCE_LEVEL,
+        )
+        
+        results = [
+            {
+                'has_anemia': bool(anemia),
+                'probability': float(probability),
+                'confidence': float(conf),
+                'diagnosis': 'Anemia detectada' if anemia else 'No se detectó anemia',
+                'confidence_level': str(level),
+                **stage,
+            }
+            for anemia, probability, conf, level in zip(
+                has_anemia, probabilities, confidence, levels
+            )
+        ]
+        if members is not None:
+            names = self.member_names
+            for result, row in zip(results, np.asarray(members).tolist()):
+                result['members'] = dict(zip(names, row))
+        return results
+    
+    def predict_batch(self, image_paths, batch_size=128, num_workers=None):
         """
         Realiza predicciones sobre múltiples imágenes.
         
+        Las imágenes se procesan por bloques de ``batch_size``: cada bloque se
+        decodifica en paralelo directamente sobre un tensor float32 del pool
+        de entrada y se ejecuta en una sola pasada del modelo.
+        
         Args:
             image_paths (list): Lista de rutas de imágenes
+            batch_size (int): Número de imágenes por pasada del modelo
+            num_workers (int): Hilos de decodificación (None = automático)
             
         Returns:
             list: Lista de resultados de predicciones
         """
-        results = []
-        for img_path in image_paths:
-            result = self.predict(img_path)
+        image_paths = list(image_paths)
+        if not image_paths:
+            return []
+        if batch_size < 1:
+            raise ValueError("El tamaño de batch debe ser al menos 1")
+        
+        if self.model is None:
+            self.load_model()
+        
+        total = len(image_paths)
+        probabilities = np.empty(total, dtype=np.float64)
+        members = (
+            np.full((total, len(self.ensemble_paths)), np.nan) if self.ensemble_paths else None
+        )
+        tta = {}
+        early = {}
+        
+        # Por bloques de ``batch_size``: decodificar en paralelo sobre un
+        # tensor del pool (PIL libera el GIL) y ejecutar una pasada del modelo
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            for start in range(0, total, batch_size):
+                end = min(start + batch_size, total)
+                batch = self.acquire_input(end - start)
+                try:
+                    list(executor.map(
+                        lambda i: self.preprocess_into(image_paths[start + i], batch[i]),
+                        range(end - start),
+                    ))
+                    # Solo las imágenes dudosas para el índice pasan por el modelo
+                    chunk_early = self.prescreen(batch)
+                    early.update((start + i, result) for i, result in chunk_early.items())
+                    pending = [i for i in range(end - start) if i not in chunk_early]
+                    if pending:
+                        images = batch if len(pending) == end - start else batch[pending]
+                        rows = [start + i for i in pending]
+                        base, chunk_members = self.combine_scores(self.predict_scores(images))
+                        chunk_probabilities, chunk_tta = self.apply_tta(images, base)
+                        probabilities[rows] = chunk_probabilities
+                        if chunk_members is not None:
+                            members[rows] = chunk_members
+                        tta.update((start + pending[j], info) for j, info in chunk_tta.items())
+                finally:
+                    self.release_input(batch)
+        
+        for i, result in early.items():
+            probabilities[i] = result['probability']
+        results = self.build_results(probabilities, members)
+        for i, result in early.items():
+            results[i] = result
+        for i, info in tta.items():
+            results[i]['tta'] = info
+        for result, img_path in zip(results, image_paths):
             result['image_path'] = str(img_path)
-            results.append(result)
         return results
     
     def _get_confidence_level(self, confidence):
@@ -132,14 +604,10 @@ class AnemiaDetector:
         Returns:
             str: Nivel de confianza en palabras
         """
-        if confidence >= 0.9:
-            return 'Muy alta'
-        elif confidence >= 0.75:
-            return 'Alta'
-        elif confidence >= 0.6:
-            return 'Moderada'
-        else:
-            return 'Baja'
+        for limit, label in CONFIDENCE_LEVELS:
+            if confidence >= limit:
+                return label
+        return LOWEST_CONFIDENCE_LEVEL
     
     def set_threshold(self, threshold):
         """
@@ -157,20 +625,59 @@ class AnemiaDetector:
         """
         Retorna información sobre el modelo.
         
+        Si el modelo aún no está cargado no lo carga: retorna los metadatos
+        del archivo .h5 (ver ``ml_models.metadata``) con ``loaded`` en False.
+        
         Returns:
             dict: Información del modelo
         """
+        if self.model is None:
+            info = read_model_metadata(self.model_path)
+            info['loaded'] = False
+        else:
+            info = self.backend.get_info()
+            info['loaded'] = True
+        if self.ensemble_paths:
+            info['ensemble'] = {
+                'members': [str(path) for path in self.ensemble_paths],
+                'strategy': self.ensemble_strategy,
+                'weights': (
+                    None if self.ensemble_weights is None else self.ensemble_weights.tolist()
+                ),
+            }
+        info['backend'] = self.backend.name
+        info['inference_mode'] = self.inference_mode
+        info['threshold'] = self.threshold
+        return info
+
+    def benchmark_latency(self, repeats=50):
+        """
+        Mide la latencia de inferencia de una sola imagen.
+        
+        Compara la ruta usada en solicitudes interactivas (``backend.predict``)
+        con ``model.predict`` cuando el backend dispone de ella.
+        
+        Args:
+            repeats (int): Invocaciones medidas por ruta
+            
+        Returns:
+            dict: Resumen de latencias por ruta (ms)
+        """
         if self.model is None:
             self.load_model()
         
-        return {
-            'model_name': self.model.name,
-            'input_shape': self.model.input_shape,
-            'output_shape': self.model.output_shape,
-            'total_params': self.model.count_params(),
-            'num_layers': len(self.model.layers),
-            'threshold': self.threshold
-        }
+        rng = np.random.default_rng(0)
+        sample_batch = rng.random((8, *self.input_size, 3), dtype=np.float32)
+        
+        results = {}
+        if hasattr(self.backend, 'predict_offline'):
+            results['model_predict'] = measure_latency(
+                self.backend.predict_offline, sample_batch, repeats=repeats
+            )
+        results['fast_path'] = measure_latency(
+            self.backend.predict, sample_batch, repeats=repeats
+        )
+        return results
 
 
 # Ejemplo de uso
@@ -186,4 +693,10 @@ if __name__ == '__main__':
     print("\n📊 Información del Modelo:")
     for key, value in info.items():
         print(f"   {key}: {value}")
+    
+    # Latencia de una imagen: model.predict (antes) vs ruta compilada (después)
+    print("\n⏱️  Latencia de una imagen:")
+    for path_name, latency in detector.benchmark_latency().items():
+        print(f"   {path_name}: p50 {latency['p50_ms']:.3f} ms | "
+              f"p95 {latency['p95_ms']:.3f} ms | p99 {latency['p99_ms']:.3f} ms")
     
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+API asyncio para el detector de anemia (despliegues ASGI).
+
+La decodificación y la inferencia son bloqueantes, así que ``apredict`` y
+``apredict_batch`` las ejecutan en un pool de hilos acotado sin ocupar el
+bucle de eventos:
+
+    - Contrapresión: como mucho ``max_pending`` trabajos admitidos (en
+      ejecución o en cola) en todo el proceso, también bajo WSGI, donde
+      ``async_to_sync`` crea un bucle de eventos por solicitud. Si no queda
+      hueco en ``queue_timeout`` segundos se lanza
+      ``InferenceOverloadedError`` en lugar de acumular solicitudes sin
+      límite. Con ASGI las esperas se encolan primero en un semáforo del
+      bucle, sin ocupar hilos.
+    - Cancelación: si la tarea que espera se cancela (p. ej. el cliente se
+      desconecta), el trabajo que aún no empezó se descarta; el que ya se
+      está ejecutando termina en su hilo y su resultado se ignora. El hueco
+      se libera solo cuando el hilo queda realmente libre.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceOverloadedError(RuntimeError):
+    """No hay hueco para más trabajos de inferencia en el tiempo de espera."""
+
+
+class AsyncInferenceExecutor:
+    """
+    Ejecuta las predicciones del detector desde corrutinas.
+    """
+
+    def __init__(self, detector, max_workers=8, max_pending=64, queue_timeout=1.0):
+        """
+        Args:
+            detector: Detector (cualquier nivel de la cadena) o función sin
+                argumentos que retorna el detector activo; esta última se
+                invoca en el hilo de trabajo (puede cargar el modelo)
+            max_workers (int): Hilos que decodifican e infieren en paralelo
+            max_pending (int): Trabajos admitidos a la vez en el proceso
+            queue_timeout (float): Segundos de espera de un hueco antes de
+                rechazar (0 = rechazar de inmediato)
+        """
+        self._get_detector = detector if callable(detector) else (lambda: detector)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = weakref.WeakKeyDictionary()
+        self._admission = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'cancelled_queued': 0,
+            'cancelled_running': 0,
+            'in_flight': 0,
+            'peak_in_flight': 0,
+        }
+
+    def _count(self, key, delta=1):
+        with self._stats_lock:
+            self._stats[key] += delta
+            if key == 'in_flight':
+                self._stats['peak_in_flight'] = max(
+                    self._stats['peak_in_flight'], self._stats['in_flight']
+                )
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='anemia-async'
+                    )
+        return self._executor
+
+    def _get_slots(self, loop):
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_pending)
+        return slots
+
+    async def _admit(self, loop, slots):
+        """
+        Reserva un hueco del bucle y otro del proceso antes de ``queue_timeout``.
+
+        Returns:
+            bool: True si el trabajo quedó admitido (con ambos huecos)
+        """
+        deadline = loop.time() + self.queue_timeout
+        try:
+            if self.queue_timeout > 0:
+                await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+            elif slots.locked():
+                return False
+            else:
+                await slots.acquire()
+        except asyncio.TimeoutError:
+            return False
+
+        if self._admission.acquire(blocking=False):
+            return True
+        remaining = deadline - loop.time()
+        if remaining > 0:
+            # Huecos ocupados desde otros bucles: se espera en un hilo
+            waiter = loop.run_in_executor(None, self._admission.acquire, True, remaining)
+            try:
+                if await asyncio.shield(waiter):
+                    return True
+            except asyncio.CancelledError:
+                def release_late(future):
+                    if not future.cancelled() and future.exception() is None and future.result():
+                        self._admission.release()
+
+                waiter.add_done_callback(release_late)
+                slots.release()
+                raise
+        slots.release()
+        return False
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        slots = self._get_slots(loop)
+        if not await self._admit(loop, slots):
+            self._count('rejected')
+            raise InferenceOverloadedError(
+                f"Cola de inferencia llena ({self.max_pending} trabajos pendientes)"
+            )
+
+        self._count('submitted')
+        self._count('in_flight')
+        started = threading.Event()
+
+        def job():
+            started.set()
+            return fn(*args)
+
+        def release(_):
+            self._count('in_flight', -1)
+            self._admission.release()
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                # Bucle ya cerrado: nadie más espera en este semáforo
+                pass
+
+        try:
+            future = self._get_executor().submit(job)
+        except BaseException:
+            self._count('in_flight', -1)
+            self._admission.release()
+            slots.release()
+            raise
+        future.add_done_callback(release)
+
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # wrap_future ya intentó cancelar el trabajo en el executor
+            self._count('cancelled_running' if started.is_set() else 'cancelled_queued')
+            raise
+        except Exception:
+            self._count('failed')
+            raise
+        self._count('completed')
+        return result
+
+    def _predict(self, image, return_probability):
+        return self._get_detector().predict(image, return_probability=return_probability)
+
+    def _predict_chunk(self, images):
+        detector = self._get_detector()
+        if hasattr(detector, 'predict_batch'):
+            return detector.predict_batch(images)
+        return [detector.predict(image) for image in images]
+
+    async def apredict(self, image, return_probability=False):
+        """
+        Predicción de una imagen sin bloquear el bucle de eventos.
+
+        Args:
+            image: Bytes, ruta, imagen PIL o array numpy
+            return_probability (bool): Ver ``AnemiaDetector.predict``
+
+        Returns:
+            dict: Resultado de la predicción
+
+        Raises:
+            InferenceOverloadedError: Si la cola está llena
+        """
+        return await self._run(self._predict, image, return_probability)
+
+    async def apredict_batch(self, images, batch_size=32):
+        """
+        Predicción de varias imágenes en trabajos de ``batch_size`` que se
+        ejecutan en paralelo.
+
+        Si la corrutina se cancela, se cancelan todos los trabajos pendientes.
+
+        Args:
+            images (list): Imágenes (bytes, rutas, PIL o arrays)
+            batch_size (int): Imágenes por trabajo del executor
+
+        Returns:
+            list: Resultados en el mismo orden que ``images``
+
+        Raises:
+            InferenceOverloadedError: Si la cola está llena
+        """
+        images = list(images)
+        chunks = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+        tasks = [asyncio.ensure_future(self._run(self._predict_chunk, chunk)) for chunk in chunks]
+        try:
+            chunk_results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return [result for chunk in chunk_results for result in chunk]
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: Trabajos enviados, completados, rechazados por
+            contrapresión, cancelados y en curso
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['max_workers'] = self.max_workers
+        stats['max_pending'] = self.max_pending
+        return stats
+
+    def shutdown(self, wait=True):
+        """Detiene el pool de hilos tras terminar los trabajos admitidos."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,78 @@
+"""
+Aumento en tiempo de inferencia (TTA) para probabilidades dudosas.
+
+Todas las vistas aumentadas de una imagen (original, espejo horizontal,
+recortes ligeros en las esquinas y el centro, y variaciones de brillo) se
+construyen con una sola operación vectorizada: un ``np.take`` sobre índices
+de píxel precalculados escribe las K vistas directamente en un tensor
+(K, 64, 64, 3), que luego se escala por la ganancia de brillo de cada vista.
+El tensor resultante se evalúa en una única pasada del modelo.
+"""
+import numpy as np
+
+
+class TestTimeAugmenter:
+    """
+    Genera las vistas aumentadas de una imagen preprocesada.
+    """
+
+    def __init__(self, input_size=(64, 64), crop_fraction=0.875, brightness=(0.9, 1.1)):
+        """
+        Args:
+            input_size (tuple): Tamaño (ancho, alto) de entrada del modelo
+            crop_fraction (float): Fracción del lado que conserva cada recorte
+            brightness (tuple): Ganancias de brillo aplicadas a la imagen original
+        """
+        width, height = input_size
+        crop_h = int(round(height * crop_fraction))
+        crop_w = int(round(width * crop_fraction))
+
+        identity_rows = np.arange(height)
+        identity_cols = np.arange(width)
+        # Muestreo del recorte al tamaño completo (vecino más cercano)
+        crop_rows = ((np.arange(height) + 0.5) * crop_h / height).astype(np.intp)
+        crop_cols = ((np.arange(width) + 0.5) * crop_w / width).astype(np.intp)
+
+        views = [
+            ('original', identity_rows, identity_cols, 1.0),
+            ('espejo', identity_rows, identity_cols[::-1], 1.0),
+        ]
+        offsets = {
+            'recorte_centro': ((height - crop_h) // 2, (width - crop_w) // 2),
+            'recorte_sup_izq': (0, 0),
+            'recorte_sup_der': (0, width - crop_w),
+            'recorte_inf_izq': (height - crop_h, 0),
+            'recorte_inf_der': (height - crop_h, width - crop_w),
+        }
+        for name, (row_offset, col_offset) in offsets.items():
+            views.append((name, crop_rows + row_offset, crop_cols + col_offset, 1.0))
+        for gain in brightness:
+            views.append((f"brillo_{gain:g}", identity_rows, identity_cols, gain))
+
+        self.view_names = [name for name, _, _, _ in views]
+        self._flat_index = np.stack([
+            rows[:, None] * width + cols[None, :] for _, rows, cols, _ in views
+        ])
+        self._gains = np.array(
+            [gain for _, _, _, gain in views], dtype=np.float32
+        ).reshape(-1, 1, 1, 1)
+
+    @property
+    def num_views(self):
+        return len(self.view_names)
+
+    def augment_into(self, image, out):
+        """
+        Escribe las vistas aumentadas de ``image`` en ``out``.
+
+        Args:
+            image (np.ndarray): Imagen normalizada (64, 64, 3) contigua
+            out (np.ndarray): Tensor float32 (num_views, 64, 64, 3)
+
+        Returns:
+            np.ndarray: El mismo tensor ``out``
+        """
+        np.take(image.reshape(-1, image.shape[-1]), self._flat_index, axis=0, out=out)
+        np.multiply(out, self._gains, out=out)
+        np.clip(out, 0.0, 1.0, out=out)
+        return out
@@ -0,0 +1,304 @@
+"""
+Ajuste automático del runtime de inferencia en CPU.
+
+Cada configuración candidata (réplicas, hilos intra-op/inter-op) se mide
+con procesos reales: se arrancan ``replicas`` procesos nuevos, cada uno
+carga el modelo con sus hilos y todos ejecutan a la vez, sincronizados con
+una barrera, un bucle cerrado de preprocesamiento + inferencia para cada
+tamaño de batch. Así se reproduce la competencia por los núcleos entre
+workers de Django que comparten la máquina.
+
+La mejor configuración es la de mayor throughput agregado cuyo p99 por
+batch no supera el presupuesto de latencia.
+"""
+import time
+from multiprocessing import get_context
+
+from ml_models.profiling import summarize_latencies
+from ml_models.runtime_profile import usable_cpu_count
+
+
+# Tamaños de batch medidos por defecto
+DEFAULT_BATCH_SIZES = (1, 4, 8, 16, 32)
+
+# Configuración actual sin perfil: 3 workers de gunicorn con los hilos por
+# defecto de TensorFlow (uno por núcleo en cada proceso)
+BASELINE_REPLICAS = 3
+
+# Backends cuyos hilos se pueden fijar por proceso
+THREADED_BACKENDS = ('keras', 'tflite')
+
+
+def _powers_of_two_up_to(limit):
+    values = []
+    value = 1
+    while value <= limit:
+        values.append(value)
+        value *= 2
+    if limit >= 1 and limit not in values:
+        values.append(limit)
+    return values
+
+
+def candidate_configurations(cpus, backend='keras', max_replicas=None):
+    """
+    Configuraciones a medir sin sobresuscribir los núcleos.
+
+    Args:
+        cpus (int): Núcleos disponibles
+        backend (str): Backend de inferencia ('tflite' no tiene inter-op y
+            'mmap' y 'numpy' no admiten fijar hilos)
+        max_replicas (int): Máximo de procesos (None = ``cpus``)
+
+    Returns:
+        list: Dicts con replicas, intra_op_threads e inter_op_threads
+    """
+    candidates = []
+    for replicas in _powers_of_two_up_to(min(max_replicas or cpus, cpus)):
+        if backend not in THREADED_BACKENDS:
+            # Sin control de hilos: solo varía el número de réplicas
+            candidates.append({'replicas': replicas, 'intra_op_threads': 0, 'inter_op_threads': 0})
+            continue
+        for intra in _powers_of_two_up_to(cpus // replicas):
+            inter_options = (1, 2) if backend == 'keras' and cpus // replicas > 1 else (1,)
+            for inter in inter_options:
+                candidates.append({
+                    'replicas': replicas,
+                    'intra_op_threads': intra,
+                    'inter_op_threads': inter,
+                })
+    return candidates
+
+
+def _replica_worker(spec, barrier, results):
+    """Proceso de una réplica: carga el modelo y mide cada tamaño de batch."""
+    try:
+        from ml_models.anemia_detector import AnemiaDetector
+
+        backend_options = dict(spec['backend_options'])
+        if spec['backend'] == 'tflite':
+            backend_options['num_threads'] = spec['intra_op_threads']
+        elif spec['backend'] == 'keras':
+            backend_options['intra_op_threads'] = spec['intra_op_threads']
+            backend_options['inter_op_threads'] = spec['inter_op_threads']
+
+        detector = AnemiaDetector(
+            model_path=spec['model_path'],
+            backend=spec['backend'],
+            backend_options=backend_options,
+            inference_mode=spec['inference_mode'],
+        )
+        detector.backend.load()
+        samples = spec['samples']
+
+        measurements = {}
+        for batch_size in spec['batch_sizes']:
+            tensor = detector.acquire_input(batch_size)
+            try:
+                def run_batch():
+                    for i in range(batch_size):
+                        detector.preprocess_into(samples[i % len(samples)], tensor[i])
+                    detector.predict_preprocessed(tensor)
+
+                run_batch()
+                barrier.wait()
+                latencies = []
+                start = time.perf_counter()
+                deadline = start + spec['duration']
+                while True:
+                    batch_start = time.perf_counter()
+                    run_batch()
+                    now = time.perf_counter()
+                    latencies.append((now - batch_start) * 1000)
+                    if now >= deadline:
+                        break
+            finally:
+                detector.release_input(tensor)
+            measurements[batch_size] = {
+                'images': len(latencies) * batch_size,
+                'elapsed': now - start,
+                'latencies_ms': latencies,
+            }
+        results.put(measurements)
+    except Exception as e:
+        barrier.abort()
+        results.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def measure_configuration(config, model_path, samples, backend='keras', backend_options=None,
+                          inference_mode='float', batch_sizes=DEFAULT_BATCH_SIZES,
+                          duration=2.0, timeout=300):
+    """
+    Mide una configuración con ``replicas`` procesos concurrentes.
+
+    Args:
+        config (dict): replicas, intra_op_threads (0 = por defecto) e
+            inter_op_threads
+        model_path (str): Ruta del modelo .h5
+        samples (list): Imágenes de muestra (bytes o arrays RGB)
+        backend (str): Backend de inferencia
+        backend_options (dict): Opciones adicionales del backend
+        inference_mode (str): Modo de inferencia
+        batch_sizes (tuple): Tamaños de batch a medir
+        duration (float): Segundos de carga sostenida por tamaño de batch
+        timeout (float): Segundos máximos de espera por réplica
+
+    Returns:
+        dict: La configuración con throughput y latencias por tamaño de
+        batch, o con ``error``
+    """
+    context = get_context('spawn')
+    replicas = config['replicas']
+    barrier = context.Barrier(replicas)
+    results = context.Queue()
+    spec = {
+        'model_path': str(model_path),
+        'backend': backend,
+        'backend_options': backend_options or {},
+        'inference_mode': inference_mode,
+        'intra_op_threads': config['intra_op_threads'] or None,
+        'inter_op_threads': config['inter_op_threads'] or None,
+        'samples': samples,
+        'batch_sizes': tuple(batch_sizes),
+        'duration': duration,
+    }
+    processes = [
+        context.Process(target=_replica_worker, args=(spec, barrier, results), daemon=True)
+        for _ in range(replicas)
+    ]
+    for process in processes:
+        process.start()
+
+    measurements = []
+    try:
+        for _ in range(replicas):
+            measurements.append(results.get(timeout=timeout))
+    except Exception as e:
+        measurements.append({'error': f"Sin respuesta de una réplica: {type(e).__name__}"})
+    finally:
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+    result = dict(config)
+    errors = [m['error'] for m in measurements if 'error' in m]
+    if errors:
+        result['error'] = errors[0]
+        return result
+
+    result['batches'] = {}
+    for batch_size in batch_sizes:
+        per_replica = [m[batch_size] for m in measurements]
+        latencies = [value for m in per_replica for value in m['latencies_ms']]
+        result['batches'][str(batch_size)] = {
+            'images_per_s': sum(m['images'] / m['elapsed'] for m in per_replica),
+            **summarize_latencies(latencies),
+        }
+    return result
+
+
+def select_best(results, max_p99_ms):
+    """
+    Elige la mejor combinación de configuración y tamaño de batch.
+
+    Args:
+        results (list): Resultados de ``measure_configuration``
+        max_p99_ms (float): Presupuesto de latencia p99 por batch
+
+    Returns:
+        tuple: (resultado, tamaño de batch) o (None, None) si todo falló.
+        Si ninguna combinación cumple el presupuesto se elige la de menor p99
+    """
+    options = [
+        (result, int(batch_size), stats)
+        for result in results if 'error' not in result
+        for batch_size, stats in result['batches'].items()
+    ]
+    if not options:
+        return None, None
+
+    within_budget = [option for option in options if option[2]['p99_ms'] <= max_p99_ms]
+    if within_budget:
+        best = max(within_budget, key=lambda option: (option[2]['images_per_s'], -option[2]['p99_ms']))
+    else:
+        best = min(options, key=lambda option: option[2]['p99_ms'])
+    return best[0], best[1]
+
+
+def autotune(model_path, samples, backend='keras', backend_options=None, inference_mode='float',
+             batch_sizes=DEFAULT_BATCH_SIZES, duration=2.0, max_replicas=None,
+             max_p99_ms=100.0, include_baseline=True, progress=None):
+    """
+    Mide las configuraciones candidatas y construye el perfil de ejecución.
+
+    Args:
+        model_path (str): Ruta del modelo .h5
+        samples (list): Imágenes de muestra
+        backend (str): Backend de inferencia
+        backend_options (dict): Opciones adicionales del backend (sin hilos)
+        inference_mode (str): Modo de inferencia
+        batch_sizes (tuple): Tamaños de batch a medir
+        duration (float): Segundos de carga por tamaño de batch
+        max_replicas (int): Máximo de procesos (None = núcleos disponibles)
+        max_p99_ms (float): Presupuesto de latencia p99 por batch
+        include_baseline (bool): Medir también la configuración sin perfil
+        progress (callable): ``progress(result)`` tras cada configuración
+
+    Returns:
+        dict: Perfil de ejecución (ver ``ml_models.runtime_profile``)
+    """
+    cpus = usable_cpu_count()
+    configs = candidate_configurations(cpus, backend, max_replicas)
+
+    def measure(config):
+        result = measure_configuration(
+            config, model_path, samples, backend=backend, backend_options=backend_options,
+            inference_mode=inference_mode, batch_sizes=batch_sizes, duration=duration,
+        )
+        if progress:
+            progress(result)
+        return result
+
+    baseline = None
+    if include_baseline:
+        baseline = measure({
+            'replicas': BASELINE_REPLICAS,
+            'intra_op_threads': 0,
+            'inter_op_threads': 0,
+            'baseline': True,
+        })
+    results = [measure(config) for config in configs]
+
+    best, batch_size = select_best(results, max_p99_ms)
+    if best is None:
+        raise RuntimeError(
+            "Ninguna configuración pudo medirse: "
+            + "; ".join(result['error'] for result in results)
+        )
+
+    best_stats = best['batches'][str(batch_size)]
+    profile = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'usable_cpus': cpus,
+        'model': str(model_path),
+        'backend': backend,
+        'inference_mode': inference_mode,
+        'intra_op_threads': best['intra_op_threads'],
+        'inter_op_threads': best['inter_op_threads'],
+        'batch_max_size': batch_size,
+        'replicas': best['replicas'],
+        'throughput_images_per_s': best_stats['images_per_s'],
+        'p99_ms': best_stats['p99_ms'],
+        'max_p99_ms': max_p99_ms,
+        'within_budget': best_stats['p99_ms'] <= max_p99_ms,
+        'candidates': results,
+    }
+    if baseline is not None:
+        profile['baseline'] = baseline
+        baseline_stats = (baseline.get('batches') or {}).get(str(batch_size))
+        if baseline_stats:
+            profile['speedup_vs_baseline'] = (
+                best_stats['images_per_s'] / baseline_stats['images_per_s']
+            )
+    return profile
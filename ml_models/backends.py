@@ -0,0 +1,693 @@
+"""
+Backends de inferencia para el modelo de detección de anemia.
+
+Cada backend encapsula un runtime distinto detrás de la misma interfaz:
+cargar el artefacto del modelo y devolver un vector de probabilidades para
+un batch preprocesado de forma (N, 64, 64, 3).
+
+Backends disponibles:
+    - keras: Runtime completo de TensorFlow/Keras sobre el archivo .h5
+    - tflite: Intérprete ligero de TensorFlow Lite (LiteRT) en CPU sobre un
+      archivo .tflite generado con ``python manage.py convert_anemia_model``
+    - mmap: Paso hacia adelante en NumPy sobre un archivo de pesos mapeado en
+      memoria (``convert_anemia_model --format mmap``), sin TensorFlow; todos
+      los procesos del nodo comparten las mismas páginas de pesos
+    - numpy: El mismo paso hacia adelante en NumPy con los pesos leídos
+      directamente del .h5 con h5py, sin artefacto previo ni TensorFlow
+
+``EnsembleBackend`` combina varios modelos sobre cualquiera de estos
+runtimes y devuelve una columna de probabilidades por modelo.
+
+Modos de inferencia:
+    - float: Pesos y activaciones en float32 (por defecto)
+    - int8: Cuantización entera post-entrenamiento (solo backend tflite),
+      generada con ``python manage.py convert_anemia_model --quantize int8``
+"""
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+# Modos de inferencia soportados y sufijo del artefacto correspondiente
+INFERENCE_MODE_FLOAT = 'float'
+INFERENCE_MODE_INT8 = 'int8'
+INFERENCE_MODE_SUFFIXES = {
+    INFERENCE_MODE_FLOAT: '',
+    INFERENCE_MODE_INT8: '_int8',
+}
+
+
+class InferenceBackend:
+    """
+    Interfaz común de los backends de inferencia.
+    """
+
+    name = None
+    artifact_suffix = None
+    # Si implementa ``predict_with_embedding``
+    supports_embedding = False
+    inference_modes = (INFERENCE_MODE_FLOAT,)
+
+    def __init__(self, model_path):
+        """
+        Inicializa el backend.
+
+        Args:
+            model_path (str | Path): Ruta al artefacto del modelo
+        """
+        self.model_path = Path(model_path)
+
+    @classmethod
+    def resolve_artifact_path(cls, model_path, inference_mode=INFERENCE_MODE_FLOAT):
+        """
+        Deriva la ruta del artefacto propio del backend a partir de la del .h5.
+
+        Args:
+            model_path (str | Path): Ruta configurada en el detector
+            inference_mode (str): Modo de inferencia ('float' o 'int8')
+
+        Returns:
+            Path: Ruta al artefacto que debe cargar este backend
+        """
+        model_path = Path(model_path)
+        if cls.artifact_suffix and model_path.suffix != cls.artifact_suffix:
+            mode_suffix = INFERENCE_MODE_SUFFIXES[inference_mode]
+            return model_path.with_name(
+                f"{model_path.stem}{mode_suffix}{cls.artifact_suffix}"
+            )
+        return model_path
+
+    @property
+    def model(self):
+        """Objeto del runtime subyacente (None si no está cargado)."""
+        raise NotImplementedError
+
+    def load(self):
+        """Carga el artefacto del modelo en memoria."""
+        raise NotImplementedError
+
+    def predict(self, img_batch):
+        """
+        Ejecuta el modelo sobre un batch preprocesado.
+
+        Args:
+            img_batch (np.ndarray): Tensor float32 de forma (N, 64, 64, 3)
+
+        Returns:
+            np.ndarray: Vector float32 de N probabilidades
+        """
+        raise NotImplementedError
+
+    def predict_with_embedding(self, img_batch):
+        """
+        Ejecuta el modelo y retorna también el embedding de la penúltima
+        capa (la entrada de la capa de salida), en la misma pasada.
+
+        Args:
+            img_batch (np.ndarray): Tensor float32 de forma (N, 64, 64, 3)
+
+        Returns:
+            tuple: (vector float32 de N probabilidades, matriz float32
+            (N, dimensión) de embeddings)
+        """
+        raise NotImplementedError(
+            f"El backend '{self.name}' no expone embeddings; use keras, numpy o mmap"
+        )
+
+    def get_info(self):
+        """
+        Retorna información del modelo cargado.
+
+        Returns:
+            dict: Información del modelo
+        """
+        raise NotImplementedError
+
+    def _check_artifact(self):
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"Modelo no encontrado en: {self.model_path}")
+
+
+class KerasBackend(InferenceBackend):
+    """
+    Backend basado en ``tf.keras`` (runtime completo de TensorFlow).
+
+    Las solicitudes interactivas (batches pequeños) se ejecutan con una
+    función trazada con ``tf.function`` y firma fija ``(None, 64, 64, 3)``,
+    opcionalmente compilada con XLA, evitando la maquinaria de adaptadores
+    de datos y callbacks de ``model.predict``. Este último se reserva para
+    batches offline grandes.
+    """
+
+    name = 'keras'
+    artifact_suffix = '.h5'
+    supports_embedding = True
+
+    def __init__(self, model_path, jit_compile=False, offline_batch_size=256,
+                 intra_op_threads=None, inter_op_threads=None):
+        """
+        Inicializa el backend.
+
+        Args:
+            model_path (str | Path): Ruta al archivo .h5
+            jit_compile (bool): Compilar la función de inferencia con XLA
+            offline_batch_size (int): Tamaño de batch a partir del cual se
+                usa ``model.predict`` en lugar de la función compilada
+            intra_op_threads (int): Hilos de cada operación de TensorFlow
+                (None = todos los núcleos)
+            inter_op_threads (int): Operaciones independientes ejecutadas en
+                paralelo (None = valor por defecto de TensorFlow)
+        """
+        super().__init__(model_path)
+        self.jit_compile = jit_compile
+        self.offline_batch_size = offline_batch_size
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self._model = None
+        self._serving_fn = None
+        self._embedding_fn = None
+        self._embedding_lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self._model
+
+    def load(self):
+        self._check_artifact()
+
+        # Importación diferida: solo este backend necesita TensorFlow
+        import tensorflow as tf
+
+        configure_tensorflow_threads(self.intra_op_threads, self.inter_op_threads)
+        model = tf.keras.models.load_model(str(self.model_path))
+        input_signature = [
+            tf.TensorSpec(shape=(None, *model.input_shape[1:]), dtype=tf.float32)
+        ]
+
+        @tf.function(input_signature=input_signature, jit_compile=self.jit_compile)
+        def serving_fn(img_batch):
+            return model(img_batch, training=False)
+
+        # Trazar (y compilar) una vez durante la carga, no en la primera solicitud
+        serving_fn(tf.zeros((1, *model.input_shape[1:]), dtype=tf.float32))
+
+        self._serving_fn = serving_fn
+        self._model = model
+
+    def predict(self, img_batch):
+        if len(img_batch) >= self.offline_batch_size:
+            return self.predict_offline(img_batch)
+
+        prediction = self._serving_fn(np.asarray(img_batch, dtype=np.float32))
+        return np.asarray(prediction, dtype=np.float32).reshape(-1)
+
+    def predict_with_embedding(self, img_batch):
+        if self._embedding_fn is None:
+            with self._embedding_lock:
+                if self._embedding_fn is None:
+                    self._embedding_fn = self._build_embedding_fn()
+        prediction, embedding = self._embedding_fn(np.asarray(img_batch, dtype=np.float32))
+        return (
+            np.asarray(prediction, dtype=np.float32).reshape(-1),
+            np.asarray(embedding, dtype=np.float32),
+        )
+
+    def _build_embedding_fn(self):
+        """Función trazada con dos salidas: probabilidad y entrada de la última capa."""
+        import tensorflow as tf
+
+        model = self._model
+        two_outputs = tf.keras.Model(model.inputs, [model.outputs[0], model.layers[-1].input])
+
+        @tf.function(
+            input_signature=[tf.TensorSpec(shape=(None, *model.input_shape[1:]), dtype=tf.float32)],
+            jit_compile=self.jit_compile,
+        )
+        def embedding_fn(img_batch):
+            return two_outputs(img_batch, training=False)
+
+        return embedding_fn
+
+    def predict_offline(self, img_batch):
+        """
+        Inferencia con ``model.predict`` para batches offline grandes.
+
+        Args:
+            img_batch (np.ndarray): Tensor float32 de forma (N, 64, 64, 3)
+
+        Returns:
+            np.ndarray: Vector float32 de N probabilidades
+        """
+        prediction = self._model.predict(
+            img_batch, batch_size=min(max(len(img_batch), 1), 1024), verbose=0
+        )
+        return np.asarray(prediction, dtype=np.float32).reshape(-1)
+
+    def get_info(self):
+        return {
+            'model_name': self._model.name,
+            'input_shape': self._model.input_shape,
+            'output_shape': self._model.output_shape,
+            'total_params': self._model.count_params(),
+            'num_layers': len(self._model.layers),
+            'jit_compile': self.jit_compile,
+            'intra_op_threads': self.intra_op_threads,
+            'inter_op_threads': self.inter_op_threads,
+        }
+
+
+def configure_tensorflow_threads(intra_op_threads=None, inter_op_threads=None):
+    """
+    Fija los pools de hilos de TensorFlow del proceso.
+
+    Solo tiene efecto antes de que TensorFlow ejecute su primera operación;
+    después (p. ej. al intercambiar el modelo en caliente) se conserva la
+    configuración vigente y se avisa si difiere.
+
+    Args:
+        intra_op_threads (int): Hilos por operación (None/0 = no cambiar)
+        inter_op_threads (int): Operaciones en paralelo (None/0 = no cambiar)
+    """
+    import tensorflow as tf
+
+    threading_config = tf.config.threading
+    for value, getter, setter in (
+        (intra_op_threads, threading_config.get_intra_op_parallelism_threads,
+         threading_config.set_intra_op_parallelism_threads),
+        (inter_op_threads, threading_config.get_inter_op_parallelism_threads,
+         threading_config.set_inter_op_parallelism_threads),
+    ):
+        if not value or getter() == value:
+            continue
+        try:
+            setter(value)
+        except RuntimeError:
+            print(f"⚠️  TensorFlow ya está inicializado: se mantienen {getter()} hilos "
+                  f"en lugar de {value}")
+
+
+def _get_tflite_interpreter_class():
+    """
+    Localiza el intérprete de TFLite más ligero disponible.
+
+    Orden de preferencia: ``ai_edge_litert`` (LiteRT), ``tflite_runtime`` y,
+    como último recurso, ``tf.lite`` del paquete completo de TensorFlow.
+
+    Returns:
+        type: Clase ``Interpreter``
+    """
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    Backend basado en el intérprete de TensorFlow Lite para CPU.
+
+    El intérprete no es thread-safe, por lo que las invocaciones se
+    serializan con un lock; el micro-batching ya agrupa las solicitudes
+    concurrentes en una sola invocación.
+    """
+
+    name = 'tflite'
+    artifact_suffix = '.tflite'
+    inference_modes = (INFERENCE_MODE_FLOAT, INFERENCE_MODE_INT8)
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Inicializa el backend.
+
+        Args:
+            model_path (str | Path): Ruta al archivo .tflite
+            num_threads (int): Hilos del intérprete (None = por defecto)
+        """
+        super().__init__(model_path)
+        self.num_threads = num_threads
+        self._interpreter = None
+        self._input_details = None
+        self._output_details = None
+        self._batch_capacity = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self._interpreter
+
+    def load(self):
+        if not self.model_path.exists():
+            raise FileNotFoundError(
+                f"Modelo TFLite no encontrado en: {self.model_path}. "
+                "Genérelo con: python manage.py convert_anemia_model"
+            )
+
+        interpreter_class = _get_tflite_interpreter_class()
+        interpreter = interpreter_class(
+            model_path=str(self.model_path), num_threads=self.num_threads
+        )
+        interpreter.allocate_tensors()
+
+        self._input_details = interpreter.get_input_details()[0]
+        self._output_details = interpreter.get_output_details()[0]
+        self._batch_capacity = int(self._input_details['shape'][0])
+        self._interpreter = interpreter
+
+    def predict(self, img_batch):
+        img_batch = self._quantize_input(img_batch)
+        batch_size = len(img_batch)
+
+        with self._lock:
+            interpreter = self._interpreter
+            if batch_size != self._batch_capacity:
+                interpreter.resize_tensor_input(
+                    self._input_details['index'], [batch_size, *img_batch.shape[1:]]
+                )
+                interpreter.allocate_tensors()
+                self._batch_capacity = batch_size
+
+            interpreter.set_tensor(self._input_details['index'], img_batch)
+            interpreter.invoke()
+            output = interpreter.get_tensor(self._output_details['index'])
+
+        return self._dequantize_output(output).reshape(-1)
+
+    def _quantize_input(self, img_batch):
+        """
+        Adapta el batch float32 al tipo de entrada del modelo.
+
+        En modelos cuantizados (int8/uint8) aplica ``q = x / scale + zero_point``.
+        """
+        dtype = np.dtype(self._input_details['dtype'])
+        if not np.issubdtype(dtype, np.integer):
+            return np.ascontiguousarray(img_batch, dtype=np.float32)
+
+        scale, zero_point = self._input_details['quantization']
+        info = np.iinfo(dtype)
+        quantized = np.rint(np.asarray(img_batch, dtype=np.float32) / scale + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(dtype)
+
+    def _dequantize_output(self, output):
+        """Convierte la salida del modelo a probabilidades float32."""
+        if not np.issubdtype(np.dtype(self._output_details['dtype']), np.integer):
+            return np.array(output, dtype=np.float32)
+
+        scale, zero_point = self._output_details['quantization']
+        return (output.astype(np.float32) - zero_point) * np.float32(scale)
+
+    def get_info(self):
+        return {
+            'model_name': self.model_path.stem,
+            'input_shape': tuple(
+                None if dim < 0 else int(dim)
+                for dim in self._input_details['shape_signature']
+            ),
+            'output_shape': tuple(
+                None if dim < 0 else int(dim)
+                for dim in self._output_details['shape_signature']
+            ),
+            'input_dtype': np.dtype(self._input_details['dtype']).name,
+            'size_kb': self.model_path.stat().st_size / 1024,
+        }
+
+
+class MmapBackend(InferenceBackend):
+    """
+    Backend NumPy sobre pesos mapeados en memoria (``ml_models.shared_weights``).
+
+    No importa TensorFlow: la memoria privada de cada worker se reduce a
+    NumPy y a las activaciones, y los pesos son páginas compartidas de la
+    caché del sistema operativo. El paso hacia adelante no tiene estado, por
+    lo que admite invocaciones concurrentes sin lock.
+    """
+
+    name = 'mmap'
+    artifact_suffix = '.weights'
+    supports_embedding = True
+
+    def __init__(self, model_path):
+        """
+        Inicializa el backend.
+
+        Args:
+            model_path (str | Path): Ruta al archivo .weights
+        """
+        super().__init__(model_path)
+        self._model = None
+        self._header = None
+
+    @property
+    def model(self):
+        return self._model
+
+    def load(self):
+        if not self.model_path.exists():
+            raise FileNotFoundError(
+                f"Pesos compartidos no encontrados en: {self.model_path}. "
+                "Genérelos con: python manage.py convert_anemia_model --format mmap"
+            )
+
+        from ml_models.numpy_engine import NumpyModel
+        from ml_models.shared_weights import open_shared_weights
+
+        header, weights = open_shared_weights(self.model_path)
+        self._header = header
+        self._model = NumpyModel(header['program'], weights)
+
+    def predict(self, img_batch):
+        return np.asarray(self._model.predict(img_batch), dtype=np.float32).reshape(-1)
+
+    def predict_with_embedding(self, img_batch):
+        prediction, embedding = self._model.predict(img_batch, return_embedding=True)
+        return np.asarray(prediction, dtype=np.float32).reshape(-1), embedding
+
+    def get_info(self):
+        return {
+            'model_name': self.model_path.stem,
+            'source': self._header['source'],
+            'source_sha256': self._header['source_sha256'],
+            'input_shape': self._model.input_shape,
+            'output_shape': self._model.output_shape,
+            'total_params': self._model.count_params(),
+            'num_layers': len(self._model.program),
+            'mapped_kb': sum(w.nbytes for w in self._model.weights.values()) / 1024,
+            'size_kb': self.model_path.stat().st_size / 1024,
+        }
+
+
+class NumpyBackend(InferenceBackend):
+    """
+    Paso hacia adelante en NumPy (``ml_models.numpy_engine``) sobre los
+    pesos del archivo .h5, leídos una vez con h5py.
+
+    No importa TensorFlow ni necesita convertir el modelo: el arranque del
+    worker solo cuesta leer unos 200 KB de pesos. Cada proceso guarda su
+    propia copia de los pesos; para compartirlos entre workers, ver el
+    backend mmap.
+    """
+
+    name = 'numpy'
+    artifact_suffix = '.h5'
+    supports_embedding = True
+
+    def __init__(self, model_path):
+        """
+        Inicializa el backend.
+
+        Args:
+            model_path (str | Path): Ruta al archivo .h5
+        """
+        super().__init__(model_path)
+        self._model = None
+
+    @property
+    def model(self):
+        return self._model
+
+    def load(self):
+        self._check_artifact()
+
+        from ml_models.numpy_engine import NumpyModel, read_h5_model
+
+        self._model = NumpyModel(*read_h5_model(self.model_path))
+
+    def predict(self, img_batch):
+        return np.asarray(self._model.predict(img_batch), dtype=np.float32).reshape(-1)
+
+    def predict_with_embedding(self, img_batch):
+        prediction, embedding = self._model.predict(img_batch, return_embedding=True)
+        return np.asarray(prediction, dtype=np.float32).reshape(-1), embedding
+
+    def get_info(self):
+        return {
+            'model_name': self.model_path.stem,
+            'input_shape': self._model.input_shape,
+            'output_shape': self._model.output_shape,
+            'total_params': self._model.count_params(),
+            'num_layers': len(self._model.program),
+            'chunk_size': self._model.chunk_size,
+            'size_kb': self.model_path.stat().st_size / 1024,
+        }
+
+
+class EnsembleBackend(InferenceBackend):
+    """
+    Varios modelos sobre el mismo runtime evaluando el mismo tensor.
+
+    Con keras, los modelos se trazan juntos en una única ``tf.function``:
+    una sola llamada al runtime por batch, y TensorFlow ejecuta en paralelo
+    las ramas independientes. Con los demás runtimes se hace una pasada
+    batched por modelo. La combinación de las probabilidades (media o
+    votación) la hace el detector, que conoce el umbral.
+    """
+
+    def __init__(self, members):
+        """
+        Inicializa el backend.
+
+        Args:
+            members (list): Backends sin cargar de cada modelo (mismo runtime)
+        """
+        if len({member.name for member in members}) != 1:
+            raise ValueError("Los modelos del ensemble deben usar el mismo backend")
+        super().__init__(members[0].model_path)
+        self.members = members
+        self.name = members[0].name
+        # El embedding es el del modelo principal
+        self.supports_embedding = members[0].supports_embedding
+        self._fused_fn = None
+
+    @property
+    def model(self):
+        models = tuple(member.model for member in self.members)
+        return None if any(model is None for model in models) else models
+
+    def load(self):
+        for member in self.members:
+            member.load()
+        if self.name != KerasBackend.name:
+            return
+
+        import tensorflow as tf
+
+        models = [member.model for member in self.members]
+        input_signature = [
+            tf.TensorSpec(shape=(None, *models[0].input_shape[1:]), dtype=tf.float32)
+        ]
+
+        @tf.function(input_signature=input_signature,
+                     jit_compile=self.members[0].jit_compile)
+        def fused_fn(img_batch):
+            return tf.concat([model(img_batch, training=False) for model in models], axis=1)
+
+        fused_fn(tf.zeros((1, *models[0].input_shape[1:]), dtype=tf.float32))
+        self._fused_fn = fused_fn
+
+    def predict(self, img_batch):
+        """
+        Ejecuta todos los modelos sobre un batch preprocesado.
+
+        Args:
+            img_batch (np.ndarray): Tensor float32 de forma (N, 64, 64, 3)
+
+        Returns:
+            np.ndarray: Matriz float32 (N, modelos) de probabilidades
+        """
+        if self._fused_fn is not None and len(img_batch) < self.members[0].offline_batch_size:
+            prediction = self._fused_fn(np.asarray(img_batch, dtype=np.float32))
+            return np.asarray(prediction, dtype=np.float32)
+        return np.stack([member.predict(img_batch) for member in self.members], axis=1)
+
+    def predict_with_embedding(self, img_batch):
+        """
+        Probabilidades de todos los modelos y embedding del primero.
+
+        Returns:
+            tuple: (matriz (N, modelos) de probabilidades, embeddings del
+            modelo principal)
+        """
+        primary, embedding = self.members[0].predict_with_embedding(img_batch)
+        others = [member.predict(img_batch) for member in self.members[1:]]
+        return np.stack([primary, *others], axis=1), embedding
+
+    def get_info(self):
+        infos = [member.get_info() for member in self.members]
+        # TFLite no informa del número de parámetros
+        params = [info.get('total_params') for info in infos]
+        return {
+            'model_name': '+'.join(str(info['model_name']) for info in infos),
+            'input_shape': infos[0]['input_shape'],
+            'output_shape': (None, len(infos)),
+            'total_params': None if None in params else sum(params),
+            'fused': self._fused_fn is not None,
+            'members': infos,
+        }
+
+
+# Registro de backends disponibles por nombre
+BACKENDS = {
+    KerasBackend.name: KerasBackend,
+    TFLiteBackend.name: TFLiteBackend,
+    MmapBackend.name: MmapBackend,
+    NumpyBackend.name: NumpyBackend,
+}
+
+
+def get_backend_class(name):
+    """
+    Retorna la clase de backend registrada con el nombre indicado.
+
+    Args:
+        name (str): Nombre del backend ('keras', 'tflite', 'mmap', 'numpy')
+
+    Returns:
+        type: Subclase de InferenceBackend
+
+    Raises:
+        ValueError: Si el backend no existe
+    """
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Backend de inferencia desconocido: '{name}'. "
+            f"Opciones válidas: {', '.join(sorted(BACKENDS))}"
+        )
+
+
+def create_backend(name, model_path, inference_mode=INFERENCE_MODE_FLOAT, **options):
+    """
+    Crea un backend a partir de su nombre y la ruta del modelo .h5.
+
+    Args:
+        name (str): Nombre del backend
+        model_path (str | Path): Ruta al modelo (se adapta la extensión)
+        inference_mode (str): Modo de inferencia ('float' o 'int8')
+        **options: Opciones específicas del backend
+
+    Returns:
+        InferenceBackend: Backend sin cargar
+
+    Raises:
+        ValueError: Si el backend no soporta el modo de inferencia
+    """
+    backend_class = get_backend_class(name)
+    if inference_mode not in backend_class.inference_modes:
+        raise ValueError(
+            f"El backend '{name}' no soporta el modo de inferencia "
+            f"'{inference_mode}'. Opciones: {', '.join(backend_class.inference_modes)}"
+        )
+    return backend_class(
+        backend_class.resolve_artifact_path(model_path, inference_mode), **options
+    )
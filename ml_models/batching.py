@@ -0,0 +1,219 @@
+"""
+Planificador de micro-batching para el detector de anemia.
+
+Agrupa durante unos milisegundos las solicitudes concurrentes de una sola
+imagen, ejecuta una única pasada del modelo sobre el batch completo y
+devuelve a cada llamador su resultado individual.
+"""
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+# Marcador para detener el hilo del planificador
+_STOP = object()
+
+
+class _PendingPrediction:
+    """
+    Solicitud en espera dentro del planificador.
+    """
+
+    __slots__ = ('tensor', 'event', 'probability', 'members', 'error')
+
+    def __init__(self, tensor):
+        self.tensor = tensor
+        self.event = threading.Event()
+        self.probability = None
+        self.members = None
+        self.error = None
+
+
+class MicroBatchScheduler:
+    """
+    Envoltorio del AnemiaDetector que agrupa predicciones concurrentes.
+
+    Expone la misma interfaz que el detector (``predict``, ``threshold``,
+    ``get_model_info``...), por lo que las vistas pueden usarlo sin cambios.
+    """
+
+    def __init__(self, detector, max_batch_size=16, max_wait_ms=5.0):
+        """
+        Inicializa el planificador.
+
+        Args:
+            detector (AnemiaDetector): Detector con el modelo a utilizar
+            max_batch_size (int): Número máximo de imágenes por pasada
+            max_wait_ms (float): Tiempo máximo de espera para llenar un batch
+        """
+        if max_batch_size < 1:
+            raise ValueError("El tamaño máximo de batch debe ser al menos 1")
+        if max_wait_ms < 0:
+            raise ValueError("El tiempo máximo de espera no puede ser negativo")
+
+        self.detector = detector
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'batches': 0, 'max_batch_seen': 0}
+
+    def __getattr__(self, name):
+        # Delegar en el detector todo lo que no define el planificador
+        detector = self.__dict__.get('detector')
+        if detector is None:
+            raise AttributeError(name)
+        return getattr(detector, name)
+
+    def start(self):
+        """Inicia el hilo del planificador si no está en ejecución."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='anemia-microbatch', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        Detiene el hilo del planificador tras procesar lo pendiente.
+
+        Args:
+            timeout (float): Segundos máximos de espera al hilo
+        """
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        self._thread = None
+
+    def predict(self, image_path_or_array, return_probability=False):
+        """
+        Realiza una predicción sobre una imagen compartiendo la pasada del modelo.
+
+        Args:
+            image_path_or_array: Ruta a la imagen o array numpy
+            return_probability (bool): Se mantiene por compatibilidad con el detector
+
+        Returns:
+            dict: Resultado de la predicción con información detallada
+        """
+        # El preprocesamiento se hace en el hilo del llamador, en paralelo,
+        # sobre un tensor del pool que se devuelve con el resultado final
+        tensor = self.detector.acquire_input(1)
+        try:
+            self.detector.preprocess_into(image_path_or_array, tensor[0])
+            # Los casos claros para el índice de palidez no entran en la cola
+            early = self.detector.prescreen(tensor)
+        except Exception:
+            self.detector.release_input(tensor)
+            raise
+        if early:
+            self.detector.release_input(tensor)
+            return early[0]
+
+        try:
+            pending = _PendingPrediction(tensor)
+            self.start()
+            self._queue.put(pending)
+            pending.event.wait()
+
+            if pending.error is not None:
+                raise pending.error
+
+            # La TTA de imágenes dudosas se ejecuta aquí, fuera del hilo del
+            # planificador, en su propia pasada batched
+            return self.detector.finish_prediction(
+                tensor, pending.probability, members=pending.members
+            )
+        finally:
+            self.detector.release_input(tensor)
+
+    def get_stats(self):
+        """
+        Retorna estadísticas de uso del planificador.
+
+        Returns:
+            dict: Solicitudes, batches ejecutados y tamaño medio de batch
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['avg_batch_size'] = (
+            stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        )
+        stats['max_batch_size'] = self.max_batch_size
+        stats['max_wait_ms'] = self.max_wait * 1000.0
+        if hasattr(self.detector, 'get_stats'):
+            stats.update(self.detector.get_stats())
+        return stats
+
+    def _run(self):
+        """Bucle principal: recoge solicitudes y las ejecuta en batch."""
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            stop_requested = False
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop_requested = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+
+            if stop_requested:
+                return
+
+    def _process(self, batch):
+        """
+        Ejecuta una pasada del modelo y reparte los resultados.
+
+        Args:
+            batch (list): Solicitudes pendientes a resolver
+        """
+        tensors = None
+        try:
+            tensors = self.detector.acquire_input(len(batch))
+            np.concatenate([item.tensor for item in batch], axis=0, out=tensors)
+            probabilities, members = self.detector.combine_scores(
+                self.detector.predict_scores(tensors)
+            )
+
+            for i, item in enumerate(batch):
+                item.probability = float(probabilities[i])
+                if members is not None:
+                    item.members = members[i]
+        except Exception as e:
+            for item in batch:
+                item.error = e
+        finally:
+            if tensors is not None:
+                self.detector.release_input(tensors)
+            with self._stats_lock:
+                self._stats['requests'] += len(batch)
+                self._stats['batches'] += 1
+                self._stats['max_batch_seen'] = max(
+                    self._stats['max_batch_seen'], len(batch)
+                )
+            for item in batch:
+                item.event.set()
@@ -0,0 +1,352 @@
+"""
+Benchmark de inferencia del detector de anemia.
+
+Cada combinación de modelo (.h5) y backend se mide en un proceso nuevo
+(``spawn``), de modo que el tiempo de carga en frío incluye la importación
+del runtime y el pico de RSS corresponde solo a esa combinación:
+
+    - cold_start: importación del runtime, carga del modelo y primera predicción
+    - preprocess / forward / end_to_end: latencias p50/p95/p99 de una imagen
+      (decodificación y normalización, pasada del modelo y ``predict`` completo)
+    - throughput: imágenes/s del modelo y del pipeline completo por tamaño de batch
+    - memory: RSS tras la carga, pico de RSS y memoria única (USS) del
+      proceso antes de importar el runtime, tras la carga y al final; con
+      el backend mmap los pesos son páginas compartidas y no cuentan en USS
+      cuando varios workers los mapean
+
+El informe es un dict serializable a JSON con los metadatos del entorno
+(CPU, versiones, commit) para comparar ejecuciones entre versiones y equipos.
+"""
+import os
+import platform
+import socket
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from importlib import metadata
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+from ml_models.profiling import (
+    current_rss_kb,
+    measure_latency,
+    memory_usage_kb,
+    peak_rss_kb,
+    summarize_latencies,
+)
+
+
+# Tamaños de batch medidos por defecto
+DEFAULT_BATCH_SIZES = (1, 8, 32, 128)
+
+# Paquetes cuya versión se registra en el informe
+BENCHMARK_PACKAGES = (
+    'numpy', 'Pillow', 'tensorflow', 'tensorflow-cpu', 'keras',
+    'ai-edge-litert', 'tflite-runtime',
+)
+
+
+def _timed_ms(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def _throughput(fn, images, min_seconds=0.5, min_rounds=3):
+    """
+    Imágenes por segundo de ``fn`` repitiendo hasta ``min_seconds``.
+
+    Args:
+        fn (callable): Función sin argumentos que procesa ``images`` imágenes
+        images (int): Imágenes procesadas por invocación
+
+    Returns:
+        dict: Imágenes/s, latencia media por batch y rondas medidas
+    """
+    fn()
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if rounds >= min_rounds and elapsed >= min_seconds:
+            break
+    return {
+        'images_per_s': images * rounds / elapsed,
+        'batch_ms': elapsed * 1000 / rounds,
+        'rounds': rounds,
+    }
+
+
+def run_configuration(spec):
+    """
+    Mide una combinación de modelo y backend en el proceso actual.
+
+    Pensada para ejecutarse en un proceso nuevo (ver ``benchmark_configuration``).
+
+    Args:
+        spec (dict): model_path, backend, backend_options, inference_mode,
+            samples (bytes o arrays), repeats y batch_sizes
+
+    Returns:
+        dict: Métricas de la combinación
+    """
+    samples = spec['samples']
+    repeats = spec['repeats']
+    rss_start = current_rss_kb()
+    memory_start = memory_usage_kb()
+
+    start = time.perf_counter()
+    from ml_models.anemia_detector import AnemiaDetector
+    detector = AnemiaDetector(
+        model_path=spec['model_path'],
+        backend=spec['backend'],
+        backend_options=spec['backend_options'],
+        inference_mode=spec['inference_mode'],
+    )
+    backend = detector.backend
+    if spec['backend'] == 'keras':
+        import tensorflow  # noqa: F401  (se incluye en el arranque en frío)
+    import_ms = (time.perf_counter() - start) * 1000
+
+    load_ms = _timed_ms(backend.load)
+    rss_loaded = current_rss_kb()
+    memory_loaded = memory_usage_kb()
+    first_predict_ms = _timed_ms(detector.predict, samples[0])
+
+    sample_batch = np.empty((len(samples), *detector.input_size, 3), dtype=np.float32)
+    preprocess_latencies = []
+    for _ in range(max(1, repeats // len(samples))):
+        for i, sample in enumerate(samples):
+            preprocess_latencies.append(
+                _timed_ms(detector.preprocess_into, sample, sample_batch[i])
+            )
+
+    end_to_end_latencies = [
+        _timed_ms(detector.predict, samples[i % len(samples)]) for i in range(repeats)
+    ]
+
+    throughput = {}
+    for batch_size in spec['batch_sizes']:
+        batch = np.resize(sample_batch, (batch_size, *sample_batch.shape[1:]))
+        batch_samples = [samples[i % len(samples)] for i in range(batch_size)]
+
+        def pipeline():
+            tensor = detector.acquire_input(batch_size)
+            try:
+                for i, sample in enumerate(batch_samples):
+                    detector.preprocess_into(sample, tensor[i])
+                detector.predict_preprocessed(tensor)
+            finally:
+                detector.release_input(tensor)
+
+        forward = _throughput(lambda: backend.predict(batch), batch_size)
+        end_to_end = _throughput(pipeline, batch_size)
+        throughput[str(batch_size)] = {
+            'forward_images_per_s': forward['images_per_s'],
+            'forward_batch_ms': forward['batch_ms'],
+            'end_to_end_images_per_s': end_to_end['images_per_s'],
+            'end_to_end_batch_ms': end_to_end['batch_ms'],
+        }
+
+    artifact = Path(backend.model_path)
+    return {
+        'model': str(spec['model_path']),
+        'artifact': str(artifact),
+        'artifact_size_kb': artifact.stat().st_size / 1024,
+        'backend': spec['backend'],
+        'backend_options': spec['backend_options'],
+        'inference_mode': spec['inference_mode'],
+        'model_version': detector.model_version,
+        'status': 'ok',
+        'cold_start': {
+            'import_ms': import_ms,
+            'load_ms': load_ms,
+            'first_predict_ms': first_predict_ms,
+            'total_ms': import_ms + load_ms + first_predict_ms,
+        },
+        'preprocess': summarize_latencies(preprocess_latencies),
+        'forward': measure_latency(backend.predict, sample_batch, repeats=repeats),
+        'end_to_end': summarize_latencies(end_to_end_latencies),
+        'throughput': throughput,
+        'memory': _memory_report(rss_start, rss_loaded, memory_start, memory_loaded),
+    }
+
+
+def _memory_report(rss_start, rss_loaded, memory_start, memory_loaded):
+    memory_end = memory_usage_kb()
+    uss_start, uss_end = memory_start['uss_kb'], memory_end['uss_kb']
+    return {
+        'rss_start_kb': rss_start,
+        'rss_after_load_kb': rss_loaded,
+        'rss_end_kb': current_rss_kb(),
+        'peak_rss_kb': peak_rss_kb(),
+        'uss_start_kb': uss_start,
+        'uss_after_load_kb': memory_loaded['uss_kb'],
+        'uss_end_kb': uss_end,
+        'uss_runtime_kb': (
+            uss_end - uss_start if uss_start is not None and uss_end is not None else None
+        ),
+        'pss_end_kb': memory_end['pss_kb'],
+        'shared_end_kb': memory_end['shared_kb'],
+    }
+
+
+def benchmark_configuration(spec, isolate=True):
+    """
+    Mide una combinación, por defecto en un proceso nuevo.
+
+    Args:
+        spec (dict): Ver ``run_configuration``
+        isolate (bool): Ejecutar en un proceso ``spawn`` independiente
+
+    Returns:
+        dict: Métricas, o ``status`` 'failed' con el error
+    """
+    try:
+        if not isolate:
+            return run_configuration(spec)
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            return executor.submit(run_configuration, spec).result()
+    except Exception as e:
+        return {
+            'model': str(spec['model_path']),
+            'backend': spec['backend'],
+            'inference_mode': spec['inference_mode'],
+            'status': 'failed',
+            'error': f"{type(e).__name__}: {e}",
+        }
+
+
+def _package_versions():
+    versions = {}
+    for package in BENCHMARK_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            continue
+    return versions
+
+
+def _cpu_model():
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            timeout=5, cwd=Path(__file__).resolve().parent, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def get_environment():
+    """
+    Metadatos del equipo y del software para comparar informes.
+
+    Returns:
+        dict: Host, CPU, plataforma, versiones y commit
+    """
+    try:
+        usable_cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        usable_cpus = os.cpu_count()
+    return {
+        'hostname': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_model': _cpu_model(),
+        'cpu_count': os.cpu_count(),
+        'usable_cpus': usable_cpus,
+        'packages': _package_versions(),
+        'git_commit': _git_commit(),
+    }
+
+
+def run_benchmark(model_paths, backends, samples, inference_mode='float',
+                  backend_options=None, repeats=100, batch_sizes=DEFAULT_BATCH_SIZES,
+                  isolate=True, progress=None):
+    """
+    Mide todas las combinaciones de modelo y backend.
+
+    Las combinaciones cuyo artefacto no existe (p. ej. .tflite sin convertir)
+    o cuyo backend no soporta el modo de inferencia se marcan como 'skipped'.
+
+    Args:
+        model_paths (list): Rutas de modelos .h5
+        backends (list): Nombres de backend
+        samples (list): Imágenes de muestra (bytes o arrays RGB)
+        inference_mode (str): Modo de inferencia ('float' o 'int8')
+        backend_options (dict): Opciones por nombre de backend
+        repeats (int): Invocaciones medidas por latencia
+        batch_sizes (tuple): Tamaños de batch del throughput
+        isolate (bool): Medir cada combinación en un proceso nuevo
+        progress (callable): ``progress(result)`` tras cada combinación
+
+    Returns:
+        dict: Informe con ``environment``, ``parameters`` y ``results``
+    """
+    from ml_models.backends import get_backend_class
+
+    backend_options = backend_options or {}
+    started_at = datetime.now(timezone.utc).isoformat()
+    results = []
+    for model_path in model_paths:
+        for backend in backends:
+            backend_class = get_backend_class(backend)
+            artifact = None
+            if inference_mode in backend_class.inference_modes:
+                artifact = backend_class.resolve_artifact_path(model_path, inference_mode)
+
+            if artifact is None or not artifact.exists():
+                result = {
+                    'model': str(model_path),
+                    'backend': backend,
+                    'inference_mode': inference_mode,
+                    'status': 'skipped',
+                    'reason': (
+                        f"El backend no soporta el modo '{inference_mode}'"
+                        if artifact is None else f"Artefacto no encontrado: {artifact}"
+                    ),
+                }
+            else:
+                result = benchmark_configuration({
+                    'model_path': str(model_path),
+                    'backend': backend,
+                    'backend_options': backend_options.get(backend, {}),
+                    'inference_mode': inference_mode,
+                    'samples': samples,
+                    'repeats': repeats,
+                    'batch_sizes': tuple(batch_sizes),
+                }, isolate=isolate)
+
+            results.append(result)
+            if progress:
+                progress(result)
+
+    return {
+        'started_at': started_at,
+        'finished_at': datetime.now(timezone.utc).isoformat(),
+        'environment': get_environment(),
+        'parameters': {
+            'inference_mode': inference_mode,
+            'samples': len(samples),
+            'repeats': repeats,
+            'batch_sizes': list(batch_sizes),
+            'isolated_processes': isolate,
+        },
+        'results': results,
+    }
@@ -0,0 +1,141 @@
+"""
+Pool de tensores de entrada preasignados para el detector de anemia.
+
+Los tensores float32 de forma (batch, 64, 64, 3) se agrupan por clases de
+tamaño (potencias de dos hasta ``max_batch_size``). ``acquire(n)`` entrega
+una vista de ``n`` imágenes sobre un buffer libre de la clase adecuada y
+``release`` lo devuelve al pool tras la inferencia, de modo que en carga
+sostenida no se asigna memoria nueva por solicitud.
+"""
+import threading
+
+import numpy as np
+
+
+class TensorBufferPool:
+    """
+    Pool thread-safe de buffers float32 reutilizables.
+    """
+
+    def __init__(self, item_shape=(64, 64, 3), max_batch_size=256, max_free_per_class=16,
+                 max_pooled_bytes=32 * 1024 * 1024, dtype=np.float32):
+        """
+        Args:
+            item_shape (tuple): Forma de una imagen preprocesada
+            max_batch_size (int): Mayor batch servido desde el pool; los
+                mayores se asignan aparte y no se conservan
+            max_free_per_class (int): Buffers libres conservados por clase
+                (cubre las solicitudes concurrentes de una imagen)
+            max_pooled_bytes (int): Memoria máxima retenida en buffers libres
+            dtype: Tipo de los buffers
+        """
+        self.item_shape = tuple(item_shape)
+        self.max_batch_size = max_batch_size
+        self.max_free_per_class = max_free_per_class
+        self.max_pooled_bytes = max_pooled_bytes
+        self.dtype = np.dtype(dtype)
+        self._free = {}
+        self._outstanding = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'unpooled': 0,
+            'releases': 0,
+            'discarded': 0,
+            'in_use': 0,
+            'peak_in_use': 0,
+            'peak_in_use_bytes': 0,
+        }
+        self._in_use_bytes = 0
+        self._pooled_bytes = 0
+
+    def _size_class(self, count):
+        size = 1
+        while size < count:
+            size *= 2
+        return size
+
+    def acquire(self, count):
+        """
+        Obtiene un tensor para ``count`` imágenes.
+
+        Args:
+            count (int): Número de imágenes
+
+        Returns:
+            np.ndarray: Vista float32 de forma (count, *item_shape); su
+            contenido no está inicializado
+        """
+        if count < 1:
+            raise ValueError("El número de imágenes debe ser al menos 1")
+
+        size = self._size_class(count)
+        with self._lock:
+            if size > self.max_batch_size:
+                self._stats['unpooled'] += 1
+                buffer = None
+            else:
+                free = self._free.get(size)
+                if free:
+                    buffer = free.pop()
+                    self._pooled_bytes -= buffer.nbytes
+                    self._stats['hits'] += 1
+                else:
+                    buffer = None
+                    self._stats['misses'] += 1
+
+        if buffer is None:
+            buffer = np.empty((size, *self.item_shape), dtype=self.dtype)
+
+        with self._lock:
+            self._outstanding[id(buffer)] = buffer
+            self._stats['in_use'] += 1
+            self._in_use_bytes += buffer.nbytes
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._stats['in_use'])
+            self._stats['peak_in_use_bytes'] = max(
+                self._stats['peak_in_use_bytes'], self._in_use_bytes
+            )
+
+        return buffer[:count]
+
+    def release(self, tensor):
+        """
+        Devuelve al pool un tensor obtenido con ``acquire``.
+
+        Args:
+            tensor (np.ndarray): Vista entregada por ``acquire``
+        """
+        buffer = tensor.base if tensor.base is not None else tensor
+        with self._lock:
+            if self._outstanding.pop(id(buffer), None) is None:
+                return
+            self._stats['releases'] += 1
+            self._stats['in_use'] -= 1
+            self._in_use_bytes -= buffer.nbytes
+
+            size = len(buffer)
+            if size <= self.max_batch_size:
+                free = self._free.setdefault(size, [])
+                if (len(free) < self.max_free_per_class
+                        and self._pooled_bytes + buffer.nbytes <= self.max_pooled_bytes):
+                    free.append(buffer)
+                    self._pooled_bytes += buffer.nbytes
+                    return
+            self._stats['discarded'] += 1
+
+    def get_stats(self):
+        """
+        Retorna los contadores del pool.
+
+        Returns:
+            dict: Aciertos, fallos (asignaciones nuevas), uso actual y pico,
+            y memoria retenida en buffers libres
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['free_buffers'] = sum(len(free) for free in self._free.values())
+            stats['pooled_bytes'] = self._pooled_bytes
+        acquisitions = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / acquisitions if acquisitions else 0.0
+        return stats
@@ -0,0 +1,347 @@
+"""
+Caché de resultados de inferencia direccionada por contenido.
+
+La misma imagen se evalúa varias veces (al subirla, al abrir o refrescar la
+página de resultados, al reenviar reportes). La clave de la caché es el hash
+SHA-256 de los bytes del archivo de imagen junto con la versión del modelo y
+el umbral de decisión, de modo que un acierto evita por completo la
+decodificación y la inferencia.
+
+Niveles:
+    - Memoria: LRU en el proceso, acotada por número de entradas.
+    - Compartido (opcional): backend de caché de Django o almacén en disco
+      acotado por número de entradas, visible para todos los procesos.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class LRUResultCache:
+    """
+    Caché LRU en memoria, thread-safe.
+    """
+
+    def __init__(self, max_entries=1024):
+        """
+        Args:
+            max_entries (int): Número máximo de resultados en memoria
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheStore:
+    """
+    Nivel compartido sobre un backend de caché de Django.
+
+    La expulsión por tamaño la realiza el propio backend (MAX_ENTRIES en
+    LocMem/FileBased, política LRU en Memcached/Redis).
+    """
+
+    def __init__(self, alias='default', timeout=None, prefix='anemia-inference'):
+        """
+        Args:
+            alias (str): Alias del backend en ``settings.CACHES``
+            timeout (int): Segundos de vida de cada entrada (None = del backend)
+            prefix (str): Prefijo de las claves
+        """
+        from django.core.cache import caches
+
+        self._cache = caches[alias]
+        self.timeout = timeout
+        self.prefix = prefix
+
+    def get(self, key):
+        return self._cache.get(f"{self.prefix}:{key}")
+
+    def set(self, key, value):
+        if self.timeout is None:
+            self._cache.set(f"{self.prefix}:{key}", value)
+        else:
+            self._cache.set(f"{self.prefix}:{key}", value, self.timeout)
+
+
+class DiskResultStore:
+    """
+    Nivel compartido en disco: un archivo JSON por resultado.
+
+    Cuando se supera ``max_entries`` se eliminan los archivos más antiguos.
+    La comprobación se hace cada ``prune_interval`` escrituras para no
+    recorrer el directorio en cada solicitud.
+    """
+
+    def __init__(self, directory, max_entries=10000, prune_interval=100):
+        """
+        Args:
+            directory (str | Path): Directorio del almacén
+            max_entries (int): Número máximo de resultados en disco
+            prune_interval (int): Escrituras entre comprobaciones de tamaño
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as entry:
+                return json.load(entry)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, value):
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        # Escritura atómica: otro proceso nunca lee un archivo a medias
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+                json.dump(value, tmp)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.prune_interval == 0
+        if should_prune:
+            self.prune()
+
+    def prune(self):
+        """
+        Elimina los resultados más antiguos hasta respetar ``max_entries``.
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        entries = []
+        for path in self.directory.glob('*/*.json'):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return 0
+
+        entries.sort()
+        removed = 0
+        for _, path in entries[:excess]:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        self.evictions += removed
+        return removed
+
+
+class InferenceCache:
+    """
+    Caché de dos niveles (memoria + compartido opcional) con métricas.
+    """
+
+    def __init__(self, max_entries=1024, shared_store=None):
+        """
+        Args:
+            max_entries (int): Tamaño del LRU en memoria
+            shared_store: DjangoCacheStore, DiskResultStore o None
+        """
+        self.memory = LRUResultCache(max_entries)
+        self.shared = shared_store
+        self._stats_lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'shared_hits': 0, 'misses': 0, 'shared_errors': 0}
+
+    @staticmethod
+    def make_key(image_bytes, model_version, threshold):
+        """
+        Construye la clave de un resultado.
+
+        Args:
+            image_bytes (bytes): Bytes del archivo de imagen
+            model_version (str): Versión del modelo que produce el resultado
+            threshold (float): Umbral de decisión aplicado
+
+        Returns:
+            str: Clave hexadecimal SHA-256
+        """
+        digest = hashlib.sha256(image_bytes)
+        digest.update(f"|{model_version}|{threshold!r}".encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Busca un resultado, primero en memoria y luego en el nivel compartido.
+
+        Returns:
+            dict | None: Copia del resultado o None si no está en caché
+        """
+        result = self.memory.get(key)
+        if result is not None:
+            self._count('memory_hits')
+            return dict(result)
+
+        if self.shared is not None:
+            try:
+                result = self.shared.get(key)
+            except Exception:
+                self._count('shared_errors')
+                result = None
+            if result is not None:
+                self.memory.set(key, result)
+                self._count('shared_hits')
+                return dict(result)
+
+        self._count('misses')
+        return None
+
+    def set(self, key, result):
+        """Guarda un resultado en ambos niveles."""
+        result = dict(result)
+        self.memory.set(key, result)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, result)
+            except Exception:
+                self._count('shared_errors')
+
+    def get_stats(self):
+        """
+        Retorna las métricas de la caché.
+
+        Returns:
+            dict: Aciertos por nivel, fallos, tasa de acierto y expulsiones
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['memory_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (
+            (stats['memory_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        )
+        stats['memory_entries'] = len(self.memory)
+        stats['memory_evictions'] = self.memory.evictions
+        stats['shared_backend'] = type(self.shared).__name__ if self.shared else None
+        return stats
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+
+class CachingDetector:
+    """
+    Envoltorio del detector que consulta la caché antes de decodificar.
+
+    Solo se cachean entradas cuyos bytes de archivo se conocen (bytes, rutas
+    y archivos abiertos); el resto se delega sin cambios.
+    """
+
+    def __init__(self, detector, cache):
+        """
+        Args:
+            detector: AnemiaDetector, MicroBatchScheduler o InferencePoolClient
+            cache (InferenceCache): Caché de resultados
+        """
+        self.detector = detector
+        self.cache = cache
+
+    def __getattr__(self, name):
+        detector = self.__dict__.get('detector')
+        if detector is None:
+            raise AttributeError(name)
+        return getattr(detector, name)
+
+    def predict(self, image_path_or_array, return_probability=False):
+        """
+        Realiza una predicción, reutilizando el resultado si la imagen ya
+        fue evaluada con la misma versión del modelo y el mismo umbral.
+
+        Args:
+            image_path_or_array: Bytes, ruta, archivo abierto, imagen PIL o array
+            return_probability (bool): Se mantiene por compatibilidad con el detector
+
+        Returns:
+            dict: Resultado de la predicción con información detallada
+        """
+        image_bytes = self._read_bytes(image_path_or_array)
+        if image_bytes is None:
+            return self.detector.predict(image_path_or_array)
+
+        key = self.cache.make_key(
+            image_bytes, self.detector.model_version, self.detector.threshold
+        )
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        result = self.detector.predict(image_bytes)
+        self.cache.set(key, result)
+        return result
+
+    def get_stats(self):
+        """
+        Métricas de la caché (y del detector envuelto, si las expone).
+
+        Returns:
+            dict: Métricas combinadas
+        """
+        stats = {'cache': self.cache.get_stats()}
+        if hasattr(self.detector, 'get_stats'):
+            stats['detector'] = self.detector.get_stats()
+        return stats
+
+    @staticmethod
+    def _read_bytes(image):
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return bytes(image)
+        if isinstance(image, (str, Path)):
+            try:
+                with open(image, 'rb') as image_file:
+                    return image_file.read()
+            except OSError:
+                return None
+        if hasattr(image, 'read') and hasattr(image, 'seek'):
+            image.seek(0)
+            data = image.read()
+            image.seek(0)
+            return data
+        return None
@@ -0,0 +1,312 @@
+"""
+Conversión del modelo Keras (.h5) a artefactos ligeros para inferencia en CPU.
+
+Genera archivos TensorFlow Lite (.tflite) o de pesos mapeables en memoria
+(.weights) a partir de ``best_model.h5`` o ``model_anemia.h5`` y verifica
+que las probabilidades del artefacto convertido coincidan con las del
+modelo original sobre imágenes reales.
+También produce la variante cuantizada int8, calibrada con las imágenes de
+análisis almacenadas, junto con su informe de paridad, latencia y memoria.
+"""
+from pathlib import Path
+
+import numpy as np
+
+from ml_models import ML_MODELS_DIR
+from ml_models.anemia_detector import AnemiaDetector
+from ml_models.backends import (
+    INFERENCE_MODE_FLOAT,
+    INFERENCE_MODE_INT8,
+    KerasBackend,
+    MmapBackend,
+    TFLiteBackend,
+)
+from ml_models.profiling import measure_latency, measure_load
+
+
+# Modelos H5 incluidos en el repositorio
+BUNDLED_MODELS = (
+    ML_MODELS_DIR / 'best_model.h5',
+    ML_MODELS_DIR / 'model_anemia.h5',
+)
+
+# Extensiones de imagen aceptadas como muestras de verificación
+SAMPLE_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def find_sample_images(directories, limit=None):
+    """
+    Busca imágenes de análisis almacenadas para usarlas como muestras.
+
+    Args:
+        directories (list): Directorios donde buscar (recursivamente)
+        limit (int): Número máximo de imágenes (None = todas)
+
+    Returns:
+        list: Rutas de imágenes ordenadas
+    """
+    images = []
+    for directory in directories:
+        directory = Path(directory)
+        if not directory.is_dir():
+            continue
+        images.extend(
+            path for path in directory.rglob('*')
+            if path.suffix.lower() in SAMPLE_IMAGE_EXTENSIONS
+        )
+
+    images = sorted(set(images))
+    return images[:limit] if limit else images
+
+
+def split_sample_images(image_paths, calibration_fraction=0.5):
+    """
+    Reparte las imágenes de muestra entre calibración int8 y evaluación.
+
+    El reparto es determinista e intercalado sobre la lista ordenada, para
+    que ambos subconjuntos cubran los mismos directorios. Las imágenes de
+    evaluación no se usan para calibrar, de modo que la paridad del informe
+    se mide sobre datos que el conversor no ha visto.
+
+    Args:
+        image_paths (list): Rutas de imágenes ordenadas
+        calibration_fraction (float): Fracción destinada a calibración (0-1)
+
+    Returns:
+        tuple: (imágenes de calibración, imágenes de evaluación)
+    """
+    if not 0 < calibration_fraction < 1:
+        raise ValueError("calibration_fraction debe estar entre 0 y 1")
+    if len(image_paths) < 2:
+        raise ValueError("Se necesitan al menos 2 imágenes para calibrar y evaluar")
+
+    calibration, evaluation = [], []
+    for i, image_path in enumerate(image_paths):
+        # La imagen i va a calibración cuando la cuota acumulada sube
+        if int((i + 1) * calibration_fraction) > int(i * calibration_fraction):
+            calibration.append(image_path)
+        else:
+            evaluation.append(image_path)
+    if not calibration:
+        calibration.append(evaluation.pop(0))
+    elif not evaluation:
+        evaluation.append(calibration.pop())
+    return calibration, evaluation
+
+
+def load_sample_batch(image_paths):
+    """
+    Preprocesa las imágenes de muestra en un único tensor.
+
+    Args:
+        image_paths (list): Rutas de imágenes
+
+    Returns:
+        np.ndarray: Tensor float32 de forma (N, 64, 64, 3)
+    """
+    detector = AnemiaDetector()
+    batch = np.empty((len(image_paths), *detector.input_size, 3), dtype=np.float32)
+    for i, image_path in enumerate(image_paths):
+        detector.preprocess_into(image_path, batch[i])
+    return batch
+
+
+def convert_to_tflite(h5_path, output_path=None, inference_mode=INFERENCE_MODE_FLOAT,
+                      calibration_batch=None):
+    """
+    Convierte un modelo Keras .h5 a TensorFlow Lite.
+
+    Args:
+        h5_path (str | Path): Ruta al modelo .h5
+        output_path (str | Path): Ruta de salida (por defecto, la que espera
+            el backend tflite para el modo indicado)
+        inference_mode (str): 'float' (float32) o 'int8' (cuantización entera)
+        calibration_batch (np.ndarray): Imágenes preprocesadas para calibrar
+            los rangos de activación (obligatorio en modo int8)
+
+    Returns:
+        Path: Ruta del archivo .tflite generado
+    """
+    import tensorflow as tf
+
+    h5_path = Path(h5_path)
+    output_path = (
+        Path(output_path) if output_path
+        else TFLiteBackend.resolve_artifact_path(h5_path, inference_mode)
+    )
+
+    keras_backend = KerasBackend(h5_path)
+    keras_backend.load()
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_backend.model)
+
+    if inference_mode == INFERENCE_MODE_INT8:
+        if calibration_batch is None or not len(calibration_batch):
+            raise ValueError("La cuantización int8 requiere imágenes de calibración")
+
+        def representative_dataset():
+            for i in range(len(calibration_batch)):
+                yield [calibration_batch[i:i + 1]]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    elif inference_mode != INFERENCE_MODE_FLOAT:
+        raise ValueError(f"Modo de inferencia desconocido: '{inference_mode}'")
+
+    output_path.write_bytes(converter.convert())
+
+    return output_path
+
+
+def convert_to_shared_weights(h5_path, output_path=None):
+    """
+    Exporta los pesos de un modelo Keras .h5 al artefacto mapeable del
+    backend mmap (sin TensorFlow).
+
+    Args:
+        h5_path (str | Path): Ruta al modelo .h5
+        output_path (str | Path): Ruta de salida (por defecto, la que espera
+            el backend mmap)
+
+    Returns:
+        Path: Ruta del archivo .weights generado
+    """
+    from ml_models.shared_weights import export_shared_weights
+
+    h5_path = Path(h5_path)
+    return export_shared_weights(
+        h5_path, output_path or MmapBackend.resolve_artifact_path(h5_path)
+    )
+
+
+def compare_predictions(reference, candidate, tolerance, threshold=0.5):
+    """
+    Compara dos vectores de probabilidades.
+
+    Args:
+        reference (np.ndarray): Probabilidades del modelo de referencia
+        candidate (np.ndarray): Probabilidades del modelo a evaluar
+        tolerance (float): Diferencia absoluta máxima permitida
+        threshold (float): Umbral de decisión para contar cambios de diagnóstico
+
+    Returns:
+        dict: Diferencias, cambios de diagnóstico y resultado de la verificación
+    """
+    diff = np.abs(reference - candidate)
+    max_abs_diff = float(diff.max()) if diff.size else 0.0
+    threshold_flips = int(np.count_nonzero(
+        (reference >= threshold) != (candidate >= threshold)
+    ))
+
+    return {
+        'num_samples': int(len(reference)),
+        'max_abs_diff': max_abs_diff,
+        'mean_abs_diff': float(diff.mean()) if diff.size else 0.0,
+        'threshold': threshold,
+        'threshold_flips': threshold_flips,
+        'tolerance': tolerance,
+        'passed': max_abs_diff <= tolerance and threshold_flips == 0,
+    }
+
+
+def verify_parity(h5_path, tflite_path, sample_batch, tolerance=1e-4, threshold=0.5,
+                  backend_class=TFLiteBackend):
+    """
+    Compara las probabilidades del modelo .h5 y del artefacto convertido.
+
+    Args:
+        h5_path (str | Path): Ruta al modelo original
+        tflite_path (str | Path): Ruta al modelo convertido
+        sample_batch (np.ndarray): Tensor de imágenes de muestra
+        tolerance (float): Diferencia absoluta máxima permitida
+        threshold (float): Umbral de decisión para contar cambios de diagnóstico
+        backend_class (type): Backend que carga el artefacto convertido
+
+    Returns:
+        dict: Informe de paridad
+    """
+    keras_backend = KerasBackend(h5_path)
+    keras_backend.load()
+    converted_backend = backend_class(tflite_path)
+    converted_backend.load()
+
+    return compare_predictions(
+        keras_backend.predict(sample_batch),
+        converted_backend.predict(sample_batch),
+        tolerance,
+        threshold,
+    )
+
+
+def build_quantization_report(h5_path, int8_path, sample_batch, tolerance=0.02,
+                              threshold=0.5, latency_repeats=100):
+    """
+    Evalúa el modelo cuantizado int8 frente al modelo float original.
+
+    Compara probabilidades y cambios de diagnóstico en ``threshold`` contra
+    el modelo Keras de referencia, y latencia de una imagen, tiempo de carga,
+    memoria y tamaño del artefacto contra el modelo float (Keras y, si
+    existe, su conversión float a TFLite).
+
+    Args:
+        h5_path (str | Path): Ruta al modelo float .h5
+        int8_path (str | Path): Ruta al modelo cuantizado .tflite
+        sample_batch (np.ndarray): Imágenes preprocesadas de evaluación, no
+            usadas en la calibración del modelo int8
+        tolerance (float): Diferencia absoluta máxima de probabilidad aceptada
+        threshold (float): Umbral de decisión del detector
+        latency_repeats (int): Invocaciones medidas por modelo
+
+    Returns:
+        dict: Informe con las secciones ``parity``, ``models`` y ``passed``
+    """
+    h5_path = Path(h5_path)
+    candidates = [
+        ('keras_float', KerasBackend(h5_path)),
+        ('tflite_int8', TFLiteBackend(int8_path)),
+    ]
+    float_tflite_path = TFLiteBackend.resolve_artifact_path(h5_path)
+    if float_tflite_path.exists():
+        candidates.insert(1, ('tflite_float', TFLiteBackend(float_tflite_path)))
+
+    models = {}
+    probabilities = {}
+    for key, backend in candidates:
+        load_stats = measure_load(backend)
+        probabilities[key] = backend.predict(sample_batch)
+        models[key] = {
+            'path': str(backend.model_path),
+            'size_kb': backend.model_path.stat().st_size / 1024,
+            'load_ms': load_stats['load_ms'],
+            'rss_delta_kb': load_stats['rss_delta_kb'],
+            'latency': measure_latency(
+                backend.predict, sample_batch, repeats=latency_repeats
+            ),
+        }
+
+    parity = compare_predictions(
+        probabilities['keras_float'], probabilities['tflite_int8'], tolerance, threshold
+    )
+    flipped = np.flatnonzero(
+        (probabilities['keras_float'] >= threshold)
+        != (probabilities['tflite_int8'] >= threshold)
+    )
+    parity['flipped_samples'] = [
+        {
+            'index': int(i),
+            'float_probability': float(probabilities['keras_float'][i]),
+            'int8_probability': float(probabilities['tflite_int8'][i]),
+        }
+        for i in flipped
+    ]
+
+    return {
+        'model': str(h5_path),
+        'inference_mode': INFERENCE_MODE_INT8,
+        'parity': parity,
+        'models': models,
+        'passed': parity['passed'],
+    }
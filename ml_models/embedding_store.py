@@ -0,0 +1,289 @@
+"""
+Almacén de embeddings de la penúltima capa y búsqueda de casos similares.
+
+Estructura del directorio:
+
+    - ``embeddings.f16``: matriz float16 (filas, dimensión) sin cabecera, con
+      cada fila normalizada a norma 1 (la similitud coseno es un producto
+      escalar)
+    - ``ids.i64``: id (int64) del ``ReporteAnemia`` de cada fila
+    - ``meta.json``: dimensión, número de filas confirmadas y versión del
+      modelo que generó los embeddings
+
+Las filas nuevas se añaden al final de ambos archivos (nunca se reescribe
+la matriz) y solo cuentan cuando ``meta.json`` se reemplaza con el nuevo
+número de filas: un proceso que lee nunca ve una fila a medias, y lo que
+quede tras un corte a mitad de escritura se sobrescribe en la siguiente
+adición. Las adiciones de varios procesos se serializan con ``flock``.
+Si un id se añade de nuevo (p. ej. tras recalcular el reporte) vale su
+última fila.
+
+La lectura usa ``np.memmap`` y los k mejores se seleccionan con
+``argpartition``. Convertir float16 a float32 cuesta casi diez veces más que
+el producto: por defecto se mantiene una copia float32 en memoria (el doble
+del archivo) a la que solo se convierten las filas nuevas; con
+``float32_cache=False`` se convierte la matriz por bloques en cada búsqueda
+(~110 ms frente a ~15 ms con 300.000 filas de dimensión 100).
+"""
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+
+FORMAT_VERSION = 1
+
+
+class EmbeddingStore:
+    """
+    Matriz de embeddings float16 mapeada en memoria con índice de ids.
+    """
+
+    def __init__(self, directory, search_chunk_rows=65536, float32_cache=True):
+        """
+        Args:
+            directory (str | Path): Directorio del almacén (se crea si no existe)
+            search_chunk_rows (int): Filas convertidas a float32 por bloque
+                durante la búsqueda (sin caché)
+            float32_cache (bool): Mantener en memoria una copia float32
+                ampliada solo con las filas nuevas
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.search_chunk_rows = search_chunk_rows
+        self.float32_cache = float32_cache
+        self._matrix_path = self.directory / 'embeddings.f16'
+        self._ids_path = self.directory / 'ids.i64'
+        self._meta_path = self.directory / 'meta.json'
+        self._lock = threading.Lock()
+        self._view = None
+        self._view_key = None
+        self._cache = None
+        self._cache_rows = 0
+
+    # ------------------------------------------------------------------
+    # Metadatos y vistas
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path, encoding='utf-8') as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return {'format': FORMAT_VERSION, 'dim': None, 'count': 0, 'model_version': None,
+                    'generation': 0}
+
+    def _write_meta(self, meta):
+        tmp_path = self._meta_path.with_name(f".{self._meta_path.name}.tmp")
+        tmp_path.write_text(json.dumps(meta), encoding='utf-8')
+        os.replace(tmp_path, self._meta_path)
+
+    @contextmanager
+    def _exclusive(self):
+        """Bloqueo entre hilos y procesos para las escrituras."""
+        with self._lock, open(self.directory / '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @property
+    def model_version(self):
+        """Versión del modelo que generó los embeddings (None si está vacío)."""
+        return self._read_meta()['model_version']
+
+    def __len__(self):
+        return self._read_meta()['count']
+
+    def _current_view(self):
+        """
+        Vistas de la matriz y los ids confirmados, y el índice de la última
+        fila de cada id (se recalculan solo si cambió ``meta.json``).
+        """
+        meta = self._read_meta()
+        count, dim = meta['count'], meta['dim']
+        # ``generation`` cambia con ``reset``: los archivos anteriores ya no valen
+        key = (meta.get('generation', 0), count, dim)
+        with self._lock:
+            if self._view_key == key:
+                return self._view
+            if not count:
+                self._cache, self._cache_rows = None, 0
+                view = (np.empty((0, dim or 0), dtype=np.float16), np.empty(0, dtype=np.int64),
+                        np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+            else:
+                matrix = np.memmap(self._matrix_path, dtype=np.float16, mode='r',
+                                   shape=(count, dim))
+                if self.float32_cache:
+                    matrix = self._extend_cache(matrix, key)
+                ids = np.memmap(self._ids_path, dtype=np.int64, mode='r', shape=(count,))
+                # Última aparición de cada id: primera en el orden inverso
+                unique_ids, first_reversed = np.unique(ids[::-1], return_index=True)
+                view = (matrix, ids, unique_ids, count - 1 - first_reversed)
+            self._view, self._view_key = view, key
+            return view
+
+    def _extend_cache(self, matrix, key):
+        """Convierte a la copia float32 solo las filas que aún no tiene."""
+        count, dim = matrix.shape
+        cache = self._cache
+        if (cache is None or self._view_key is None or self._view_key[0] != key[0]
+                or cache.shape[1] != dim or self._cache_rows > count):
+            cache, self._cache_rows = None, 0
+        if cache is None or len(cache) < count:
+            # Capacidad duplicada: las adiciones de una fila no copian toda la matriz
+            grown = np.empty((max(count, 2 * self._cache_rows), dim), dtype=np.float32)
+            if self._cache_rows:
+                grown[:self._cache_rows] = cache[:self._cache_rows]
+            cache = grown
+        cache[self._cache_rows:count] = matrix[self._cache_rows:count]
+        self._cache, self._cache_rows = cache, count
+        return cache[:count]
+
+    # ------------------------------------------------------------------
+    # Escritura
+
+    def append(self, ids, embeddings, model_version):
+        """
+        Añade embeddings al final del almacén.
+
+        Args:
+            ids (list): Ids de los reportes
+            embeddings (np.ndarray): Matriz (N, dimensión)
+            model_version (str): Versión del modelo que los generó
+
+        Returns:
+            int: Filas confirmadas tras la adición
+
+        Raises:
+            ValueError: Si la dimensión o la versión del modelo no coinciden
+                con las del almacén (reconstruirlo con ``reset``)
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or len(embeddings) != len(ids):
+            raise ValueError("Se espera una fila de embedding por id")
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        rows = (embeddings / np.maximum(norms, 1e-12)).astype(np.float16)
+
+        with self._exclusive():
+            meta = self._read_meta()
+            if meta['count']:
+                if meta['dim'] != rows.shape[1]:
+                    raise ValueError(
+                        f"Dimensión {rows.shape[1]} distinta de la del almacén ({meta['dim']})"
+                    )
+                if meta['model_version'] != model_version:
+                    raise ValueError(
+                        f"El almacén contiene embeddings de {meta['model_version']}, "
+                        f"no de {model_version}: reconstrúyalo"
+                    )
+            count = meta['count']
+            # Escribir tras la última fila confirmada (descarta restos de un corte)
+            for path, data, row_bytes in (
+                (self._matrix_path, rows, rows.shape[1] * 2),
+                (self._ids_path, ids, 8),
+            ):
+                with open(path, 'ab') as target:
+                    target.truncate(count * row_bytes)
+                    target.write(np.ascontiguousarray(data).tobytes())
+                    target.flush()
+                    os.fsync(target.fileno())
+            self._write_meta({
+                'format': FORMAT_VERSION,
+                'dim': int(rows.shape[1]),
+                'count': count + len(ids),
+                'model_version': model_version,
+                'generation': meta.get('generation', 0),
+            })
+            return count + len(ids)
+
+    def reset(self):
+        """Vacía el almacén (p. ej. al cambiar de modelo)."""
+        with self._exclusive():
+            generation = self._read_meta().get('generation', 0) + 1
+            for path in (self._matrix_path, self._ids_path):
+                if path.exists():
+                    path.unlink()
+            self._write_meta({
+                'format': FORMAT_VERSION, 'dim': None, 'count': 0, 'model_version': None,
+                'generation': generation,
+            })
+
+    # ------------------------------------------------------------------
+    # Lectura
+
+    def indexed_ids(self):
+        """
+        Returns:
+            np.ndarray: Ids con embedding, ordenados y sin repetir
+        """
+        return self._current_view()[2]
+
+    def get(self, report_id):
+        """
+        Embedding normalizado de un reporte.
+
+        Args:
+            report_id (int): Id del reporte
+
+        Returns:
+            np.ndarray | None: Vector float32, o None si no está indexado
+        """
+        matrix, _, unique_ids, last_rows = self._current_view()
+        position = np.searchsorted(unique_ids, report_id)
+        if position == len(unique_ids) or unique_ids[position] != report_id:
+            return None
+        return np.asarray(matrix[last_rows[position]], dtype=np.float32)
+
+    def search(self, query, k=5, candidate_ids=None, exclude_ids=()):
+        """
+        Los ``k`` reportes más similares por similitud coseno.
+
+        Args:
+            query (np.ndarray): Embedding de consulta (se normaliza)
+            k (int): Número de resultados
+            candidate_ids (array-like): Limitar la búsqueda a estos ids
+                (None = todos)
+            exclude_ids (array-like): Ids que no deben aparecer (p. ej. el
+                propio reporte)
+
+        Returns:
+            list: Tuplas (id, similitud) de mayor a menor similitud
+        """
+        matrix, ids, _, last_rows = self._current_view()
+        if not len(ids) or k < 1:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        if matrix.dtype == np.float32:
+            scores = matrix @ query
+        else:
+            scores = np.empty(len(ids), dtype=np.float32)
+            for start in range(0, len(ids), self.search_chunk_rows):
+                block = np.asarray(matrix[start:start + self.search_chunk_rows],
+                                   dtype=np.float32)
+                np.matmul(block, query, out=scores[start:start + len(block)])
+
+        # Solo cuenta la última fila de cada id
+        valid = np.zeros(len(ids), dtype=bool)
+        valid[last_rows] = True
+        if candidate_ids is not None:
+            valid &= np.isin(ids, np.asarray(candidate_ids, dtype=np.int64))
+        if len(exclude_ids):
+            valid &= ~np.isin(ids, np.asarray(exclude_ids, dtype=np.int64))
+        rows = np.flatnonzero(valid)
+        if not rows.size:
+            return []
+
+        candidates = scores[rows]
+        if rows.size > k:
+            top = np.argpartition(candidates, -k)[-k:]
+            rows, candidates = rows[top], candidates[top]
+        order = np.argsort(-candidates, kind='stable')
+        return [(int(ids[row]), float(score)) for row, score in zip(rows[order], candidates[order])]
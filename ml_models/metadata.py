@@ -0,0 +1,109 @@
+"""
+Metadatos del modelo sin cargarlo ni importar TensorFlow.
+
+Los atributos del archivo .h5 (versión de Keras, arquitectura y formas de
+los pesos) se leen con h5py y el hash SHA-256 se calcula una sola vez por
+versión del archivo: el resultado se guarda en memoria con la fecha de
+modificación y el tamaño como clave, de modo que las consultas siguientes
+solo cuestan un ``stat``. Pensado para sondas de salud que se ejecutan cada
+segundo.
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as model_file:
+        for block in iter(lambda: model_file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_h5_attributes(path):
+    import h5py
+
+    with h5py.File(path, 'r') as h5_file:
+        attrs = h5_file.attrs
+        info = {
+            'keras_version': attrs.get('keras_version'),
+            'framework': attrs.get('backend'),
+        }
+        config = json.loads(attrs['model_config']) if 'model_config' in attrs else None
+
+        total_params = 0
+        if 'model_weights' in h5_file:
+            def count(_, obj):
+                nonlocal total_params
+                if isinstance(obj, h5py.Dataset):
+                    total_params += obj.size
+            h5_file['model_weights'].visititems(count)
+
+    for key, value in info.items():
+        if isinstance(value, bytes):
+            info[key] = value.decode()
+    info['total_params'] = total_params
+
+    if config:
+        layers = config['config']['layers']
+        info['model_name'] = config['config'].get('name')
+        info['num_layers'] = len(layers)
+        first = layers[0]['config'] if layers else {}
+        input_shape = first.get('batch_shape') or first.get('batch_input_shape')
+        info['input_shape'] = tuple(input_shape) if input_shape else None
+        units = [layer['config'].get('units') for layer in layers if 'units' in layer['config']]
+        info['output_shape'] = (None, units[-1]) if units else None
+    return info
+
+
+def read_model_metadata(model_path):
+    """
+    Metadatos de un archivo de modelo (cacheados mientras no cambie).
+
+    Args:
+        model_path (str | Path): Ruta al modelo .h5 (u otro artefacto)
+
+    Returns:
+        dict: path, exists, size_kb, modified_at (epoch), sha256, version_hash
+        (12 caracteres, el mismo que aparece en ``model_version``) y, para
+        .h5, keras_version, input_shape, output_shape, total_params,
+        num_layers y model_name. Si no se pudo leer, ``error``
+    """
+    path = Path(model_path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return {'path': str(path), 'exists': False}
+
+    key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None:
+            metadata = {
+                'path': str(path),
+                'exists': True,
+                'size_kb': stat.st_size / 1024,
+                'modified_at': stat.st_mtime,
+            }
+            try:
+                metadata['sha256'] = _file_sha256(path)
+                metadata['version_hash'] = metadata['sha256'][:12]
+                if path.suffix == '.h5':
+                    metadata.update(_read_h5_attributes(path))
+            except Exception as e:
+                metadata['error'] = f"{type(e).__name__}: {e}"
+            # Solo se conserva la versión actual de cada archivo
+            for old_key in [k for k in _cache if k[0] == key[0]]:
+                del _cache[old_key]
+            _cache[key] = cached = metadata
+    return dict(cached)
@@ -3,19 +3,42 @@ Gestor singleton del modelo de detección de anemia.
 El modelo se carga una sola vez al iniciar Django y se reutiliza.
 """
 
+from django.conf import settings
 from ml_models.anemia_detector import AnemiaDetector
+from ml_models.backends import create_backend
+from ml_models.batching import MicroBatchScheduler
+from ml_models.cache import (
+    CachingDetector,
+    DiskResultStore,
+    DjangoCacheStore,
+    InferenceCache,
+)
+from ml_models.metadata import read_model_metadata
+from ml_models.registry import ModelRegistry
+from ml_models.runtime_profile import get_runtime_value, load_runtime_profile
+from pathlib import Path
+import hashlib
+import json
+import os
 import threading
+import time
+
+import numpy as np
 
 
 class ModelSingleton:
     """
     Singleton para mantener una única instancia del detector de anemia cargado en memoria.
+
+    La versión activa la gestiona un ``ModelRegistry``: las recargas se
+    construyen y calientan en segundo plano y se activan sin bloquear ni
+    interrumpir las solicitudes en curso.
     """
 
     _instance = None
     _lock = threading.Lock()
-    _detector = None
-    _loading = False
+    _registry = None
+    _cache = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -24,31 +47,104 @@ class ModelSingleton:
                     cls._instance = super().__new__(cls)
         return cls._instance
 
+    @property
+    def registry(self):
+        """Registro de versiones del modelo (se crea al primer uso)."""
+        if self._registry is None:
+            with self._lock:
+                if self._registry is None:
+                    ModelSingleton._registry = ModelRegistry(
+                        self._build_detector,
+                        warmup=warm_up_detector,
+                        retire=retire_detector,
+                        status_dir=getattr(settings, "ANEMIA_MODEL_REGISTRY_DIR", "") or None,
+                        sync_interval=getattr(settings, "ANEMIA_MODEL_SYNC_INTERVAL", 5.0),
+                        retire_grace=getattr(
+                            settings, "ANEMIA_MODEL_RETIRE_GRACE_SECONDS", 30.0
+                        ),
+                    )
+        return self._registry
+
     def get_detector(self):
         """
         Retorna el detector de anemia, cargándolo si es necesario.
         Thread-safe.
 
         Returns:
-            AnemiaDetector: Instancia del detector con el modelo cargado
+            AnemiaDetector | MicroBatchScheduler | InferencePoolClient:
+            Detector con el modelo cargado
         """
-        if self._detector is None:
-            with self._lock:
-                if self._detector is None and not self._loading:
-                    self._loading = True
-                    try:
-                        print("🔄 Cargando modelo de anemia por primera vez...")
-                        self._detector = AnemiaDetector()
-                        self._detector.load_model()
-                        print("✅ Modelo de anemia cargado y listo para usar")
-                    except Exception as e:
-                        print(f"❌ Error al cargar el modelo: {e}")
-                        self._loading = False
-                        raise
-                    finally:
-                        self._loading = False
-
-        return self._detector
+        registry = self.registry
+        if registry.is_loaded():
+            return registry.get_detector()
+
+        try:
+            print("🔄 Cargando modelo de anemia por primera vez...")
+            detector = registry.get_detector()
+            print("✅ Modelo de anemia cargado y listo para usar")
+            return detector
+        except Exception as e:
+            print(f"❌ Error al cargar el modelo: {e}")
+            raise
+
+    def _build_detector(self, model_path=None):
+        """
+        Crea y carga el detector según settings: cliente del pool de
+        inferencia, detector envuelto en el planificador de micro-batching,
+        o detector local simple.
+
+        Args:
+            model_path (str): Modelo a cargar (None = ANEMIA_MODEL_PATH)
+
+        Returns:
+            CachingDetector | AnemiaDetector | MicroBatchScheduler |
+            InferencePoolClient: Detector listo para usar
+        """
+        if getattr(settings, "ANEMIA_INFERENCE_POOL_ENABLED", False):
+            if model_path is not None:
+                raise ValueError(
+                    "Con ANEMIA_INFERENCE_POOL_ENABLED el modelo lo cargan los "
+                    "procesos del pool: reinicie run_inference_pool con el nuevo modelo"
+                )
+            from ml_models.worker_pool import InferencePoolClient
+
+            pool_config = get_inference_pool_config()
+            # Detector sin cargar: preprocesamiento, TTA y versión del modelo
+            detector = InferencePoolClient(
+                pool_config["address"],
+                pool_config["authkey"],
+                detector=AnemiaDetector(**get_detector_kwargs()),
+            )
+            print(f"   Usando pool de inferencia en {pool_config['address']}")
+        else:
+            kwargs = get_detector_kwargs()
+            if model_path is not None:
+                kwargs["model_path"] = model_path
+            detector = AnemiaDetector(**kwargs)
+            detector.load_model()
+
+            if getattr(settings, "ANEMIA_BATCHING_ENABLED", True):
+                detector = MicroBatchScheduler(
+                    detector,
+                    max_batch_size=get_runtime_value(
+                        getattr(settings, "ANEMIA_BATCH_MAX_SIZE", 0), "batch_max_size", 16
+                    ),
+                    max_wait_ms=getattr(settings, "ANEMIA_BATCH_MAX_WAIT_MS", 5.0),
+                )
+                detector.start()
+                print(
+                    f"   Micro-batching activo (batch máx: {detector.max_batch_size}, "
+                    f"espera máx: {detector.max_wait * 1000:.1f} ms)"
+                )
+
+        if getattr(settings, "ANEMIA_CACHE_ENABLED", True):
+            # La caché se comparte entre versiones: la clave incluye la versión
+            if self._cache is None:
+                ModelSingleton._cache = build_inference_cache()
+            detector = CachingDetector(detector, self._cache)
+            print(f"   Caché de resultados activa (versión: {detector.model_version})")
+
+        return detector
 
     def is_loaded(self):
         """
@@ -57,17 +153,257 @@ class ModelSingleton:
         Returns:
             bool: True si el modelo está cargado
         """
-        return self._detector is not None
+        return self._registry is not None and self._registry.is_loaded()
 
-    def reload_model(self):
+    def reload_model(self, model_path=None, wait=True):
         """
-        Recarga el modelo desde cero.
-        Útil si se actualiza el archivo del modelo.
+        Recarga el modelo sin interrumpir el servicio: la nueva versión se
+        carga y calienta en segundo plano y luego sustituye a la activa.
+
+        Args:
+            model_path (str): Nuevo modelo (None = ANEMIA_MODEL_PATH)
+            wait (bool): Esperar a que termine el intercambio
+
+        Returns:
+            CachingDetector | AnemiaDetector | MicroBatchScheduler |
+            InferencePoolClient: Detector activo tras la recarga
         """
-        with self._lock:
-            print("🔄 Recargando modelo de anemia...")
-            self._detector = None
+        print("🔄 Recargando modelo de anemia...")
+        registry = self.registry
+        if not registry.is_loaded():
             return self.get_detector()
+        registry.swap(model_path, wait=wait)
+        return registry.get_detector()
+
+
+def warm_up_detector(detector):
+    """
+    Ejecuta inferencias de calentamiento sobre una muestra fija de imágenes
+    antes de activar una versión, sin pasar por la caché de resultados.
+
+    Args:
+        detector: Detector recién construido
+
+    Returns:
+        dict: Imágenes, rondas y duración del calentamiento
+
+    Raises:
+        ValueError: Si el modelo produce probabilidades fuera de [0, 1]
+    """
+    layer = detector.detector if isinstance(detector, CachingDetector) else detector
+    samples = get_warmup_samples(getattr(settings, "ANEMIA_MODEL_WARMUP_SAMPLES", 8))
+    rounds = getattr(settings, "ANEMIA_MODEL_WARMUP_ROUNDS", 2)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for sample in samples:
+            probability = layer.predict(sample)["probability"]
+            if not 0.0 <= probability <= 1.0:
+                raise ValueError(
+                    f"Probabilidad inválida durante el calentamiento: {probability}"
+                )
+
+    return {
+        "samples": len(samples),
+        "rounds": rounds,
+        "warmup_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def validate_model(model_path):
+    """
+    Carga y calienta un modelo candidato en este proceso sin activarlo.
+
+    Args:
+        model_path (str): Ruta del modelo candidato
+
+    Returns:
+        dict: Versión del modelo y métricas del calentamiento
+    """
+    kwargs = get_detector_kwargs()
+    kwargs["model_path"] = model_path
+    detector = AnemiaDetector(**kwargs)
+    detector.load_model()
+    return {"version": detector.model_version, "warmup": warm_up_detector(detector)}
+
+
+def get_warmup_samples(limit=8):
+    """
+    Muestra fija de calentamiento: las primeras imágenes de
+    static/img/analysis o, si no hay, una imagen sintética determinista.
+
+    Args:
+        limit (int): Número máximo de imágenes
+
+    Returns:
+        list: Bytes de archivo o arrays RGB uint8
+    """
+    from ml_models.conversion import find_sample_images
+
+    paths = find_sample_images(
+        [Path(settings.BASE_DIR) / "static" / "img" / "analysis"], limit
+    )
+    if paths:
+        return [path.read_bytes() for path in paths]
+
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, size=(64, 64, 3), dtype=np.uint8)]
+
+
+def retire_detector(detector):
+    """
+    Libera una versión sustituida: detiene los planificadores de
+    micro-batching de la cadena tras procesar lo pendiente.
+
+    Args:
+        detector: Detector de la versión retirada
+    """
+    layer = detector
+    while layer is not None:
+        if isinstance(layer, MicroBatchScheduler):
+            layer.stop()
+        layer = layer.__dict__.get("detector")
+
+
+def get_backend_options(backend):
+    """
+    Opciones específicas del backend leídas desde settings o, para los
+    hilos, del perfil de ejecución si se generó para el mismo backend.
+
+    Args:
+        backend (str): Nombre del backend de inferencia
+
+    Returns:
+        dict: Argumentos adicionales para el constructor del backend
+    """
+    profile = load_runtime_profile() or {}
+    if backend == "tflite":
+        return {
+            "num_threads": get_runtime_value(
+                getattr(settings, "ANEMIA_TFLITE_NUM_THREADS", 0), "intra_op_threads",
+                profile=profile, backend=backend,
+            ),
+        }
+    if backend == "keras":
+        return {
+            "jit_compile": getattr(settings, "ANEMIA_KERAS_JIT_COMPILE", False),
+            "intra_op_threads": get_runtime_value(
+                getattr(settings, "ANEMIA_KERAS_INTRA_OP_THREADS", 0), "intra_op_threads",
+                profile=profile, backend=backend,
+            ),
+            "inter_op_threads": get_runtime_value(
+                getattr(settings, "ANEMIA_KERAS_INTER_OP_THREADS", 0), "inter_op_threads",
+                profile=profile, backend=backend,
+            ),
+        }
+    return {}
+
+
+def get_detector_kwargs():
+    """
+    Argumentos del AnemiaDetector configurados en settings.
+
+    Returns:
+        dict: model_path, backend, backend_options, inference_mode,
+        opciones de preprocesamiento, calibración de la primera etapa y
+        configuración del ensemble
+    """
+    backend = getattr(settings, "ANEMIA_INFERENCE_BACKEND", "keras")
+    return {
+        "model_path": getattr(settings, "ANEMIA_MODEL_PATH", "ml_models/best_model.h5"),
+        "backend": backend,
+        "backend_options": get_backend_options(backend),
+        "inference_mode": getattr(settings, "ANEMIA_INFERENCE_MODE", "float"),
+        "fast_decode": getattr(settings, "ANEMIA_FAST_DECODE", True),
+        "reducing_gap": getattr(settings, "ANEMIA_DECODE_REDUCING_GAP", 3.0),
+        "tta_band": (
+            getattr(settings, "ANEMIA_TTA_BAND", 0.1)
+            if getattr(settings, "ANEMIA_TTA_ENABLED", False)
+            else None
+        ),
+        "pallor_calibration": get_pallor_calibration(),
+        "ensemble_with": list(getattr(settings, "ANEMIA_ENSEMBLE_WITH", [])) or None,
+        "ensemble_strategy": getattr(settings, "ANEMIA_ENSEMBLE_STRATEGY", "mean"),
+        "ensemble_weights": list(getattr(settings, "ANEMIA_ENSEMBLE_WEIGHTS", [])) or None,
+    }
+
+
+def get_pallor_calibration():
+    """
+    Calibración de la primera etapa por índice de palidez.
+
+    Returns:
+        dict | None: Calibración leída de ANEMIA_PALLOR_CALIBRATION, o None
+        si la etapa está desactivada o el archivo no existe o no es válido
+    """
+    if not getattr(settings, "ANEMIA_PALLOR_PRESCREEN_ENABLED", False):
+        return None
+    path = getattr(settings, "ANEMIA_PALLOR_CALIBRATION", "")
+    try:
+        with open(path, encoding="utf-8") as calibration_file:
+            return json.load(calibration_file)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Primera etapa por palidez desactivada: no se pudo leer {path} ({e})")
+        return None
+
+
+def build_inference_cache():
+    """
+    Crea la caché de resultados de inferencia según settings.
+
+    Returns:
+        InferenceCache: Caché con LRU en memoria y nivel compartido opcional
+    """
+    shared_backend = getattr(settings, "ANEMIA_CACHE_SHARED_BACKEND", "")
+    if shared_backend == "django":
+        shared_store = DjangoCacheStore(
+            alias=getattr(settings, "ANEMIA_CACHE_DJANGO_ALIAS", "default"),
+            timeout=getattr(settings, "ANEMIA_CACHE_TIMEOUT", None),
+        )
+    elif shared_backend == "disk":
+        shared_store = DiskResultStore(
+            getattr(settings, "ANEMIA_CACHE_DISK_DIR"),
+            max_entries=getattr(settings, "ANEMIA_CACHE_DISK_MAX_ENTRIES", 10000),
+        )
+    elif shared_backend:
+        raise ValueError(
+            f"Nivel compartido de caché desconocido: '{shared_backend}'. "
+            "Opciones válidas: django, disk"
+        )
+    else:
+        shared_store = None
+
+    return InferenceCache(
+        max_entries=getattr(settings, "ANEMIA_CACHE_MAX_ENTRIES", 1024),
+        shared_store=shared_store,
+    )
+
+
+def get_inference_pool_config():
+    """
+    Configuración del pool de inferencia multiproceso.
+
+    Si no se define ANEMIA_INFERENCE_POOL_AUTHKEY, la clave se deriva de
+    SECRET_KEY para que servidor y clientes la compartan sin configuración.
+
+    Returns:
+        dict: address, authkey y workers
+    """
+    authkey = getattr(settings, "ANEMIA_INFERENCE_POOL_AUTHKEY", "")
+    if not authkey:
+        authkey = hashlib.sha256(
+            f"anemia-inference-pool:{settings.SECRET_KEY}".encode()
+        ).hexdigest()
+
+    return {
+        "address": getattr(
+            settings, "ANEMIA_INFERENCE_POOL_ADDRESS", "/tmp/anemia_inference.sock"
+        ),
+        "authkey": authkey.encode(),
+        "workers": get_runtime_value(
+            getattr(settings, "ANEMIA_INFERENCE_POOL_WORKERS", 0), "replicas", 2
+        ),
+    }
 
 
 # Instancia global del singleton
@@ -79,11 +415,255 @@ def get_anemia_detector():
     Función helper para obtener el detector de anemia.
 
     Returns:
-        AnemiaDetector: Detector de anemia con modelo cargado
+        CachingDetector | AnemiaDetector | MicroBatchScheduler |
+        InferencePoolClient: Detector de anemia con modelo cargado (con caché
+        de resultados si ANEMIA_CACHE_ENABLED, micro-batching si
+        ANEMIA_BATCHING_ENABLED, o proxy del pool si ANEMIA_INFERENCE_POOL_ENABLED)
     """
     return _model_singleton.get_detector()
 
 
+def get_model_registry():
+    """
+    Registro de versiones del modelo de este proceso.
+
+    Returns:
+        ModelRegistry: Registro con la versión activa y el estado de los workers
+    """
+    return _model_singleton.registry
+
+
+def swap_model(model_path=None):
+    """
+    Publica una nueva versión del modelo para todos los workers e inicia el
+    intercambio en este proceso sin esperar.
+
+    Args:
+        model_path (str): Modelo a servir (None = ANEMIA_MODEL_PATH)
+
+    Returns:
+        dict: Objetivo publicado (o None si no hay directorio compartido)
+    """
+    registry = get_model_registry()
+    if registry.status_dir is None:
+        registry.swap(model_path)
+        return None
+
+    target = registry.publish(
+        model_path or getattr(settings, "ANEMIA_MODEL_PATH", "ml_models/best_model.h5")
+    )
+    if registry.is_loaded():
+        registry.sync(force=True)
+    return target
+
+
+_async_executor = None
+_async_executor_lock = threading.Lock()
+
+
+def get_async_executor():
+    """
+    Executor asyncio del proceso sobre el detector activo (sigue los
+    intercambios en caliente del modelo).
+
+    Returns:
+        AsyncInferenceExecutor: Executor configurado con ANEMIA_ASYNC_*
+    """
+    global _async_executor
+    if _async_executor is None:
+        with _async_executor_lock:
+            if _async_executor is None:
+                from ml_models.async_inference import AsyncInferenceExecutor
+
+                _async_executor = AsyncInferenceExecutor(
+                    get_anemia_detector,
+                    max_workers=getattr(settings, "ANEMIA_ASYNC_MAX_WORKERS", 8),
+                    max_pending=getattr(settings, "ANEMIA_ASYNC_MAX_PENDING", 64),
+                    queue_timeout=getattr(settings, "ANEMIA_ASYNC_QUEUE_TIMEOUT", 1.0),
+                )
+    return _async_executor
+
+
+async def apredict(image, return_probability=False):
+    """
+    Versión asíncrona de ``get_anemia_detector().predict`` para vistas async.
+
+    Args:
+        image: Bytes, ruta, imagen PIL o array numpy
+        return_probability (bool): Ver ``AnemiaDetector.predict``
+
+    Returns:
+        dict: Resultado de la predicción
+
+    Raises:
+        InferenceOverloadedError: Si hay demasiadas inferencias pendientes
+    """
+    return await get_async_executor().apredict(image, return_probability)
+
+
+async def apredict_batch(images, batch_size=32):
+    """
+    Versión asíncrona de la predicción por lotes.
+
+    Args:
+        images (list): Imágenes (bytes, rutas, PIL o arrays)
+        batch_size (int): Imágenes por trabajo del executor
+
+    Returns:
+        list: Resultados en el mismo orden que ``images``
+    """
+    return await get_async_executor().apredict_batch(images, batch_size)
+
+
+_shadow_evaluator = None
+_shadow_evaluator_lock = threading.Lock()
+
+
+def _primary_is_busy():
+    executor = _async_executor
+    return executor is not None and executor.get_stats()["in_flight"] > 0
+
+
+def get_shadow_evaluator():
+    """
+    Evaluador en sombra del modelo candidato ANEMIA_SHADOW_MODEL_PATH.
+
+    El candidato usa el mismo backend y preprocesamiento que el modelo
+    principal, sin caché ni micro-batching, y se carga en el hilo de sombra
+    la primera vez que se evalúa una muestra.
+
+    Returns:
+        ShadowEvaluator | None: Evaluador, o None si no hay candidato configurado
+    """
+    global _shadow_evaluator
+    candidate_path = getattr(settings, "ANEMIA_SHADOW_MODEL_PATH", "")
+    if not candidate_path:
+        return None
+    if _shadow_evaluator is None:
+        with _shadow_evaluator_lock:
+            if _shadow_evaluator is None:
+                from ml_models.shadow import ShadowEvaluator
+
+                def create_candidate():
+                    kwargs = get_detector_kwargs()
+                    kwargs["model_path"] = candidate_path
+                    # El candidato se compara siempre con su CNN sola
+                    kwargs["pallor_calibration"] = None
+                    return AnemiaDetector(**kwargs)
+
+                _shadow_evaluator = ShadowEvaluator(
+                    create_candidate,
+                    sample_rate=getattr(settings, "ANEMIA_SHADOW_SAMPLE_RATE", 0.1),
+                    max_pending=getattr(settings, "ANEMIA_SHADOW_MAX_PENDING", 32),
+                    is_busy=_primary_is_busy,
+                    max_defer=getattr(settings, "ANEMIA_SHADOW_MAX_DEFER", 2.0),
+                )
+    return _shadow_evaluator
+
+
+def preload_shadow_candidate():
+    """
+    Carga y calienta el modelo candidato de la evaluación en sombra, si está
+    configurado. Un fallo solo desactiva la sombra de hecho (cada trabajo
+    fallará y se contará), nunca el modelo principal.
+    """
+    shadow = get_shadow_evaluator()
+    if shadow is None:
+        return
+    try:
+        warm_up_detector(shadow.preload())
+        print(f"🔍 Evaluación en sombra activa (candidato: "
+              f"{getattr(settings, 'ANEMIA_SHADOW_MODEL_PATH', '')}, "
+              f"muestreo: {shadow.sample_rate:.0%})")
+    except Exception as e:
+        print(f"⚠️  No se pudo pre-cargar el modelo candidato: {e}")
+
+
+def get_quality_gate():
+    """
+    Control de calidad de capturas configurado en settings.
+
+    Returns:
+        ImageQualityGate | None: Control, o None si ANEMIA_QUALITY_GATE_ENABLED es False
+    """
+    if not getattr(settings, "ANEMIA_QUALITY_GATE_ENABLED", True):
+        return None
+    from ml_models.quality import ImageQualityGate
+
+    return ImageQualityGate(
+        min_sharpness=getattr(settings, "ANEMIA_QUALITY_MIN_SHARPNESS", 100.0),
+        min_mask_fraction=getattr(settings, "ANEMIA_QUALITY_MIN_MASK_FRACTION", 0.01),
+        min_crop_px=getattr(settings, "ANEMIA_QUALITY_MIN_CROP_PX", 64),
+        min_brightness=getattr(settings, "ANEMIA_QUALITY_MIN_BRIGHTNESS", 50.0),
+        max_clipped_fraction=getattr(settings, "ANEMIA_QUALITY_MAX_CLIPPED_FRACTION", 0.25),
+    )
+
+
+_embedding_store = None
+_embedder = None
+_embedder_version = None
+_embedding_lock = threading.Lock()
+
+
+def get_embedding_store():
+    """
+    Almacén de embeddings de los reportes (ANEMIA_EMBEDDING_STORE_DIR).
+
+    Returns:
+        EmbeddingStore: Almacén compartido por el proceso
+    """
+    global _embedding_store
+    if _embedding_store is None:
+        with _embedding_lock:
+            if _embedding_store is None:
+                from ml_models.embedding_store import EmbeddingStore
+
+                _embedding_store = EmbeddingStore(
+                    getattr(settings, "ANEMIA_EMBEDDING_STORE_DIR",
+                            Path(settings.BASE_DIR) / "embeddings")
+                )
+    return _embedding_store
+
+
+def get_embedder():
+    """
+    Detector con el que se calculan los embeddings de los reportes.
+
+    Es el AnemiaDetector activo del registro (sin la caché ni el
+    micro-batching que lo envuelven), así que sigue los intercambios de
+    versión sin cargar otra copia del modelo. Solo con el pool de inferencia,
+    cuyos modelos viven en otros procesos, se carga un detector propio, que
+    se reconstruye cuando cambia la versión activa.
+
+    Returns:
+        AnemiaDetector: Detector cargado
+
+    Raises:
+        NotImplementedError: Si el backend no expone embeddings
+    """
+    global _embedder, _embedder_version
+    active = get_anemia_detector()
+    detector = active
+    while isinstance(detector, (CachingDetector, MicroBatchScheduler)):
+        detector = detector.detector
+    if not isinstance(detector, AnemiaDetector):
+        version = active.model_version
+        with _embedding_lock:
+            if _embedder is None or _embedder_version != version:
+                kwargs = get_detector_kwargs()
+                kwargs["pallor_calibration"] = None
+                embedder = AnemiaDetector(**kwargs)
+                if embedder.backend.supports_embedding:
+                    embedder.load_model()
+                _embedder, _embedder_version = embedder, version
+            detector = _embedder
+    if not detector.backend.supports_embedding:
+        raise NotImplementedError(
+            f"El backend '{detector.backend.name}' no expone embeddings; use keras, numpy o mmap"
+        )
+    return detector
+
+
 def is_model_loaded():
     """
     Verifica si el modelo está cargado.
@@ -94,15 +674,207 @@ def is_model_loaded():
     return _model_singleton.is_loaded()
 
 
+# Modos de pre-carga del modelo en servidores de producción
+PRELOAD_MODES = ("off", "worker", "background", "master")
+
+# Estado de la pre-carga de este proceso (bandera de disponibilidad)
+_preload_status = {"mode": None, "state": "pending", "error": None, "load_ms": None}
+
+
 def preload_model():
     """
-    Pre-carga el modelo al iniciar Django.
-    Debe ser llamado en apps.py ready()
+    Pre-carga y calienta el modelo en este proceso.
+    La llaman apps.py ready() (runserver), wsgi.py/asgi.py y gunicorn.conf.py.
+
+    Returns:
+        bool: True si el modelo quedó listo
     """
+    if is_model_loaded():
+        _preload_status["state"] = "ready"
+        return True
+
     try:
         print("🚀 Iniciando pre-carga del modelo de anemia...")
+        _preload_status.update(state="loading", error=None)
+        start = time.perf_counter()
         get_anemia_detector()
+        _preload_status.update(
+            state="ready", load_ms=(time.perf_counter() - start) * 1000
+        )
         print("✅ Modelo pre-cargado exitosamente")
+        preload_shadow_candidate()
+        return True
     except Exception as e:
+        _preload_status.update(state="failed", error=str(e))
         print(f"⚠️  No se pudo pre-cargar el modelo: {e}")
         print("   El modelo se cargará en la primera solicitud.")
+        return False
+
+
+def preload_for_server(mode=None):
+    """
+    Hook de arranque de wsgi.py/asgi.py según ANEMIA_PRELOAD_MODE:
+
+        - off: el modelo se carga en la primera solicitud
+        - worker: cada proceso carga y calienta el modelo antes de atender
+          (gunicorn sin --preload, uvicorn --workers)
+        - background: igual que worker, en un hilo; el proceso atiende
+          mientras tanto y ``get_preload_status()`` indica si está listo
+        - master: gunicorn con preload_app: el maestro solo hace el trabajo
+          seguro antes de fork (importar el runtime y leer los artefactos) y
+          cada worker instancia el modelo tras el fork (gunicorn.conf.py)
+
+    TensorFlow no es seguro ante fork una vez que ejecuta operaciones (sus
+    hilos no sobreviven al fork), por eso nunca se instancia el modelo en
+    el proceso maestro.
+
+    Args:
+        mode (str): Modo de pre-carga (None = ANEMIA_PRELOAD_MODE)
+    """
+    mode = mode or getattr(settings, "ANEMIA_PRELOAD_MODE", "worker")
+    if mode not in PRELOAD_MODES:
+        raise ValueError(
+            f"Modo de pre-carga desconocido: '{mode}'. "
+            f"Opciones válidas: {', '.join(PRELOAD_MODES)}"
+        )
+    _preload_status["mode"] = mode
+
+    if mode == "off":
+        return
+    if mode == "master":
+        prepare_for_fork()
+    elif mode == "background":
+        _preload_status["state"] = "loading"
+        threading.Thread(
+            target=preload_worker, name="anemia-preload", daemon=True
+        ).start()
+    else:
+        preload_worker()
+
+
+def preload_worker():
+    """
+    Pre-carga completa de un proceso que atiende solicitudes: el URLconf
+    (que importa las vistas y sus dependencias) y el modelo calentado.
+
+    Returns:
+        bool: True si el modelo quedó listo
+    """
+    from django.urls import get_resolver
+
+    start = time.perf_counter()
+    get_resolver().url_patterns
+    print(f"   Vistas importadas en {(time.perf_counter() - start) * 1000:.0f} ms")
+    return preload_model()
+
+
+def prepare_for_fork():
+    """
+    Trabajo de pre-carga seguro antes de fork: importa el runtime del
+    backend y lee el modelo y las imágenes de calentamiento (quedan en la
+    caché de páginas del sistema, compartida por los workers). No crea
+    hilos ni ejecuta el modelo.
+    """
+    if getattr(settings, "ANEMIA_INFERENCE_POOL_ENABLED", False):
+        return
+
+    start = time.perf_counter()
+    kwargs = get_detector_kwargs()
+    if kwargs["backend"] == "keras":
+        import tensorflow  # noqa: F401
+    elif kwargs["backend"] == "tflite":
+        from ml_models.backends import _get_tflite_interpreter_class
+
+        _get_tflite_interpreter_class()
+
+    backend = create_backend(
+        kwargs["backend"], kwargs["model_path"], kwargs["inference_mode"]
+    )
+    if backend.model_path.exists():
+        backend.model_path.read_bytes()
+    get_warmup_samples(getattr(settings, "ANEMIA_MODEL_WARMUP_SAMPLES", 8))
+
+    print(
+        f"🚀 Runtime '{kwargs['backend']}' importado en el proceso maestro "
+        f"({(time.perf_counter() - start) * 1000:.0f} ms); "
+        "el modelo se cargará en cada worker tras el fork"
+    )
+
+
+def get_preload_status():
+    """
+    Bandera de disponibilidad del modelo en este proceso.
+
+    Returns:
+        dict: mode, state ('pending', 'loading', 'ready', 'failed'),
+        error, load_ms y ready
+    """
+    status = dict(_preload_status)
+    status["ready"] = is_model_loaded()
+    if status["ready"]:
+        status["state"] = "ready"
+    return status
+
+
+def get_health_status():
+    """
+    Estado del modelo para las sondas de salud: no carga el modelo, no
+    ejecuta inferencias ni importa TensorFlow. Solo combina la bandera de
+    pre-carga, la versión activa del registro (si ya existe) y los
+    metadatos cacheados del archivo configurado, de modo que se puede
+    consultar cada segundo.
+
+    Returns:
+        dict: ready, preload (estado de la pre-carga), active (versión,
+        ruta, carga y calentamiento de la versión activa o None), backend
+        e inference_mode configurados y model (metadatos del archivo .h5)
+    """
+    preload = get_preload_status()
+    registry = ModelSingleton._registry
+    active = registry.active_version if registry is not None else None
+
+    # Sin pre-carga el modelo se carga con la primera solicitud: el proceso
+    # puede recibir tráfico mientras no haya fallado
+    ready = preload["ready"] or (
+        preload["mode"] == "off" and preload["state"] != "failed"
+    )
+    return {
+        "ready": ready,
+        "preload": preload,
+        "active": active.as_dict() if active is not None else None,
+        "backend": getattr(settings, "ANEMIA_INFERENCE_BACKEND", "keras"),
+        "inference_mode": getattr(settings, "ANEMIA_INFERENCE_MODE", "float"),
+        "model": read_model_metadata(
+            (active.model_path if active is not None else None)
+            or getattr(settings, "ANEMIA_MODEL_PATH", "ml_models/best_model.h5")
+        ),
+    }
+
+
+def _reset_after_fork():
+    """
+    En el proceso hijo, descarta cualquier modelo heredado del padre: sus
+    hilos (micro-batching, runtime) no existen tras el fork.
+    """
+    ModelSingleton._lock = threading.Lock()
+    ModelSingleton._registry = None
+    ModelSingleton._cache = None
+    _preload_status.update(state="pending", error=None, load_ms=None)
+
+    global _async_executor, _async_executor_lock
+    _async_executor = None
+    _async_executor_lock = threading.Lock()
+
+    global _shadow_evaluator, _shadow_evaluator_lock
+    _shadow_evaluator = None
+    _shadow_evaluator_lock = threading.Lock()
+
+    global _embedding_store, _embedder, _embedder_version, _embedding_lock
+    _embedding_store = None
+    _embedder = None
+    _embedder_version = None
+    _embedding_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
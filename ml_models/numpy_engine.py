@@ -0,0 +1,378 @@
+"""
+Paso hacia adelante del CNN de anemia con NumPy, sin TensorFlow.
+
+El modelo es una cadena de capas Keras sencillas (Conv2D, MaxPooling2D,
+GlobalAveragePooling2D, Dense, Dropout...). La arquitectura se describe como
+un "programa": una lista de dicts con el tipo de capa, su configuración y
+los nombres de sus pesos. Los pesos pueden ser arrays en memoria o vistas de
+un archivo mapeado en memoria (ver ``ml_models.shared_weights``): el motor
+solo los lee, nunca los copia ni los modifica.
+
+Las convoluciones se calculan como im2col + una única multiplicación de
+matrices por capa, vectorizada sobre un bloque de imágenes del batch.
+"""
+import json
+
+import numpy as np
+
+
+# Capas soportadas y claves de configuración que se conservan de cada una
+SUPPORTED_LAYERS = {
+    'InputLayer': ('batch_shape', 'batch_input_shape'),
+    'Conv2D': ('kernel_size', 'strides', 'padding', 'dilation_rate', 'activation', 'use_bias'),
+    'MaxPooling2D': ('pool_size', 'strides', 'padding'),
+    'AveragePooling2D': ('pool_size', 'strides', 'padding'),
+    'GlobalAveragePooling2D': (),
+    'GlobalMaxPooling2D': (),
+    'Flatten': (),
+    'Dense': ('units', 'activation', 'use_bias'),
+    'Activation': ('activation',),
+    'ReLU': (),
+    'Dropout': (),
+}
+
+# Capas sin efecto en inferencia
+INFERENCE_NOOP_LAYERS = ('InputLayer', 'Dropout')
+
+# Activaciones crecientes: conmutan con MaxPooling2D
+MONOTONIC_ACTIVATIONS = ('linear', 'relu', 'sigmoid', 'tanh')
+
+
+def _sigmoid(x):
+    # Forma estable para valores muy negativos
+    out = np.empty_like(x)
+    positive = x >= 0
+    out[positive] = 1.0 / (1.0 + np.exp(-x[positive]))
+    exp_x = np.exp(x[~positive])
+    out[~positive] = exp_x / (1.0 + exp_x)
+    return out
+
+
+def _softmax(x):
+    shifted = np.exp(x - x.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': _sigmoid,
+    'tanh': np.tanh,
+    'softmax': _softmax,
+}
+
+
+def build_program(model_config, weight_names):
+    """
+    Traduce la configuración Keras de un modelo secuencial a un programa.
+
+    Args:
+        model_config (dict | str): ``model_config`` del archivo .h5
+        weight_names (dict): Nombres de los pesos de cada capa, en el orden
+            de Keras (kernel, bias)
+
+    Returns:
+        list: Capas con ``type``, ``name``, su configuración y ``weights``
+
+    Raises:
+        ValueError: Si el modelo no es una cadena de capas soportadas
+    """
+    if isinstance(model_config, (str, bytes)):
+        model_config = json.loads(model_config)
+    layers = model_config['config']['layers']
+
+    program = []
+    previous = None
+    for layer in layers:
+        layer_type = layer['class_name']
+        config = layer['config']
+        name = config.get('name', layer.get('name'))
+        if layer_type not in SUPPORTED_LAYERS:
+            raise ValueError(f"Capa no soportada por el motor NumPy: {layer_type} ({name})")
+
+        for node in layer.get('inbound_nodes') or []:
+            inputs = [
+                arg['config']['keras_history'][0] for arg in node.get('args', [])
+                if isinstance(arg, dict) and arg.get('class_name') == '__keras_tensor__'
+            ]
+            if inputs != [previous]:
+                raise ValueError(f"Solo se soportan modelos secuenciales: {name} recibe {inputs}")
+        previous = name
+
+        if layer_type == 'Conv2D' and (config.get('groups', 1) != 1
+                                       or config.get('data_format', 'channels_last') != 'channels_last'):
+            raise ValueError(f"Configuración de Conv2D no soportada en {name}")
+
+        step = {'type': layer_type, 'name': name, 'weights': list(weight_names.get(name, ()))}
+        step.update({key: config[key] for key in SUPPORTED_LAYERS[layer_type] if key in config})
+        program.append(step)
+    return program
+
+
+def read_h5_model(h5_path):
+    """
+    Lee la arquitectura y los pesos de un modelo Keras .h5 con h5py.
+
+    Args:
+        h5_path (str | Path): Ruta al modelo .h5
+
+    Returns:
+        tuple: (programa, dict de pesos float32 por nombre)
+    """
+    import h5py
+
+    with h5py.File(h5_path, 'r') as h5_file:
+        weights_group = h5_file['model_weights']
+        weight_names = {}
+        weights = {}
+        for layer_name in weights_group.attrs['layer_names']:
+            layer_name = layer_name.decode() if isinstance(layer_name, bytes) else str(layer_name)
+            layer_group = weights_group[layer_name]
+            names = [
+                name.decode() if isinstance(name, bytes) else str(name)
+                for name in layer_group.attrs.get('weight_names', [])
+            ]
+            weight_names[layer_name] = names
+            for name in names:
+                weights[name] = np.asarray(layer_group[name], dtype=np.float32)
+        program = build_program(h5_file.attrs['model_config'], weight_names)
+    return program, weights
+
+
+def _same_padding(size, kernel, stride, dilation=1):
+    # Misma convención que TensorFlow: el relleno extra va al final
+    effective = (kernel - 1) * dilation + 1
+    out = -(-size // stride)
+    total = max((out - 1) * stride + effective - size, 0)
+    return total // 2, total - total // 2
+
+
+def _pad_spatial(x, padding, kernel, strides, dilation=(1, 1), value=0.0):
+    if padding == 'valid':
+        return x
+    pads = [
+        _same_padding(x.shape[axis + 1], kernel[axis], strides[axis], dilation[axis])
+        for axis in range(2)
+    ]
+    if not any(any(pad) for pad in pads):
+        return x
+    return np.pad(x, ((0, 0), *pads, (0, 0)), constant_values=value)
+
+
+def conv2d(x, kernel, bias=None, strides=(1, 1), padding='valid', dilation=(1, 1)):
+    """
+    Convolución 2D (NHWC) como im2col + una multiplicación de matrices.
+
+    Args:
+        x (np.ndarray): Entrada (N, H, W, C)
+        kernel (np.ndarray): Filtros (kh, kw, C, F)
+        bias (np.ndarray): Sesgo (F,) o None
+        strides (tuple): Pasos (sh, sw)
+        padding (str): 'valid' o 'same'
+        dilation (tuple): Dilatación (dh, dw)
+
+    Returns:
+        np.ndarray: Salida (N, H', W', F) en float32
+    """
+    kh, kw, channels, filters = kernel.shape
+    x = _pad_spatial(x, padding, (kh, kw), strides, dilation)
+    n, height, width, _ = x.shape
+    sh, sw = strides
+    dh, dw = dilation
+    out_h = (height - (kh - 1) * dh - 1) // sh + 1
+    out_w = (width - (kw - 1) * dw - 1) // sw + 1
+
+    # Una copia por fila del kernel: con dilatación 1 las kw columnas de
+    # cada ventana son contiguas en memoria, lo que evita copiar tramos de
+    # solo C valores (muy lento con las 3 bandas RGB de la primera capa)
+    s_n, s_h, s_w, s_c = x.strides
+    columns = np.empty((n, out_h, out_w, kh, kw, channels), dtype=np.float32)
+    for i in range(kh):
+        columns[:, :, :, i] = np.lib.stride_tricks.as_strided(
+            x[:, i * dh:],
+            shape=(n, out_h, out_w, kw, channels),
+            strides=(s_n, s_h * sh, s_w * sw, s_w * dw, s_c),
+            writeable=False,
+        )
+    out = columns.reshape(-1, kh * kw * channels) @ kernel.reshape(-1, filters)
+    if bias is not None:
+        out += bias
+    return out.reshape(n, out_h, out_w, filters)
+
+
+def pool2d(x, pool_size, strides=None, padding='valid', reducer=np.max):
+    """
+    Pooling 2D (NHWC) máximo o medio.
+
+    Args:
+        x (np.ndarray): Entrada (N, H, W, C)
+        pool_size (tuple): Ventana (ph, pw)
+        strides (tuple): Pasos (por defecto, la ventana)
+        padding (str): 'valid' o 'same'
+        reducer (callable): ``np.max`` o ``np.mean``
+
+    Returns:
+        np.ndarray: Salida (N, H', W', C)
+    """
+    ph, pw = pool_size
+    sh, sw = strides or pool_size
+    if padding == 'same':
+        if reducer is not np.max:
+            raise ValueError("AveragePooling2D con padding 'same' no está soportado")
+        x = _pad_spatial(x, padding, pool_size, (sh, sw), value=-np.inf)
+
+    n, height, width, channels = x.shape
+    if (ph, pw) == (sh, sw):
+        # Ventanas disjuntas: se combinan elemento a elemento las vistas
+        # desplazadas, primero por filas y luego por columnas (mucho más
+        # rápido que reducir sobre ejes no contiguos)
+        combine = np.maximum if reducer is np.max else np.add
+        out_h, out_w = height // ph, width // pw
+        rows = x[:, 0:out_h * ph:ph]
+        for i in range(1, ph):
+            rows = combine(rows, x[:, i:out_h * ph:ph])
+        out = rows[:, :, 0:out_w * pw:pw]
+        for j in range(1, pw):
+            out = combine(out, rows[:, :, j:out_w * pw:pw])
+        if reducer is not np.max:
+            out = out / (ph * pw)
+        return np.ascontiguousarray(out)
+
+    windows = np.lib.stride_tricks.sliding_window_view(x, (ph, pw), axis=(1, 2))
+    return reducer(windows[:, ::sh, ::sw], axis=(-2, -1))
+
+
+def _pair(value):
+    return tuple(value) if isinstance(value, (list, tuple)) else (value, value)
+
+
+class NumpyModel:
+    """
+    Ejecuta un programa de capas sobre batches float32 (N, 64, 64, 3).
+
+    Cuando una Conv2D con activación monótona va seguida de MaxPooling2D,
+    el sesgo y la activación se aplican después del pooling: el resultado
+    es idéntico (el máximo conmuta con sumar una constante y con funciones
+    crecientes) y se procesan 4 veces menos valores. Los batches grandes se
+    procesan por bloques de ``chunk_size`` imágenes para que las
+    activaciones intermedias quepan en la caché de la CPU.
+    """
+
+    def __init__(self, program, weights, chunk_size=16):
+        """
+        Args:
+            program (list): Capas (ver ``build_program``)
+            weights (dict): Arrays de pesos por nombre (en memoria o mapeados)
+            chunk_size (int): Imágenes por bloque en batches grandes
+        """
+        self.program = program
+        self.weights = weights
+        self.chunk_size = chunk_size
+        self._plan = self._fuse(program)
+        first = program[0] if program else {}
+        shape = first.get('batch_shape') or first.get('batch_input_shape')
+        self.input_shape = tuple(shape) if shape else None
+        dense = [step for step in program if step['type'] == 'Dense']
+        self.output_shape = (None, dense[-1]['units']) if dense and 'units' in dense[-1] else None
+
+    @staticmethod
+    def _fuse(program):
+        plan = []
+        steps = [step for step in program if step['type'] not in INFERENCE_NOOP_LAYERS]
+        index = 0
+        while index < len(steps):
+            step = steps[index]
+            following = steps[index + 1] if index + 1 < len(steps) else None
+            if (step['type'] == 'Conv2D'
+                    and (step.get('activation') or 'linear') in MONOTONIC_ACTIVATIONS
+                    and following is not None and following['type'] == 'MaxPooling2D'):
+                plan.append((step, following))
+                index += 2
+            else:
+                plan.append((step, None))
+                index += 1
+        return plan
+
+    def count_params(self):
+        """
+        Returns:
+            int: Número total de parámetros
+        """
+        return int(sum(weight.size for weight in self.weights.values()))
+
+    def predict(self, img_batch, return_embedding=False):
+        """
+        Paso hacia adelante sobre un batch.
+
+        Args:
+            img_batch (np.ndarray): Tensor float32 (N, H, W, C)
+            return_embedding (bool): Retornar también la entrada de la
+                última capa (embedding de la penúltima)
+
+        Returns:
+            np.ndarray | tuple: Salida del modelo (N, unidades) o, con
+            ``return_embedding``, (salida, embeddings (N, dimensión))
+        """
+        x = np.asarray(img_batch, dtype=np.float32)
+        if len(x) > self.chunk_size:
+            chunks = [
+                self.predict(x[start:start + self.chunk_size], return_embedding)
+                for start in range(0, len(x), self.chunk_size)
+            ]
+            if return_embedding:
+                return tuple(np.concatenate(parts) for parts in zip(*chunks))
+            return np.concatenate(chunks)
+        embedding = None
+        for index, (step, pool) in enumerate(self._plan):
+            if return_embedding and index == len(self._plan) - 1:
+                # La última capa no modifica su entrada en el sitio
+                embedding = x
+            x = self._run_layer(step, x, pool)
+        return (x, embedding) if return_embedding else x
+
+    def _run_layer(self, step, x, pool=None):
+        layer_type = step['type']
+        if layer_type in INFERENCE_NOOP_LAYERS:
+            return x
+
+        weights = [self.weights[name] for name in step['weights']]
+        bias = weights[1] if step.get('use_bias', True) and len(weights) > 1 else None
+        if layer_type == 'Conv2D':
+            x = conv2d(
+                x, weights[0], None if pool else bias,
+                strides=_pair(step.get('strides', 1)),
+                padding=step.get('padding', 'valid'),
+                dilation=_pair(step.get('dilation_rate', 1)),
+            )
+            if pool:
+                x = self._run_layer(pool, x)
+                if bias is not None:
+                    x += bias
+        elif layer_type == 'Dense':
+            x = x @ weights[0]
+            if bias is not None:
+                x += bias
+        elif layer_type in ('MaxPooling2D', 'AveragePooling2D'):
+            return pool2d(
+                x, _pair(step['pool_size']),
+                _pair(step['strides']) if step.get('strides') else None,
+                step.get('padding', 'valid'),
+                np.max if layer_type == 'MaxPooling2D' else np.mean,
+            )
+        elif layer_type == 'GlobalAveragePooling2D':
+            return x.mean(axis=(1, 2))
+        elif layer_type == 'GlobalMaxPooling2D':
+            return x.max(axis=(1, 2))
+        elif layer_type == 'Flatten':
+            return x.reshape(len(x), -1)
+        elif layer_type == 'ReLU':
+            return np.maximum(x, 0)
+
+        activation = step.get('activation') or 'linear'
+        if activation == 'relu' and layer_type in ('Conv2D', 'Dense'):
+            # x es un resultado nuevo de esta capa: se modifica en el sitio
+            return np.maximum(x, 0, out=x)
+        try:
+            return ACTIVATIONS[activation](x)
+        except KeyError:
+            raise ValueError(f"Activación no soportada por el motor NumPy: {activation}")
@@ -0,0 +1,254 @@
+"""
+Primera etapa colorimétrica (índice de palidez) antes de la CNN.
+
+Sobre el tensor ya preprocesado (64x64, valores en [0, 1]) se calcula, con
+NumPy y en microsegundos, un índice tipo eritema: la media de
+``log(R / G)`` en los píxeles de la zona pintada (el fondo negro del recorte
+con pincel se excluye). Una conjuntiva pálida tiene menos hemoglobina y
+por tanto menos rojo frente al verde.
+
+El índice no sustituye al modelo: ``calibrate_band`` busca, con los
+resultados guardados en ``ReporteAnemia``, los extremos del índice en los
+que la etiqueta de la CNN es casi constante (coincidencia >= ``min_agreement``
+con al menos ``min_support`` casos). Solo las imágenes que caen en esos
+extremos se resuelven sin la CNN; las de la banda intermedia (dudosa) y las
+de índice indefinido siguen pasando por el modelo. El sentido de cada
+extremo (anemia o no) sale de los datos, no se supone.
+
+Formato de la calibración (JSON, ver ``calibrate_pallor_prescreen``)::
+
+    {
+        "black_level": 24,
+        "low": {"max_index": 0.12, "has_anemia": false, "probability": 0.31,
+                "support": 140, "agreement": 0.99} | null,
+        "high": {"min_index": 0.52, ...} | null,
+        "holdout": {"cases": 80, "coverage": 0.35, "agreement": 0.986},
+        ...
+    }
+"""
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+
+# Evita log(0) en píxeles con un canal a cero
+_EPS = 1.0 / 255
+
+
+def pallor_index(img_batch, black_level=24):
+    """
+    Índice de palidez de un batch de imágenes preprocesadas.
+
+    Args:
+        img_batch (np.ndarray): Tensor float32 (N, H, W, 3) con valores en [0, 1]
+        black_level (int): Valor máximo de canal (0-255) considerado fondo
+
+    Returns:
+        np.ndarray: Vector float64 de N índices (NaN si la zona pintada está vacía)
+    """
+    pixels = np.asarray(img_batch, dtype=np.float32).reshape(len(img_batch), -1, 3)
+    red, green, blue = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+    # np.maximum encadenado: ``max(axis=2)`` sobre un eje de 3 es ~40 veces más lento
+    mask = np.maximum(np.maximum(red, green), blue) > black_level / 255
+    ratio = np.log((red + _EPS) / (green + _EPS))
+    counts = np.count_nonzero(mask, axis=1)
+    sums = np.where(mask, ratio, 0.0).sum(axis=1, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def _tail_length(labels, boundaries_distinct, min_agreement, min_support):
+    """Mayor prefijo de ``labels`` con coincidencia y soporte suficientes."""
+    sizes = np.arange(1, len(labels) + 1)
+    positives = np.cumsum(labels)
+    agreement = np.maximum(positives, sizes - positives) / sizes
+    valid = (agreement >= min_agreement) & (sizes >= min_support) & boundaries_distinct
+    candidates = np.flatnonzero(valid)
+    return int(candidates[-1]) + 1 if candidates.size else 0
+
+
+def _tail_decision(probabilities, threshold):
+    """Etiqueta mayoritaria y probabilidad media de un extremo."""
+    labels = probabilities >= threshold
+    has_anemia = bool(labels.mean() >= 0.5)
+    probability = float(probabilities.mean())
+    # La probabilidad asignada debe dar el mismo diagnóstico que la etiqueta
+    if has_anemia:
+        probability = max(probability, threshold)
+    else:
+        probability = min(probability, float(np.nextafter(threshold, 0)))
+    return {
+        'has_anemia': has_anemia,
+        'probability': probability,
+        'support': int(len(labels)),
+        'agreement': float(np.mean(labels == has_anemia)),
+    }
+
+
+def calibrate_band(indices, cnn_probabilities, threshold=0.5, min_agreement=0.98,
+                   min_support=30, black_level=24):
+    """
+    Calibra los extremos del índice que se resuelven sin la CNN.
+
+    Args:
+        indices (np.ndarray): Índices de palidez de los casos de calibración
+        cnn_probabilities (np.ndarray): Probabilidades de la CNN de esos casos
+        threshold (float): Umbral de decisión de la CNN
+        min_agreement (float): Coincidencia mínima con la CNN en cada extremo
+        min_support (int): Casos mínimos en cada extremo
+        black_level (int): Nivel de negro usado al calcular los índices
+
+    Returns:
+        dict: Calibración (``low`` y ``high`` son None si ningún extremo
+        alcanza la coincidencia pedida)
+    """
+    indices = np.asarray(indices, dtype=np.float64)
+    cnn_probabilities = np.asarray(cnn_probabilities, dtype=np.float64)
+    defined = ~np.isnan(indices)
+    indices, cnn_probabilities = indices[defined], cnn_probabilities[defined]
+    order = np.argsort(indices, kind='stable')
+    indices, cnn_probabilities = indices[order], cnn_probabilities[order]
+    labels = cnn_probabilities >= threshold
+    total = len(indices)
+
+    # Solo se puede cortar entre valores distintos del índice
+    distinct_after = np.append(indices[:-1] < indices[1:], True)
+    low_size = _tail_length(labels, distinct_after, min_agreement, min_support)
+
+    remaining = slice(low_size, total)
+    reversed_indices = indices[remaining][::-1]
+    distinct_before = np.append(reversed_indices[:-1] > reversed_indices[1:], True)
+    high_size = _tail_length(
+        labels[remaining][::-1], distinct_before, min_agreement, min_support
+    )
+
+    calibration = {
+        'black_level': black_level,
+        'threshold': threshold,
+        'min_agreement': min_agreement,
+        'min_support': min_support,
+        'cases': total,
+        'low': None,
+        'high': None,
+    }
+    if low_size:
+        calibration['low'] = {
+            'max_index': float(indices[low_size - 1]),
+            **_tail_decision(cnn_probabilities[:low_size], threshold),
+        }
+    if high_size:
+        calibration['high'] = {
+            'min_index': float(indices[total - high_size]),
+            **_tail_decision(cnn_probabilities[total - high_size:], threshold),
+        }
+    return calibration
+
+
+class PallorPrescreen:
+    """
+    Decide por el índice de palidez los casos claros y cuenta qué etapa
+    resuelve cada imagen.
+    """
+
+    def __init__(self, calibration):
+        """
+        Args:
+            calibration (dict): Resultado de ``calibrate_band`` (con
+                ``holdout`` opcional)
+        """
+        self.calibration = calibration
+        self.black_level = calibration.get('black_level', 24)
+        self.low = calibration.get('low')
+        self.high = calibration.get('high')
+        self.holdout = calibration.get('holdout')
+        self._lock = threading.Lock()
+        self._stats = {'pallor': 0, 'cnn': 0}
+
+    @property
+    def signature(self):
+        """Identificador corto de los cortes (se añade a ``model_version``)."""
+        bounds = json.dumps([self.black_level, self.low, self.high], sort_keys=True)
+        return f"pallor{hashlib.sha256(bounds.encode()).hexdigest()[:8]}"
+
+    def resolve(self, indices):
+        """
+        Probabilidad asignada por la primera etapa, sin contar estadísticas.
+
+        Args:
+            indices (np.ndarray): Vector de índices de palidez
+
+        Returns:
+            np.ndarray: Probabilidades; NaN en los casos que deben ir a la CNN
+        """
+        indices = np.asarray(indices, dtype=np.float64)
+        probabilities = np.full(indices.shape, np.nan)
+        # Las comparaciones con NaN son False: el índice indefinido va a la CNN
+        if self.low is not None:
+            probabilities[indices <= self.low['max_index']] = self.low['probability']
+        if self.high is not None:
+            probabilities[indices >= self.high['min_index']] = self.high['probability']
+        return probabilities
+
+    def decide(self, img_batch):
+        """
+        Calcula el índice de un batch y resuelve los casos claros.
+
+        Args:
+            img_batch (np.ndarray): Tensor float32 (N, 64, 64, 3) preprocesado
+
+        Returns:
+            tuple: (probabilidades con NaN en los casos dudosos, índices)
+        """
+        indices = pallor_index(img_batch, self.black_level)
+        probabilities = self.resolve(indices)
+        decided = int(np.count_nonzero(~np.isnan(probabilities)))
+        with self._lock:
+            self._stats['pallor'] += decided
+            self._stats['cnn'] += len(indices) - decided
+        return probabilities, indices
+
+    def evaluate(self, indices, cnn_probabilities, threshold=0.5):
+        """
+        Mide la coincidencia de la cascada con la CNN sola.
+
+        Args:
+            indices (np.ndarray): Índices de palidez
+            cnn_probabilities (np.ndarray): Probabilidades de la CNN
+            threshold (float): Umbral de decisión
+
+        Returns:
+            dict: cases, decided, coverage (fracción resuelta por el índice)
+            y agreement (coincidencia del diagnóstico en esos casos; None si
+            no se resolvió ninguno)
+        """
+        probabilities = self.resolve(indices)
+        decided = ~np.isnan(probabilities)
+        cases = len(probabilities)
+        count = int(np.count_nonzero(decided))
+        cnn_labels = np.asarray(cnn_probabilities, dtype=np.float64)[decided] >= threshold
+        return {
+            'cases': cases,
+            'decided': count,
+            'coverage': count / cases if cases else 0.0,
+            'agreement': (
+                float(np.mean((probabilities[decided] >= threshold) == cnn_labels))
+                if count else None
+            ),
+        }
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: Imágenes resueltas por cada etapa, cobertura observada y
+            coincidencia con la CNN medida en la calibración
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats['pallor'] + stats['cnn']
+        stats['coverage'] = stats['pallor'] / total if total else 0.0
+        stats['signature'] = self.signature
+        stats['calibrated_agreement'] = (self.holdout or {}).get('agreement')
+        stats['calibrated_coverage'] = (self.holdout or {}).get('coverage')
+        return stats
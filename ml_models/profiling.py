@@ -0,0 +1,147 @@
+"""
+Utilidades de medición de latencia y memoria para el modelo de anemia.
+"""
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def current_rss_kb():
+    """
+    Retorna la memoria residente (RSS) actual del proceso.
+
+    Returns:
+        float | None: RSS en KB, o None si no se puede leer (no Linux)
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_kb():
+    """
+    Retorna el pico de memoria residente del proceso desde su inicio.
+
+    Returns:
+        float | None: Pico de RSS en KB, o None si no se puede leer
+    """
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return float(peak / 1024 if sys.platform == 'darwin' else peak)
+
+
+def memory_usage_kb():
+    """
+    Desglose de la memoria residente del proceso (Linux, /proc/self/smaps_rollup).
+
+    La memoria única (USS) son las páginas que solo usa este proceso: lo que
+    se liberaría al terminarlo. Las páginas compartidas (p. ej. un archivo
+    de pesos mapeado por varios workers) cuentan en ``shared_kb`` y se
+    reparten proporcionalmente en ``pss_kb``.
+
+    Returns:
+        dict: rss_kb, pss_kb, uss_kb y shared_kb (None si no se pueden leer)
+    """
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            for line in smaps:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = float(parts[1])
+    except OSError:
+        return {'rss_kb': None, 'pss_kb': None, 'uss_kb': None, 'shared_kb': None}
+
+    return {
+        'rss_kb': fields.get('Rss'),
+        'pss_kb': fields.get('Pss'),
+        'uss_kb': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0),
+        'shared_kb': fields.get('Shared_Clean', 0.0) + fields.get('Shared_Dirty', 0.0),
+    }
+
+
+def measure_load(backend):
+    """
+    Carga un backend midiendo el tiempo y el incremento de memoria.
+
+    Args:
+        backend (InferenceBackend): Backend sin cargar
+
+    Returns:
+        dict: Tiempo de carga en ms e incremento de RSS en KB
+    """
+    rss_before = current_rss_kb()
+    start = time.perf_counter()
+    backend.load()
+    load_ms = (time.perf_counter() - start) * 1000
+    rss_after = current_rss_kb()
+
+    return {
+        'load_ms': load_ms,
+        'rss_delta_kb': (
+            rss_after - rss_before
+            if rss_before is not None and rss_after is not None else None
+        ),
+    }
+
+
+def summarize_latencies(latencies_ms):
+    """
+    Resume una serie de latencias en percentiles.
+
+    Args:
+        latencies_ms (list): Latencias individuales en milisegundos
+
+    Returns:
+        dict: Media y percentiles p50/p95/p99 en ms
+    """
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    if not values.size:
+        return {'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+    }
+
+
+def measure_latency(predict_fn, sample_batch, repeats=50, warmup=5):
+    """
+    Mide la latencia de predicción de una sola imagen.
+
+    Args:
+        predict_fn (callable): Función que recibe un batch (1, 64, 64, 3)
+        sample_batch (np.ndarray): Imágenes preprocesadas a recorrer
+        repeats (int): Número de invocaciones medidas
+        warmup (int): Invocaciones previas sin medir
+
+    Returns:
+        dict: Resumen de latencias (ver ``summarize_latencies``)
+    """
+    total = len(sample_batch)
+    for i in range(warmup):
+        predict_fn(sample_batch[i % total:i % total + 1])
+
+    latencies = []
+    for i in range(repeats):
+        single = sample_batch[i % total:i % total + 1]
+        start = time.perf_counter()
+        predict_fn(single)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return summarize_latencies(latencies)
@@ -0,0 +1,363 @@
+"""
+Registro de versiones del modelo con intercambio en caliente.
+
+Una nueva versión se construye y se calienta en un hilo en segundo plano
+mientras la versión activa sigue atendiendo solicitudes. Solo cuando está
+lista se sustituye la referencia activa (una asignación, atómica en Python):
+las solicitudes en curso terminan con la versión anterior, que se retira
+tras un periodo de gracia.
+
+Los procesos web (workers de gunicorn/uvicorn) se coordinan mediante un
+directorio compartido:
+    - target.json: versión deseada (ruta del modelo y generación)
+    - workers/<host>-<pid>.json: versión que sirve cada proceso
+"""
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _write_json_atomic(path, data):
+    """Escribe un JSON sin que otro proceso pueda leerlo a medias."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+            json.dump(data, tmp, default=str)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as entry:
+            return json.load(entry)
+    except (OSError, ValueError):
+        return None
+
+
+class ModelVersion:
+    """
+    Versión cargada del modelo: detector listo para usar y sus metadatos.
+    """
+
+    def __init__(self, detector, model_path, warmup=None):
+        """
+        Args:
+            detector: Detector construido (cualquier nivel de la cadena)
+            model_path (str): Ruta del modelo con el que se construyó
+            warmup (dict): Resultado del calentamiento
+        """
+        self.detector = detector
+        self.model_path = model_path
+        self.version = getattr(detector, 'model_version', None) or str(model_path)
+        self.loaded_at = _now_iso()
+        self.warmup = warmup
+
+    def as_dict(self):
+        return {
+            'version': self.version,
+            'model_path': self.model_path,
+            'loaded_at': self.loaded_at,
+            'warmup': self.warmup,
+        }
+
+
+class ModelRegistry:
+    """
+    Mantiene la versión activa del detector y la sustituye sin bloquear
+    las solicitudes.
+    """
+
+    def __init__(self, builder, warmup=None, retire=None, status_dir=None,
+                 sync_interval=5.0, retire_grace=30.0):
+        """
+        Args:
+            builder (callable): ``builder(model_path)`` crea y carga un
+                detector (``model_path`` None = modelo configurado)
+            warmup (callable): ``warmup(detector)`` ejecuta inferencias de
+                calentamiento; debe lanzar una excepción si el detector no
+                es apto. Retorna un dict con métricas
+            retire (callable): ``retire(detector)`` libera una versión
+                sustituida (detener hilos, cerrar conexiones)
+            status_dir (str | Path): Directorio compartido entre procesos
+                (None = sin coordinación)
+            sync_interval (float): Segundos entre comprobaciones de la
+                versión deseada
+            retire_grace (float): Segundos que se conserva la versión
+                anterior para las solicitudes en curso
+        """
+        self._builder = builder
+        self._warmup = warmup
+        self._retire = retire
+        self.status_dir = Path(status_dir) if status_dir else None
+        self.sync_interval = sync_interval
+        self.retire_grace = retire_grace
+
+        self._active = None
+        self._load_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._applied_generation = None
+        self._next_sync = 0.0
+        self._last_swap = None
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+
+    # ------------------------------------------------------------------
+    # Versión activa
+    # ------------------------------------------------------------------
+
+    def get_detector(self):
+        """
+        Retorna el detector de la versión activa, cargándolo si es necesario.
+
+        Returns:
+            Detector de la versión activa
+        """
+        active = self._active
+        if active is None:
+            with self._load_lock:
+                if self._active is None:
+                    target = self.read_target()
+                    self._active = self._load_version(
+                        target['model_path'] if target else None
+                    )
+                    if target:
+                        self._applied_generation = target['generation']
+                    self._next_sync = time.monotonic() + self.sync_interval
+                    self.write_worker_status()
+                active = self._active
+        else:
+            self.sync()
+        return active.detector
+
+    def is_loaded(self):
+        return self._active is not None
+
+    @property
+    def active_version(self):
+        """ModelVersion activa (None si aún no se ha cargado)."""
+        return self._active
+
+    def _load_version(self, model_path):
+        detector = self._builder(model_path)
+        try:
+            warmup = self._warmup(detector) if self._warmup else None
+        except Exception:
+            if self._retire:
+                self._retire(detector)
+            raise
+        return ModelVersion(detector, model_path, warmup)
+
+    # ------------------------------------------------------------------
+    # Intercambio
+    # ------------------------------------------------------------------
+
+    def swap(self, model_path=None, wait=False, generation=None):
+        """
+        Carga y calienta una nueva versión en segundo plano y la activa.
+
+        Args:
+            model_path (str): Ruta del nuevo modelo (None = modelo configurado)
+            wait (bool): Esperar a que termine el intercambio
+            generation (int): Generación del objetivo compartido que se aplica
+
+        Returns:
+            bool: False si ya había un intercambio en curso
+        """
+        if not self._swap_lock.acquire(blocking=False):
+            return False
+
+        self._last_swap = {
+            'state': 'loading',
+            'model_path': model_path,
+            'generation': generation,
+            'started_at': _now_iso(),
+        }
+        self.write_worker_status()
+
+        thread = threading.Thread(
+            target=self._run_swap, args=(model_path, generation),
+            name='anemia-model-swap', daemon=True,
+        )
+        thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def _run_swap(self, model_path, generation):
+        try:
+            print(f"🔄 Cargando nueva versión del modelo en segundo plano ({model_path or 'configurado'})...")
+            start = time.perf_counter()
+            candidate = self._load_version(model_path)
+        except Exception as e:
+            print(f"❌ Intercambio de modelo cancelado, se mantiene la versión activa: {e}")
+            self._last_swap.update(state='failed', error=str(e), finished_at=_now_iso())
+        else:
+            previous, self._active = self._active, candidate
+            self._last_swap.update(
+                state='completed',
+                version=candidate.version,
+                previous_version=previous.version if previous else None,
+                load_ms=(time.perf_counter() - start) * 1000,
+                finished_at=_now_iso(),
+            )
+            print(f"✅ Modelo intercambiado: {candidate.version}")
+            if previous is not None and self._retire:
+                self._schedule_retire(previous.detector)
+        finally:
+            if generation is not None:
+                # También si falló: no reintentar en bucle el mismo objetivo
+                self._applied_generation = generation
+            self.write_worker_status()
+            self._swap_lock.release()
+
+    def _schedule_retire(self, detector):
+        timer = threading.Timer(self.retire_grace, self._retire, args=(detector,))
+        timer.daemon = True
+        timer.start()
+
+    def is_swapping(self):
+        return self._swap_lock.locked()
+
+    # ------------------------------------------------------------------
+    # Coordinación entre procesos
+    # ------------------------------------------------------------------
+
+    @property
+    def target_path(self):
+        return self.status_dir / 'target.json'
+
+    @property
+    def workers_dir(self):
+        return self.status_dir / 'workers'
+
+    def read_target(self):
+        """
+        Returns:
+            dict | None: Versión deseada publicada (model_path, generation)
+        """
+        if self.status_dir is None:
+            return None
+        return _read_json(self.target_path)
+
+    def publish(self, model_path):
+        """
+        Publica la versión deseada para todos los procesos.
+
+        Cada proceso la detecta en su siguiente comprobación y la carga en
+        segundo plano.
+
+        Args:
+            model_path (str): Ruta del modelo a servir
+
+        Returns:
+            dict: Objetivo publicado
+        """
+        if self.status_dir is None:
+            raise ValueError("El registro no tiene directorio compartido configurado")
+        target = {
+            'model_path': str(model_path),
+            'generation': time.time_ns(),
+            'requested_at': _now_iso(),
+        }
+        _write_json_atomic(self.target_path, target)
+        return target
+
+    def sync(self, force=False):
+        """
+        Inicia un intercambio si se publicó una versión deseada nueva.
+
+        Args:
+            force (bool): Comprobar aunque no haya pasado ``sync_interval``
+        """
+        if self.status_dir is None or self._active is None:
+            return
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        self._next_sync = now + self.sync_interval
+
+        target = self.read_target()
+        if target and target['generation'] != self._applied_generation:
+            if self.swap(target['model_path'], generation=target['generation']):
+                return
+        # Latido: la marca de tiempo del estado indica que el proceso vive
+        self.write_worker_status()
+
+    def get_status(self):
+        """
+        Returns:
+            dict: Versión activa, último intercambio y generación aplicada
+                de este proceso
+        """
+        active = self._active
+        return {
+            'worker': self.worker_id,
+            'pid': os.getpid(),
+            'host': socket.gethostname(),
+            'active': active.as_dict() if active else None,
+            'applied_generation': self._applied_generation,
+            'last_swap': dict(self._last_swap) if self._last_swap else None,
+            'updated_at': _now_iso(),
+        }
+
+    def write_worker_status(self):
+        if self.status_dir is None:
+            return
+        try:
+            _write_json_atomic(
+                self.workers_dir / f"{self.worker_id}.json", self.get_status()
+            )
+        except OSError as e:
+            print(f"⚠️  No se pudo escribir el estado del worker: {e}")
+
+    def read_workers(self):
+        """
+        Estado publicado por cada proceso; descarta los de procesos
+        terminados en esta misma máquina.
+
+        Returns:
+            list: Estados ordenados por identificador de worker
+        """
+        if self.status_dir is None or not self.workers_dir.is_dir():
+            return []
+
+        host = socket.gethostname()
+        workers = []
+        for path in sorted(self.workers_dir.glob('*.json')):
+            status = _read_json(path)
+            if status is None:
+                continue
+            if status.get('host') == host and not _pid_alive(status.get('pid')):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+                continue
+            workers.append(status)
+        return workers
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,106 @@
+"""
+Perfil de ejecución en CPU generado por ``python manage.py autotune_anemia_runtime``.
+
+El perfil (JSON) guarda la configuración medida como la mejor en la máquina
+actual:
+
+    - intra_op_threads / inter_op_threads: hilos del runtime por proceso
+    - batch_max_size: tamaño máximo del micro-batch
+    - replicas: procesos con el modelo cargado (workers web o del pool)
+
+Los ajustes explícitos de settings (valor distinto de 0) tienen prioridad;
+el perfil solo sustituye a los valores por defecto.
+"""
+import json
+import os
+from pathlib import Path
+
+
+def usable_cpu_count():
+    """
+    Núcleos que puede usar este proceso (respeta la afinidad de CPU).
+
+    Returns:
+        int: Número de núcleos
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_runtime_profile_path():
+    """
+    Returns:
+        Path | None: Ruta configurada en ANEMIA_RUNTIME_PROFILE (None = desactivado)
+    """
+    from django.conf import settings
+
+    path = getattr(settings, "ANEMIA_RUNTIME_PROFILE", "")
+    return Path(path) if path else None
+
+
+def load_runtime_profile(path=None):
+    """
+    Lee el perfil de ejecución.
+
+    Args:
+        path (str | Path): Ruta del perfil (None = ANEMIA_RUNTIME_PROFILE)
+
+    Returns:
+        dict | None: Perfil, o None si no existe o no es válido
+    """
+    path = Path(path) if path else get_runtime_profile_path()
+    if path is None or not path.exists():
+        return None
+    try:
+        profile = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Perfil de ejecución ilegible en {path}: {e}")
+        return None
+
+    cpus = usable_cpu_count()
+    if profile.get("usable_cpus") not in (None, cpus):
+        print(f"⚠️  El perfil de ejecución {path} se generó con {profile['usable_cpus']} "
+              f"núcleos y este proceso dispone de {cpus}: vuelva a ejecutar "
+              "autotune_anemia_runtime")
+    return profile
+
+
+def save_runtime_profile(profile, path):
+    """
+    Guarda el perfil de ejecución.
+
+    Args:
+        profile (dict): Perfil a guardar
+        path (str | Path): Ruta de destino
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(profile, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def get_runtime_value(explicit, key, default=None, profile=None, backend=None):
+    """
+    Resuelve un ajuste: valor explícito, perfil de ejecución o por defecto.
+
+    Args:
+        explicit: Valor de settings (0/None = no definido)
+        key (str): Clave del perfil
+        default: Valor si no hay ajuste ni perfil
+        profile (dict): Perfil ya cargado (None = leerlo)
+        backend (str): Si se indica, el perfil solo se usa si se generó
+            para este backend
+
+    Returns:
+        Valor resuelto
+    """
+    if explicit:
+        return explicit
+    if profile is None:
+        profile = load_runtime_profile() or {}
+    if backend is not None and profile.get("backend") != backend:
+        return default
+    return profile.get(key) or default
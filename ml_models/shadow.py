@@ -0,0 +1,208 @@
+"""
+Evaluación en sombra de un modelo candidato.
+
+Una fracción ``sample_rate`` de las imágenes que sirve el modelo principal
+se vuelve a evaluar con el modelo candidato fuera del camino de la
+respuesta:
+
+    - ``submit`` solo sortea la muestra y encola el trabajo sin bloquear;
+      si la cola está llena el trabajo se descarta.
+    - Un único hilo en segundo plano evalúa los trabajos de uno en uno con
+      el candidato (cargado al arrancar con ``preload`` o, si no, con el
+      primer trabajo). Mientras el camino principal tiene
+      inferencias en curso (``is_busy``) el hilo espera; si sigue ocupado
+      tras ``max_defer`` segundos el trabajo se descarta en lugar de
+      competir por los núcleos con las solicitudes.
+    - La comparación (coincidencia del diagnóstico, diferencia de
+      probabilidades y latencias) se entrega a ``callback`` para guardarla
+      (p. ej. ``EvaluacionSombra.registrar``).
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.db import close_old_connections
+
+
+class ShadowEvaluator:
+    """
+    Compara en segundo plano el modelo principal con un candidato.
+    """
+
+    def __init__(self, candidate_factory, sample_rate=0.1, max_pending=32,
+                 is_busy=None, max_defer=2.0):
+        """
+        Args:
+            candidate_factory (callable): Función sin argumentos que crea el
+                detector candidato; se invoca en el hilo de sombra
+            sample_rate (float): Fracción de solicitudes evaluadas (0 a 1)
+            max_pending (int): Trabajos encolados como máximo
+            is_busy (callable): Retorna True mientras el modelo principal
+                tiene inferencias en curso (None = no esperar)
+            max_defer (float): Segundos máximos de espera a que el camino
+                principal quede libre antes de descartar el trabajo
+        """
+        self.candidate_factory = candidate_factory
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.is_busy = is_busy
+        self.max_defer = max_defer
+        self._candidate = None
+        self._candidate_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='anemia-shadow')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            'sampled': 0,
+            'evaluated': 0,
+            'dropped_queue_full': 0,
+            'dropped_busy': 0,
+            'failed': 0,
+            'agreements': 0,
+            'abs_delta_sum': 0.0,
+        }
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def submit(self, image, primary_result, primary_version=None, primary_latency_ms=None,
+               callback=None, context=None):
+        """
+        Encola la evaluación en sombra de una imagen ya evaluada (sin bloquear).
+
+        Args:
+            image: Bytes (u otra entrada de ``predict``) de la imagen
+            primary_result (dict): Resultado del modelo principal
+            primary_version (str): Versión del modelo principal
+            primary_latency_ms (float): Latencia observada del modelo principal
+            callback (callable): ``callback(comparison)`` con la comparación;
+                se invoca en el hilo de sombra
+            context (dict): Datos adicionales copiados en la comparación
+
+        Returns:
+            bool: True si la imagen entró en la muestra y se encoló
+        """
+        if random.random() >= self.sample_rate:
+            return False
+        self._count('sampled')
+        if not self._slots.acquire(blocking=False):
+            self._count('dropped_queue_full')
+            return False
+
+        future = self._executor.submit(
+            self._evaluate, image, primary_result, primary_version,
+            primary_latency_ms, callback, context or {},
+        )
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._release)
+        return True
+
+    def _release(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    def preload(self):
+        """
+        Crea y carga el detector candidato en el hilo actual (al arrancar el
+        proceso, para no cargarlo mientras se atienden solicitudes).
+
+        Returns:
+            AnemiaDetector: Detector candidato
+        """
+        with self._candidate_lock:
+            if self._candidate is None:
+                candidate = self.candidate_factory()
+                if candidate.model is None:
+                    candidate.load_model()
+                self._candidate = candidate
+        return self._candidate
+
+    def _wait_until_idle(self):
+        if self.is_busy is None:
+            return True
+        deadline = time.monotonic() + self.max_defer
+        while self.is_busy():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _evaluate(self, image, primary_result, primary_version, primary_latency_ms,
+                  callback, context):
+        try:
+            if not self._wait_until_idle():
+                self._count('dropped_busy')
+                return None
+            candidate = self.preload()
+
+            start = time.perf_counter()
+            candidate_result = candidate.predict(image)
+            candidate_latency_ms = (time.perf_counter() - start) * 1000
+
+            comparison = {
+                **context,
+                'primary_version': primary_version,
+                'candidate_version': candidate.model_version,
+                'primary_probability': primary_result['probability'],
+                'candidate_probability': candidate_result['probability'],
+                'delta': candidate_result['probability'] - primary_result['probability'],
+                'agree': candidate_result['has_anemia'] == primary_result['has_anemia'],
+                'primary_latency_ms': primary_latency_ms,
+                'candidate_latency_ms': candidate_latency_ms,
+            }
+            with self._lock:
+                self._stats['evaluated'] += 1
+                self._stats['agreements'] += comparison['agree']
+                self._stats['abs_delta_sum'] += abs(comparison['delta'])
+            if callback is not None:
+                # El hilo de sombra no pasa por el ciclo de request de Django:
+                # renovar aquí las conexiones caducadas o rotas
+                close_old_connections()
+                try:
+                    callback(comparison)
+                finally:
+                    close_old_connections()
+            return comparison
+        except Exception as e:
+            self._count('failed')
+            print(f"⚠️  Error en la evaluación en sombra: {type(e).__name__}: {e}")
+            return None
+
+    def flush(self, timeout=None):
+        """
+        Espera a que terminen los trabajos encolados.
+
+        Args:
+            timeout (float): Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            bool: True si no quedan trabajos pendientes
+        """
+        with self._lock:
+            pending = list(self._pending)
+        _, not_done = wait(pending, timeout=timeout)
+        return not not_done
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: Muestras, evaluaciones, descartes, tasa de coincidencia y
+            diferencia absoluta media de probabilidades
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        evaluated = stats['evaluated']
+        stats['agreement_rate'] = stats.pop('agreements') / evaluated if evaluated else None
+        stats['mean_abs_delta'] = stats.pop('abs_delta_sum') / evaluated if evaluated else None
+        stats['sample_rate'] = self.sample_rate
+        return stats
+
+    def shutdown(self, wait=True):
+        """Detiene el hilo de sombra (descarta los trabajos encolados si ``wait`` es False)."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,134 @@
+"""
+Artefacto de pesos mapeable en memoria, compartido entre procesos.
+
+Formato del archivo (``<modelo>.weights``):
+
+    - 8 bytes: firma ``ANEMIAW1``
+    - 8 bytes: longitud de la cabecera JSON (uint64 little-endian)
+    - 8 bytes: offset de la sección de datos, múltiplo del tamaño de página
+    - Cabecera JSON: modelo de origen y su hash, programa de capas (ver
+      ``ml_models.numpy_engine``) y, por cada peso, dtype, forma y offset
+    - Pesos float32 alineados a 64 bytes (offsets relativos a la sección de datos)
+
+Al abrirlo, los pesos son vistas de solo lectura sobre un ``mmap`` del
+archivo: no se copian a memoria privada, de modo que todos los procesos del
+nodo que lo abren comparten las mismas páginas físicas de la caché de
+páginas del sistema operativo.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+
+MAGIC = b'ANEMIAW1'
+FORMAT_VERSION = 1
+PAGE_SIZE = mmap.PAGESIZE
+TENSOR_ALIGNMENT = 64
+
+_HEADER_PREFIX = struct.Struct('<8sQQ')
+
+
+def _align(offset, alignment):
+    return -(-offset // alignment) * alignment
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_shared_weights(h5_path, output_path):
+    """
+    Genera el artefacto de pesos mapeable a partir de un modelo Keras .h5.
+
+    Solo usa h5py: no necesita importar TensorFlow.
+
+    Args:
+        h5_path (str | Path): Ruta al modelo .h5
+        output_path (str | Path): Ruta del archivo .weights
+
+    Returns:
+        Path: Ruta del archivo generado
+    """
+    from ml_models.numpy_engine import read_h5_model
+
+    h5_path = Path(h5_path)
+    output_path = Path(output_path)
+    program, weights = read_h5_model(h5_path)
+
+    # Offsets relativos al inicio de la sección de datos
+    tensors = {}
+    offset = 0
+    for name, weight in weights.items():
+        offset = _align(offset, TENSOR_ALIGNMENT)
+        tensors[name] = {'dtype': '<f4', 'shape': list(weight.shape), 'offset': offset}
+        offset += weight.nbytes
+
+    header = json.dumps({
+        'format': FORMAT_VERSION,
+        'source': h5_path.name,
+        'source_sha256': _file_sha256(h5_path),
+        'program': program,
+        'tensors': tensors,
+    }).encode()
+    data_start = _align(_HEADER_PREFIX.size + len(header), PAGE_SIZE)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    with open(tmp_path, 'wb') as artifact:
+        artifact.write(_HEADER_PREFIX.pack(MAGIC, len(header), data_start))
+        artifact.write(header)
+        for name, weight in weights.items():
+            artifact.seek(data_start + tensors[name]['offset'])
+            artifact.write(np.ascontiguousarray(weight, dtype='<f4').tobytes())
+        artifact.truncate(data_start + offset)
+    # Reemplazo atómico: los procesos que ya mapearon el archivo anterior
+    # conservan sus páginas hasta cerrarlo
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def open_shared_weights(path):
+    """
+    Mapea el artefacto de pesos en memoria (solo lectura).
+
+    Args:
+        path (str | Path): Ruta del archivo .weights
+
+    Returns:
+        tuple: (cabecera, dict de vistas numpy de solo lectura por nombre)
+
+    Raises:
+        ValueError: Si el archivo no es un artefacto de pesos válido
+    """
+    with open(path, 'rb') as artifact:
+        mapped = mmap.mmap(artifact.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, header_size, data_start = _HEADER_PREFIX.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        mapped.close()
+        raise ValueError(f"{path} no es un artefacto de pesos compartidos")
+    header = json.loads(mapped[_HEADER_PREFIX.size:_HEADER_PREFIX.size + header_size])
+    if header.get('format') != FORMAT_VERSION:
+        mapped.close()
+        raise ValueError(
+            f"Versión de formato no soportada en {path}: {header.get('format')}"
+        )
+
+    # Cada vista mantiene vivo el mmap a través de su atributo ``base``
+    weights = {
+        name: np.frombuffer(
+            mapped, dtype=np.dtype(tensor['dtype']),
+            count=int(np.prod(tensor['shape'])), offset=data_start + tensor['offset'],
+        ).reshape(tensor['shape'])
+        for name, tensor in header['tensors'].items()
+    }
+    return header, weights
@@ -0,0 +1,607 @@
+"""
+Pool de procesos de inferencia con intercambio de imágenes por memoria compartida.
+
+En lugar de que cada proceso web (WSGI/ASGI) cargue su propia copia del
+modelo, un servidor independiente mantiene un número fijo de procesos que
+poseen el modelo. Los procesos web usan ``InferencePoolClient``:
+
+    1. Preprocesan la imagen directamente en un segmento de memoria
+       compartida propio (``multiprocessing.shared_memory``).
+    2. Envían solo el nombre del segmento y el número de imágenes al
+       servidor por un socket Unix.
+    3. El servidor reparte la tarea a sus procesos a través de una cola; el
+       proceso que la toma lee el tensor del segmento sin copiarlo por el
+       socket, ejecuta el modelo y devuelve las probabilidades por la cola
+       de resultados.
+
+Arranque del servidor:
+    python manage.py run_inference_pool --workers 2
+"""
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from ml_models.anemia_detector import AnemiaDetector
+
+
+# Bytes por imagen preprocesada (64 x 64 x 3 float32)
+IMAGE_SHAPE = (64, 64, 3)
+IMAGE_NBYTES = int(np.prod(IMAGE_SHAPE)) * np.dtype(np.float32).itemsize
+
+
+def _attach_shared_memory(name):
+    """
+    Se conecta a un segmento existente sin que este proceso lo gestione.
+
+    El segmento pertenece al cliente que lo creó; si el proceso del pool lo
+    registrara en su ``resource_tracker``, lo eliminaría al terminar.
+    """
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 no admite ``track``: anular el registro manualmente
+        from multiprocessing import resource_tracker
+
+        shm = SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _worker_main(worker_id, task_queue, result_queue, detector_kwargs, max_batch_size):
+    """
+    Bucle de un proceso del pool: carga el modelo y atiende tareas.
+
+    Las tareas pendientes en la cola se agrupan (hasta ``max_batch_size``
+    imágenes) en una sola pasada del modelo.
+    """
+    try:
+        detector = AnemiaDetector(**detector_kwargs)
+        detector.load_model()
+    except Exception as e:
+        result_queue.put(('failed', worker_id, str(e)))
+        return
+
+    result_queue.put(('ready', worker_id, os.getpid()))
+
+    stop = False
+    while not stop:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        tasks = [task]
+        pending_images = task[2]
+        while pending_images < max_batch_size:
+            try:
+                task = task_queue.get_nowait()
+            except queue.Empty:
+                break
+            if task is None:
+                stop = True
+                break
+            tasks.append(task)
+            pending_images += task[2]
+
+        _run_tasks(detector, tasks, result_queue)
+
+
+def _run_tasks(detector, tasks, result_queue):
+    """
+    Ejecuta un grupo de tareas en una sola pasada y publica los resultados.
+
+    Args:
+        detector (AnemiaDetector): Detector con el modelo cargado
+        tasks (list): Tuplas (request_id, nombre_segmento, num_imagenes)
+        result_queue: Cola de resultados hacia el servidor
+    """
+    segments = []
+    views = []
+    valid_tasks = []
+    for request_id, shm_name, count in tasks:
+        try:
+            shm = _attach_shared_memory(shm_name)
+        except Exception as e:
+            result_queue.put(('error', request_id, f"Memoria compartida no disponible: {e}"))
+            continue
+        segments.append(shm)
+        views.append(np.ndarray((count, *IMAGE_SHAPE), dtype=np.float32, buffer=shm.buf))
+        valid_tasks.append((request_id, count))
+
+    batch = None
+    try:
+        if valid_tasks:
+            batch = np.concatenate(views, axis=0) if len(views) > 1 else views[0]
+            # Salida cruda: vector o, en un ensemble, una columna por modelo
+            scores = detector.predict_scores(batch)
+
+            offset = 0
+            for request_id, count in valid_tasks:
+                result_queue.put(
+                    ('result', request_id, scores[offset:offset + count].copy())
+                )
+                offset += count
+    except Exception as e:
+        for request_id, _ in valid_tasks:
+            result_queue.put(('error', request_id, str(e)))
+    finally:
+        # Liberar las vistas antes de cerrar los segmentos
+        del batch, views
+        for shm in segments:
+            shm.close()
+
+
+class InferencePoolServer:
+    """
+    Servidor que mantiene los procesos dueños del modelo.
+    """
+
+    def __init__(self, address, authkey, num_workers=2, detector_kwargs=None,
+                 max_batch_size=32):
+        """
+        Inicializa el servidor.
+
+        Args:
+            address (str): Ruta del socket Unix en el que escuchar
+            authkey (bytes): Clave compartida con los clientes
+            num_workers (int): Número de procesos con el modelo cargado
+            detector_kwargs (dict): Argumentos para crear el AnemiaDetector
+            max_batch_size (int): Imágenes máximas por pasada en cada proceso
+        """
+        if num_workers < 1:
+            raise ValueError("El pool necesita al menos un proceso de inferencia")
+
+        self.address = address
+        self.authkey = authkey
+        self.num_workers = num_workers
+        self.detector_kwargs = detector_kwargs or {}
+        self.max_batch_size = max_batch_size
+
+        # 'spawn': TensorFlow no es seguro tras fork
+        self._context = multiprocessing.get_context('spawn')
+        self._task_queue = self._context.Queue()
+        self._result_queue = self._context.Queue()
+        self._workers = {}
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._listener = None
+        self._stopped = threading.Event()
+
+    def start(self, ready_timeout=300):
+        """
+        Lanza los procesos de inferencia y espera a que carguen el modelo.
+
+        Args:
+            ready_timeout (float): Segundos máximos de espera por proceso
+        """
+        for worker_id in range(self.num_workers):
+            self._spawn_worker(worker_id)
+
+        ready = 0
+        while ready < self.num_workers:
+            kind, worker_id, payload = self._result_queue.get(timeout=ready_timeout)
+            if kind == 'failed':
+                self.stop()
+                raise RuntimeError(
+                    f"El proceso de inferencia {worker_id} no pudo cargar el modelo: {payload}"
+                )
+            if kind == 'ready':
+                ready += 1
+                print(f"   Proceso de inferencia {worker_id} listo (PID {payload})")
+
+        threading.Thread(
+            target=self._dispatch_results, name='anemia-pool-results', daemon=True
+        ).start()
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self._listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+
+    def serve_forever(self):
+        """Acepta conexiones de clientes hasta que se llame a ``stop``."""
+        while not self._stopped.is_set():
+            try:
+                connection = self._listener.accept()
+            except (OSError, multiprocessing.AuthenticationError):
+                if self._stopped.is_set():
+                    break
+                continue
+            threading.Thread(
+                target=self._handle_client, args=(connection,),
+                name='anemia-pool-client', daemon=True,
+            ).start()
+
+    def stop(self):
+        """Detiene los procesos de inferencia y cierra el socket."""
+        self._stopped.set()
+        for _ in self._workers:
+            self._task_queue.put(None)
+        for process in self._workers.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._workers.clear()
+
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def check_workers(self):
+        """
+        Relanza los procesos de inferencia que hayan terminado inesperadamente.
+
+        Returns:
+            int: Número de procesos relanzados
+        """
+        restarted = 0
+        for worker_id, process in list(self._workers.items()):
+            if not process.is_alive() and not self._stopped.is_set():
+                print(f"⚠️  Proceso de inferencia {worker_id} terminado, relanzando...")
+                self._spawn_worker(worker_id)
+                restarted += 1
+        return restarted
+
+    def _spawn_worker(self, worker_id):
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                worker_id, self._task_queue, self._result_queue,
+                self.detector_kwargs, self.max_batch_size,
+            ),
+            name=f'anemia-inference-{worker_id}',
+            daemon=True,
+        )
+        process.start()
+        self._workers[worker_id] = process
+
+    def _dispatch_results(self):
+        """Entrega cada resultado de la cola al hilo que espera la solicitud."""
+        while not self._stopped.is_set():
+            try:
+                kind, request_id, payload = self._result_queue.get(timeout=1)
+            except queue.Empty:
+                self.check_workers()
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind not in ('result', 'error'):
+                continue
+            with self._pending_lock:
+                waiter = self._pending.pop(request_id, None)
+            if waiter is not None:
+                waiter['response'] = (
+                    ('ok', payload) if kind == 'result' else ('error', payload)
+                )
+                waiter['event'].set()
+
+    def _handle_client(self, connection):
+        """Atiende las solicitudes de un cliente hasta que cierre la conexión."""
+        with connection:
+            while True:
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    return
+
+                command = message[0]
+                if command == 'predict':
+                    _, shm_name, count = message
+                    response = self._submit(shm_name, count)
+                elif command == 'status':
+                    response = ('ok', {
+                        'workers': {
+                            worker_id: process.pid
+                            for worker_id, process in self._workers.items()
+                            if process.is_alive()
+                        },
+                        'pending_requests': len(self._pending),
+                        'detector': self.detector_kwargs,
+                    })
+                else:
+                    response = ('error', f"Comando desconocido: {command}")
+
+                try:
+                    connection.send(response)
+                except (EOFError, OSError):
+                    return
+
+    def _submit(self, shm_name, count, timeout=60):
+        """Encola una tarea y espera su resultado."""
+        request_id = next(self._request_ids)
+        waiter = {'event': threading.Event(), 'response': None}
+        with self._pending_lock:
+            self._pending[request_id] = waiter
+
+        self._task_queue.put((request_id, shm_name, count))
+
+        if not waiter['event'].wait(timeout):
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            return ('error', "Tiempo de espera agotado en el pool de inferencia")
+        return waiter['response']
+
+
+class InferencePoolClient:
+    """
+    Proxy con la interfaz del AnemiaDetector que delega la inferencia al pool.
+
+    El preprocesamiento se hace en el proceso web, directamente sobre un
+    segmento de memoria compartida por hilo; el modelo nunca se carga aquí.
+    """
+
+    def __init__(self, address, authkey, detector=None, timeout=60):
+        """
+        Inicializa el cliente.
+
+        Args:
+            address (str): Ruta del socket Unix del servidor
+            authkey (bytes): Clave compartida con el servidor
+            detector (AnemiaDetector): Detector sin cargar, usado para el
+                preprocesamiento y la construcción de resultados
+            timeout (float): Segundos máximos de espera por respuesta
+        """
+        self.address = address
+        self.authkey = authkey
+        self.detector = detector or AnemiaDetector()
+        self.timeout = timeout
+        self._local = threading.local()
+        self._segments = []
+        self._segments_lock = threading.Lock()
+        self._pid = os.getpid()
+        atexit.register(self.close)
+
+    def __getattr__(self, name):
+        # threshold, build_result, set_threshold... se resuelven en el detector
+        detector = self.__dict__.get('detector')
+        if detector is None:
+            raise AttributeError(name)
+        return getattr(detector, name)
+
+    @property
+    def model(self):
+        """El modelo vive en los procesos del pool, nunca en el cliente."""
+        return None
+
+    def load_model(self):
+        """Verifica que el pool esté disponible (el modelo ya está cargado allí)."""
+        self.get_pool_status()
+
+    def predict(self, image_path_or_array, return_probability=False):
+        """
+        Realiza una predicción sobre una imagen usando el pool.
+
+        Args:
+            image_path_or_array: Ruta a la imagen o array numpy
+            return_probability (bool): Se mantiene por compatibilidad con el detector
+
+        Returns:
+            dict: Resultado de la predicción con información detallada
+        """
+        shm, buffer = self._get_buffer(1)
+        self.detector.preprocess_into(image_path_or_array, buffer[0])
+        early = self.detector.prescreen(buffer[:1])
+        if early:
+            return early[0]
+        probabilities, members = self.detector.combine_scores(self._request(shm, 1))
+        probability = float(probabilities[0])
+        members = None if members is None else members[0]
+        if not self.detector.tta_band:
+            return self.detector.build_result(probability, members)
+
+        # Las vistas de TTA reutilizan el segmento del hilo: copiar antes la imagen
+        img_array = self.detector.acquire_input(1)
+        try:
+            img_array[:] = buffer[:1]
+            return self.detector.finish_prediction(
+                img_array, probability, self.predict_preprocessed, members=members
+            )
+        finally:
+            self.detector.release_input(img_array)
+
+    def predict_preprocessed(self, img_batch):
+        """
+        Ejecuta el modelo del pool sobre un batch ya preprocesado.
+
+        Args:
+            img_batch (np.ndarray): Tensor float32 de forma (N, 64, 64, 3)
+
+        Returns:
+            np.ndarray: Vector de N probabilidades de anemia
+        """
+        count = len(img_batch)
+        shm, buffer = self._get_buffer(count)
+        buffer[:count] = img_batch
+        return self.detector.combine_scores(self._request(shm, count))[0]
+
+    def predict_batch(self, image_paths, batch_size=128):
+        """
+        Realiza predicciones sobre múltiples imágenes usando el pool.
+
+        Args:
+            image_paths (list): Lista de rutas de imágenes
+            batch_size (int): Número de imágenes por solicitud al pool
+
+        Returns:
+            list: Lista de resultados de predicciones
+        """
+        image_paths = list(image_paths)
+        probabilities = np.empty(len(image_paths), dtype=np.float64)
+        members = None
+        early = {}
+
+        for start in range(0, len(image_paths), batch_size):
+            chunk = image_paths[start:start + batch_size]
+            shm, buffer = self._get_buffer(len(chunk))
+            for i, image_path in enumerate(chunk):
+                self.detector.preprocess_into(image_path, buffer[i])
+            # Al pool solo se envían, compactadas al inicio del segmento,
+            # las imágenes dudosas para el índice de palidez
+            chunk_early = self.detector.prescreen(buffer[:len(chunk)])
+            pending = [i for i in range(len(chunk)) if i not in chunk_early]
+            for i, result in chunk_early.items():
+                early[start + i] = result
+                probabilities[start + i] = result['probability']
+            if not pending:
+                continue
+            if len(pending) < len(chunk):
+                buffer[:len(pending)] = buffer[pending]
+            rows = [start + i for i in pending]
+            chunk_probabilities, chunk_members = self.detector.combine_scores(
+                self._request(shm, len(pending))
+            )
+            probabilities[rows] = chunk_probabilities
+            if chunk_members is not None:
+                if members is None:
+                    members = np.full((len(image_paths), chunk_members.shape[1]), np.nan)
+                members[rows] = chunk_members
+
+        results = self.detector.build_results(probabilities, members)
+        if self.detector.tta_band:
+            self._apply_tta(image_paths, probabilities, results, skip=early, members=members)
+        for i, result in early.items():
+            results[i] = result
+        for result, img_path in zip(results, image_paths):
+            result['image_path'] = str(img_path)
+        return results
+
+    def _apply_tta(self, image_paths, probabilities, results, skip=(), members=None):
+        """Re-evalúa con TTA las imágenes dudosas de ``predict_batch``."""
+        detector = self.detector
+        uncertain = np.array([
+            i for i in np.flatnonzero(
+                np.abs(probabilities - detector.threshold) < detector.tta_band
+            )
+            if i not in skip
+        ], dtype=np.intp)
+        if not uncertain.size:
+            return
+
+        images = detector.acquire_input(len(uncertain))
+        try:
+            for j, i in enumerate(uncertain):
+                detector.preprocess_into(image_paths[i], images[j])
+            adjusted, tta = detector.apply_tta(
+                images, probabilities[uncertain], self.predict_preprocessed
+            )
+        finally:
+            detector.release_input(images)
+
+        for j, i in enumerate(uncertain):
+            results[i] = detector.build_result(
+                float(adjusted[j]), None if members is None else members[i]
+            )
+            results[i]['tta'] = tta[j]
+
+    def get_pool_status(self):
+        """
+        Consulta el estado del servidor del pool.
+
+        Returns:
+            dict: Procesos activos, solicitudes pendientes y configuración
+        """
+        return self._call(('status',))
+
+    def get_model_info(self):
+        """
+        Retorna información del modelo servido por el pool.
+
+        Returns:
+            dict: Información del modelo
+        """
+        status = self.get_pool_status()
+        return {
+            'backend': 'pool',
+            'pool_address': self.address,
+            'pool_workers': len(status['workers']),
+            'detector': status['detector'],
+            'threshold': self.detector.threshold,
+        }
+
+    def close(self):
+        """Cierra las conexiones y elimina los segmentos de memoria creados."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+        if os.getpid() != self._pid:
+            return
+
+        with self._segments_lock:
+            segments, self._segments = self._segments, []
+        for shm in segments:
+            try:
+                shm.unlink()
+                shm.close()
+            except (FileNotFoundError, BufferError):
+                pass
+
+    def _check_fork(self):
+        # Tras un fork no se comparten conexiones ni segmentos con el padre
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._local = threading.local()
+            with self._segments_lock:
+                self._segments = []
+
+    def _get_connection(self):
+        self._check_fork()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            self._local.connection = connection
+        return connection
+
+    def _get_buffer(self, count):
+        """
+        Retorna el segmento de memoria compartida del hilo actual, ampliándolo
+        si no tiene capacidad para ``count`` imágenes.
+        """
+        self._check_fork()
+        shm = getattr(self._local, 'shm', None)
+        if shm is None or shm.size < count * IMAGE_NBYTES:
+            if shm is not None:
+                with self._segments_lock:
+                    if shm in self._segments:
+                        self._segments.remove(shm)
+                self._local.buffer = None
+                shm.close()
+                shm.unlink()
+            shm = SharedMemory(create=True, size=max(count, 1) * IMAGE_NBYTES)
+            with self._segments_lock:
+                self._segments.append(shm)
+            self._local.shm = shm
+            self._local.buffer = np.ndarray(
+                (shm.size // IMAGE_NBYTES, *IMAGE_SHAPE), dtype=np.float32, buffer=shm.buf
+            )
+        return shm, self._local.buffer
+
+    def _request(self, shm, count):
+        return np.asarray(self._call(('predict', shm.name, count)), dtype=np.float32)
+
+    def _call(self, message):
+        connection = self._get_connection()
+        try:
+            connection.send(message)
+            if not connection.poll(self.timeout):
+                raise TimeoutError("El pool de inferencia no respondió a tiempo")
+            status, payload = connection.recv()
+        except (EOFError, OSError, TimeoutError):
+            # Conexión rota o desincronizada: reconectar en la próxima llamada
+            connection.close()
+            self._local.connection = None
+            raise
+
+        if status != 'ok':
+            raise RuntimeError(f"Error en el pool de inferencia: {payload}")
+        return payload
@@ -596,13 +596,13 @@ async function performAnalysis() {
       body: formData,
     });
 
-    if (!response.ok) {
-      const errorText = await response.text();
+    // Los rechazos del servidor (p. ej. control de calidad) traen el motivo en JSON
+    const data = await response.json().catch(() => null);
+
+    if (!response.ok && !(data && data.error)) {
       throw new Error(`Error ${response.status}: ${response.statusText}`);
     }
 
-    const data = await response.json();
-
     if (data.success) {
       // Ocultar el loader del botón
       btnText.style.display = "inline";
@@ -58,19 +58,7 @@ async function guardarReporteAutomaticamente() {
       "recomendaciones",
       document.getElementById("recomendaciones").value
     );
-    formData.append(
-      "tiene_anemia",
-      document.getElementById("tiene_anemia").value
-    );
-    formData.append(
-      "probabilidad",
-      document.getElementById("probabilidad").value
-    );
-    formData.append("confianza", document.getElementById("confianza").value);
-    formData.append(
-      "nivel_confianza",
-      document.getElementById("nivel_confianza").value
-    );
+    // El resultado del modelo lo toma el servidor, no el formulario
 
     const response = await fetch("/analysis/save/", {
       method: "POST",